@@ -1,40 +1,77 @@
+import atexit
 import os
+import sys
+import time
 import logging
-import pandas as pd
+import numpy as np
 from dotenv import load_dotenv
 from app.commands import CommandHandler
+from app.history import HistoryLog
+from app.journal import Journal
 from app.plugins.calc.calculator import Calculator
-from app.plugins.calc import AddCommand, SubtractCommand, MultiplyCommand, DivideCommand
-from app.plugins.reset import ResetCommand
-from app.plugins.data import DataCommand
-from app.plugins.greet import GreetCommand
-from app.plugins.mean import MeanCommand
-from app.plugins.median import MedianCommand
-from app.plugins.mode import ModeCommand
-from app.plugins.standard_deviation import StandardDeviationCommand
+from app.plugins.calc.sketch import StatsSketch
+from app.plugins import build_manifest, commands_from_manifest
+from app.parser import ERROR, CommandParser, ParseError
+from app.snapshot import read_snapshot, write_snapshot
 from app.plugins.logging_config import configure_logging
-from app.plugins.csv import CsvCommand
-import warnings
 
 
 class App:
+    # Commands the script runner applies with one bulk calculator call per run of consecutive lines
+    ARITHMETIC = ("add", "subtract", "multiply", "divide")
+    # Shorter runs (in operands) go line by line through execute_command; the bulk setup only pays off above this
+    SCRIPT_BATCH_MIN = 32
+
+
     def __init__(self):
         os.makedirs('logs', exist_ok=True)
-        configure_logging()
         load_dotenv()
+        configure_logging()
 
         # Load environment variables
         self.settings = self.load_environment_variables()
         self.settings.setdefault('ENVIRONMENT', 'PRODUCTION')
 
+        # Profile the session (or PROFILE_COMMANDS) when PROFILE is set; the output is written on exit
+        self.profiler = None
+        if self.settings.get('PROFILE'):
+            from app.profiler import SessionProfiler  # pylint: disable=import-outside-toplevel
+            self.profiler = SessionProfiler.from_settings(self.settings)
+            if self.profiler is not None:
+                self.profiler.start()
+                atexit.register(self.save_profile)
+
         # Initialize CommandHandler and Calculator
-        self.calculator = Calculator()
-        self.command_handler = CommandHandler(self.calculator)
-        self.history = pd.DataFrame(columns=["Operation", "Value", "Result"])
+        self.calculator = Calculator(StatsSketch.from_settings(self.settings))
+        workers = int(self.settings.get('STATS_WORKERS', '0'))
+        if workers > 1:
+            from app.plugins.calc.parallel import ParallelStats  # pylint: disable=import-outside-toplevel
+            self.calculator.parallel = ParallelStats(workers)
+        self.history = HistoryLog()
+        self.command_handler = CommandHandler(self.calculator, self.history)
+        self.parser = CommandParser(self.command_handler)
+        self.command_handler.attach_profiler(self.profiler)
+        self.instrumentation = None
+        metrics = self.settings.get('COMMAND_METRICS', '').lower()
+        if metrics in ('1', 'true', 'yes', 'on', 'alloc'):
+            from app.metrics import Instrumentation  # pylint: disable=import-outside-toplevel
+            self.instrumentation = Instrumentation(trace_allocations=metrics == 'alloc')
+            self.command_handler.instrument(self.instrumentation)
 
         # Register all commands
         self.register_all_commands()
 
+        # Reopen the previous session: the latest snapshot, then the journal frames written after it
+        self.journal = Journal.from_settings(self.settings)
+        snapshot_path = self.journal.snapshot_path if self.journal else self.settings.get('SNAPSHOT_PATH')
+        journal_sequence = 0
+        if snapshot_path and os.path.exists(snapshot_path):
+            journal_sequence = self.load_snapshot(snapshot_path).get('journal_sequence', 0)
+        if self.journal is not None:
+            self.journal.recover(self.calculator, self.history, journal_sequence)
+            self.journal.attach(self.calculator, self.history, self.command_handler)
+            atexit.register(self.journal.close)  # Whatever ends the process, write the pending frames
+
     def start(self):
         """Start the application."""
         logging.info("Application started. Type 'exit' to exit.")
@@ -47,38 +84,60 @@ class App:
         return settings
 
     def register_all_commands(self):
-        """Register and execute commands from all plugins."""
-        self.command_handler.register_command("add", AddCommand)
-        self.command_handler.register_command("subtract", SubtractCommand)
-        self.command_handler.register_command("multiply", MultiplyCommand)
-        self.command_handler.register_command("divide", DivideCommand)
-        self.command_handler.register_command("mean", MeanCommand)
-        self.command_handler.register_command("median", MedianCommand)
-        self.command_handler.register_command("mode", ModeCommand)
-        self.command_handler.register_command("standard_deviation", StandardDeviationCommand)
-        self.command_handler.register_command("grades", DataCommand)
-        self.command_handler.register_command("greet", GreetCommand)
-        self.command_handler.register_command("csv", CsvCommand)
-        self.command_handler.register_command("reset", ResetCommand(self.calculator))
+        """Discover the commands of all plugins and register lazy stubs for them.
 
+        Plugins are found with pkgutil (and installed entry points); the result
+        is cached in a manifest so later starts neither walk nor import them.
+        """
+        manifest_path = self.settings.get('PLUGIN_MANIFEST', './.cache/plugin_manifest.json')
+        self.manifest = build_manifest(manifest_path)
+        self.register_commands(self.command_handler, self.calculator)
         logging.info("All commands registered.")
 
+    def register_commands(self, command_handler, calculator):
+        """Register lazy stubs for every discovered command on `command_handler`."""
+        for command_name, command_stub in commands_from_manifest(self.manifest, command_handler, calculator).items():
+            command_handler.register_command(command_name, command_stub)
+
+    def create_session(self):
+        """Build an isolated Calculator, HistoryLog and CommandHandler with every command registered.
+
+        Sessions share the discovery manifest and settings but no state, so a
+        server can give each client its own calculator.
+        """
+        calculator = Calculator(StatsSketch.from_settings(self.settings))
+        history = HistoryLog()
+        command_handler = CommandHandler(calculator, history)
+        command_handler.attach_profiler(self.profiler)
+        if self.instrumentation is not None:
+            command_handler.instrument(self.instrumentation)  # Sessions report into the app's metrics
+        self.register_commands(command_handler, calculator)
+        return calculator, history, command_handler
+
     def repl(self):
         """Command-line REPL interface for interacting with the app."""
         instructions = (
             "\n🔢 Welcome to the Calculator REPL!"
             "\n\n📚 Available Operations:"
             "\n  - add <value>: Adds a value to the current total (e.g., 'add 5')."
+            "\n    Arithmetic commands also take several values or a file (e.g., 'add 1 2 3', 'add @grades.npy')."
             "\n  - subtract <value>: Subtracts a value from the current total (e.g., 'subtract 3')."
             "\n  - multiply <value>: Multiplies the current total by a value (e.g., 'multiply 4')."
             "\n  - divide <value>: Divides the current total by a value (e.g., 'divide 2')."
+            "\n  - undo [n] / redo [n]: Reverts or re-applies the last n arithmetic commands (1 by default)."
             "\n  - mean: Calculates the mean of entered grades."
             "\n  - median: Calculates the median of entered grades."
             "\n  - mode: Calculates the mode of entered grades."
             "\n  - standard_deviation: Calculates the standard deviation of entered grades."
-            "\n  - grades: Enter grades for different categories (assignment, project, etc.)."
+            "\n  - percentile [p]: Approximate p-th percentile (50 by default) of the grades from a bounded-memory sketch."
+            "\n  - histogram: Counts of the grades per bin of the sketch's fixed-bin histogram."
+            "\n  - grades [file|-]: Enter grades for different categories (assignment, project, etc.),"
+            "\n    or load a CSV of 'class,assignment,project,midterm,finals' rows from a file or stdin."
             "\n  - greet: Displays a greeting message."
             "\n  - csv: Exports collected grades to a CSV file."
+            "\n  - group_stats [class|category]: Mean, median, standard deviation and mode per class or category."
+            "\n  - import <path> [column] [dtype]: Streams a CSV column into the grades (e.g., 'import data/grades_export.csv Grade')."
+            "\n  - profile [on [alloc]|off|reset|dump [path]]: Per-command counts, errors and p50/p99 latency."
             "\n  - reset: Resets the calculator value to 0 (history remains)."
             "\n  - exit: Exits the program and displays the summary."
             "\n\nℹ️ Type 'exit' to quit and view the summary at any time.\n"
@@ -86,9 +145,6 @@ class App:
 
         print(instructions)
 
-        # List of commands that do not require a value
-        no_value_commands = ["mean", "median", "mode", "standard_deviation", "grades", "greet", "csv", "reset"]
-
         while True:
             try:
                 command_input = input(">>> ").strip()
@@ -98,55 +154,159 @@ class App:
                     self.handle_special_commands(command_input)
                     break
 
-                # Split command input
-                parts = command_input.split()
-                command_name = parts[0]
-
-                # Check if command is valid
-                if command_name not in self.command_handler.commands:
-                    print(f"❌ Error: Unknown command '{command_name}'.")
+                # Parse the whole line first ('add 5; multiply 2; mean' chains commands)
+                try:
+                    commands = self.parser.parse(command_input)
+                except ParseError as e:
+                    print(f"❌ Error: {e}")
                     continue
 
-                # Handle commands that do not require a value
-                if command_name in no_value_commands:
-                    result = self.command_handler.execute_command(command_name)
-                else:
-                    # Commands that require a value
-                    if len(parts) < 2:
-                        print("❌ Error: Please enter a command followed by a value.")
+                for command in commands:
+                    if command.name in ('exit', 'reset'):
+                        self.handle_special_commands(command.name)
                         continue
+                    if command.name == 'print':
+                        result = self.calculator.value
+                    else:
+                        result = self.command_handler.execute_command(command.name, command.value)
 
-                    try:
-                        value = float(parts[1])
-                    except ValueError:
-                        print("❌ Error: Please enter a valid number.")
-                        continue
+                    # Display the result
+                    if result is not None:
+                        if isinstance(result, float):
+                            result = round(result, 2)
+                        elif isinstance(result, np.ndarray):
+                            result = np.round(result, 2).tolist()
+                        print(f"✅ Result: {result}")
+
+            except Exception as e:
+                print(f"❌ An unexpected error occurred: {e}")
 
-                    # Set the value and execute the command
-                    command = self.command_handler.commands[command_name](self.calculator, value)
-                    result = command.execute()
+    def run_script(self, stream):
+        """Run newline-delimited commands from a file-like object without the REPL.
 
-                # Display the result
-                if result is not None:
-                    if isinstance(result, float):
-                        result = round(result, 2)
-                    print(f"✅ Result: {result}")
+        The script is parsed once into op/operand arrays; consecutive lines
+        of the same arithmetic command are applied in order, as one batched
+        calculator call once the run is long enough, only stat commands and 'print' lines produce
+        output, and the overall throughput is reported on stderr.
+        """
+        start = time.perf_counter()
+        batch = self.parser.parse_batch(stream.read())
+        executed = self.execute_batch(batch)
 
+        elapsed = time.perf_counter() - start
+        rate = executed / elapsed if elapsed > 0 else float('inf')
+        logging.info("Script processed %s commands in %.3fs.", executed, elapsed)
+        print(f"⏱️ Processed {executed} commands in {elapsed:.3f}s ({rate:,.0f} commands/s).", file=sys.stderr)
+        self.save_metrics()
+        return executed
+
+    def execute_batch(self, batch):
+        """Execute a parsed CommandBatch in order; returns the number of commands run (up to 'exit')."""
+        arithmetic = np.array([name in self.ARITHMETIC for name in batch.names] + [False])
+        run_keys = np.where(arithmetic[batch.ops], batch.ops, -1)  # ERROR rows (-1) pick the trailing False
+
+        # Runs of consecutive rows of the same arithmetic command are applied together, in script order
+        boundaries = np.flatnonzero(np.diff(run_keys)) + 1
+        run_ends = dict(zip(np.concatenate(([0], boundaries)).tolist(),
+                            np.append(boundaries, len(batch)).tolist()))
+
+        row = 0
+        while row < len(batch):
+            if run_keys[row] >= 0:
+                end = run_ends[row]
+                self._run_arithmetic(batch, row, end)
+                row = end
+                continue
+
+            line_number = batch.lines[row]
+            if batch.ops[row] == ERROR:
+                print(f"❌ Line {line_number}: {batch.text[row]}")
+                row += 1
+                continue
+            command_name = batch.names[batch.ops[row]]
+            row += 1
+            if command_name == "exit":
+                return row
+            if command_name == "print":
+                print(f"✅ Result: {round(self.calculator.value, 2)}")
+            elif command_name == "reset":
+                self.calculator.reset()
+                self.command_handler.record("reset", None, 0)
+            else:
+                value = batch.text.get(row - 1)
+                if value is None and batch.counts[row - 1]:
+                    operands = batch.operand_slice(row - 1)
+                    value = float(operands[0]) if len(operands) == 1 else operands
+                try:
+                    self.command_handler.execute_command(command_name, value)
+                except Exception as e:
+                    print(f"❌ Line {line_number}: {e}")
+        return len(batch)
+
+    def _run_arithmetic(self, batch, start, end):
+        """Apply rows start:end of a batch (all the same arithmetic command), with one calculator call if long enough."""
+        command_name = batch.names[batch.ops[start]]
+        counts = batch.counts[start:end]
+        first = batch.starts[start]
+        total = int(counts.sum())
+        operands = batch.operands[first:first + total]
+
+        if total < self.SCRIPT_BATCH_MIN:
+            for row in range(start, end):
+                operands = batch.operand_slice(row)
+                if command_name == "divide" and not operands.all():
+                    print(f"❌ Line {batch.lines[row]}: Error: Division by zero")
+                    continue
+                try:
+                    self.command_handler.execute_command(
+                        command_name, float(operands[0]) if len(operands) == 1 else operands)
+                except Exception as e:
+                    print(f"❌ Line {batch.lines[row]}: {e}")
+            return
+
+        if command_name == "divide" and not operands.all():
+            # A line with a zero divisor fails as a whole, like the scalar command, and the rest still run
+            operand_rows = np.repeat(np.arange(start, end), counts)
+            zero_rows = np.unique(operand_rows[operands == 0])
+            for row in zero_rows.tolist():
+                print(f"❌ Line {batch.lines[row]}: Error: Division by zero")
+            operands = operands[~np.isin(operand_rows, zero_rows)]
+        if operands.size:
+            try:
+                self._apply_operands(command_name, operands, end - start)
             except Exception as e:
-                print(f"❌ An unexpected error occurred: {e}")
+                # The run was one calculator call, so the error is reported against its first line
+                print(f"❌ Line {batch.lines[start]}: {e}")
+
+    def _apply_operands(self, command_name, nums, commands):
+        """One bulk calculator call standing for `commands` script lines, recorded in the history and metrics."""
+        apply = getattr(self.calculator, f"{command_name}_values")
+        if self.profiler is not None:
+            apply = self.profiler.wrap(command_name, apply)
+        start = time.perf_counter_ns()
+        steps = apply(nums, True)
+        instrumentation = self.command_handler.instrumentation
+        if instrumentation is not None:
+            instrumentation.record(command_name, time.perf_counter_ns() - start, commands)
+        self.command_handler.record_many(command_name, nums, steps)
 
     def handle_special_commands(self, command_name):
         """Handle special commands like reset and exit."""
         if command_name == "reset":
             self.calculator.reset()
+            self.command_handler.record("reset", None, 0)
             logging.info("Calculator value reset to 0.")
             print("✅ Calculator value reset to 0. History remains intact.")
         elif command_name == "exit":
             self.save_history()
+            if self.journal is not None:
+                self.journal.close(checkpoint=True)  # Compact the journal into its snapshot
+            elif self.settings.get('SNAPSHOT_PATH'):
+                self.save_snapshot(self.settings['SNAPSHOT_PATH'])
+            self.save_metrics()
             logging.info("Exiting REPL.")
             print("\n👋 Exiting REPL. Calculator Summary:")
             print(self.history)
-            import sys
             sys.exit()
 
     def save_history(self, file_path='./data/grades_export.csv'):
@@ -160,17 +320,47 @@ class App:
         # Save the history if it exists
         if not self.history.empty:
             self.history.to_csv(file_path, index=False)
-            logging.info(f"Grades saved to CSV at '{file_path}'.")
+            logging.info("Grades saved to CSV at '%s'.", file_path)
             print(f"\n📁 Grades saved to '{file_path}'.")
         elif self.calculator.values:
             # Save current calculator values if history is empty
+            import pandas as pd  # pylint: disable=import-outside-toplevel
             history_df = pd.DataFrame({
                 "Operation": ["add"] * len(self.calculator.values),
-                "Value": self.calculator.values,
-                "Result": self.calculator.values
+                "Value": self.calculator.values.view(),
+                "Result": self.calculator.values.view()
             })
             history_df.to_csv(file_path, index=False)
-            logging.info(f"Calculator values saved to CSV at '{file_path}'.")
+            logging.info("Calculator values saved to CSV at '%s'.", file_path)
             print(f"\n📁 Calculator values saved to '{file_path}'.")
         else:
             print("No data to save. History and calculator values are empty.")
+
+    def save_metrics(self):
+        """Write the command metrics to METRICS_FILE, when the handler is instrumented and the file is set."""
+        instrumentation = self.command_handler.instrumentation
+        if instrumentation is not None and self.settings.get('METRICS_FILE'):
+            instrumentation.dump(self.settings['METRICS_FILE'])
+
+    def save_profile(self):
+        """Stop the profiler and write its output (called on exit when PROFILE is set)."""
+        if self.profiler is not None:
+            for path in self.profiler.write():
+                print(f"🔬 Profile saved to '{path}'.", file=sys.stderr)
+
+    def save_snapshot(self, file_path):
+        """Write the calculator values, total and history to a binary snapshot."""
+        write_snapshot(file_path, self.calculator.value, self.calculator.values.view(),
+                       self.calculator.stats.moments(), self.command_handler.history,
+                       journal_sequence=self.journal.sequence if self.journal is not None else 0)
+        logging.info("Session snapshot saved to '%s'.", file_path)
+
+    def load_snapshot(self, file_path):
+        """Reopen a binary snapshot by memory-mapping it; nothing is parsed or copied."""
+        snapshot = read_snapshot(file_path)
+        arrays = snapshot["arrays"]
+        self.calculator.load_state(snapshot["value"], arrays["values"]["data"], snapshot["moments"])
+        self.command_handler.history.adopt(snapshot["operations"], arrays["history_codes"]["data"],
+                                           arrays["history_values"]["data"], arrays["history_results"]["data"])
+        logging.info("Session snapshot loaded from '%s' (%s values).", file_path, len(self.calculator.values))
+        return snapshot
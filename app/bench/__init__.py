@@ -0,0 +1,2 @@
+# app/bench/__init__.py
+# Benchmarks for the calculator; each module runs with `python -m app.bench.<name>`.
@@ -0,0 +1,236 @@
+# app/bench/__main__.py
+# The whole benchmark suite in one offline run: `python -m app.bench`.
+# Startup and dispatch come from their own modules; the statistics commands,
+# CSV save/load and script throughput are measured here. The result is one
+# JSON document; saved with --save it becomes the --baseline of a later run,
+# which fails when any metric is worse than the baseline by more than
+# --threshold.
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+import numpy as np
+from app.bench.dispatch import measure_dispatch
+from app.bench.startup import compare as compare_startup, measure_startup
+
+SECTIONS = ("startup", "dispatch", "stats", "csv", "script")
+SIZES = tuple(10 ** exponent for exponent in range(3, 9))
+MIN_MS = 0.05  # Timings below this are too noisy to flag as regressions
+MIN_NS = 50  # ... and per-call timings below this
+REFERENCE = ("allocate_ns",)  # Baselines measured for comparison only (the former dispatch path), never flagged
+STAT_COMMANDS = {"mean": None, "median": None, "mode": None, "standard_deviation": None, "percentile": 90.0}
+
+
+def best_ms(func, repeat, setup=None):
+    """Fastest of `repeat` calls of `func()` in ms; `setup()` runs untimed before each call."""
+    samples = []
+    for _ in range(repeat):
+        if setup is not None:
+            setup()
+        start = time.perf_counter()
+        func()
+        samples.append((time.perf_counter() - start) * 1000)
+    return round(min(samples), 4)
+
+
+@contextlib.contextmanager
+def quiet():
+    """Discard what the commands print while they are timed."""
+    with open(os.devnull, "w", encoding="utf-8") as devnull, contextlib.redirect_stdout(devnull), \
+            contextlib.redirect_stderr(devnull):
+        yield
+
+
+def create_app():
+    """An App that logs only errors, to nowhere, and does not reopen a saved session."""
+    os.environ.update(LOG_LEVEL="ERROR", LOG_FILE=os.devnull)
+    os.environ.pop("SNAPSHOT_PATH", None)
+    from app import App  # pylint: disable=import-outside-toplevel
+    return App()
+
+
+def grade_values(size, seed=0):
+    return np.round(np.random.default_rng(seed).normal(75, 12, size), 1)
+
+
+def measure_stats(app, sizes, repeat=3):
+    """
+    Cold (fresh cache) and warm time of every statistics command at each
+    size, on values restored the way a snapshot restores them: this is the
+    path that recomputes from the array, while live values are answered
+    from the running aggregates in O(1).
+    """
+    from app.plugins.calc.calculator import StatsCache  # pylint: disable=import-outside-toplevel
+    calculator, _, command_handler = app.create_session()
+    result = {}
+    for size in sizes:
+        values = grade_values(size)
+        moments = (size, float(values.mean()), float(np.square(values - values.mean()).sum()))
+
+        def restore():
+            calculator.load_state(0, values, moments)
+            calculator.stats_cache = StatsCache(calculator)
+
+        timings = {}
+        with quiet():
+            for command_name, value in STAT_COMMANDS.items():
+                run = lambda name=command_name, value=value: command_handler.execute_command(name, value)
+                timings[command_name] = {"cold_ms": best_ms(run, repeat, setup=restore),
+                                         "warm_ms": best_ms(run, repeat)}
+        result[str(size)] = timings
+        calculator.reset()
+        command_handler.history.clear()
+    return result
+
+
+def measure_csv(app, rows, repeat=3):
+    """Time save_history on a `rows`-long history and importing the file back with 'import'."""
+    calculator, _, command_handler = app.create_session()
+    values = grade_values(rows)
+    app.history.record_many("add", values, np.cumsum(values))
+    with tempfile.TemporaryDirectory() as directory, quiet():
+        path = os.path.join(directory, "history.csv")
+        save_ms = best_ms(lambda: app.save_history(path), repeat)
+        load_ms = best_ms(lambda: command_handler.execute_command("import", [path, "Value"]), repeat,
+                          setup=calculator.reset)
+    app.history.clear()
+    return {"rows": rows, "save_ms": save_ms, "load_ms": load_ms,
+            "save_rows_per_s": round(rows / save_ms * 1000), "load_rows_per_s": round(rows / load_ms * 1000)}
+
+
+def generate_script(lines, kind):
+    """'additive' scripts only add; 'mixed' ones cycle through the four arithmetic commands and ask for the mean."""
+    if kind == "additive":
+        return "".join(f"add {i % 97}\n" for i in range(lines))
+    cycle = ("add {}", "subtract 1", "multiply 1.0001", "divide 1.0001")
+    script = [cycle[i % 4].format(i % 97) for i in range(lines)]
+    script[999::1000] = ["mean"] * len(script[999::1000])
+    return "\n".join(script) + "\n"
+
+
+def measure_script(app, lines, repeat=3):
+    """Commands per second of run_script on generated scripts."""
+    def reset():
+        app.calculator.reset()
+        app.history.clear()
+
+    result = {}
+    for kind in ("additive", "mixed"):
+        script = generate_script(lines, kind)
+        with quiet():
+            elapsed = best_ms(lambda text=script: app.run_script(io.StringIO(text)), repeat, setup=reset)
+        result[kind] = {"lines": lines, "ms": elapsed, "commands_per_s": round(lines / elapsed * 1000)}
+    reset()
+    return result
+
+
+def run_suite(sections, sizes, repeat=3, runs=5, number=200_000, lines=100_000, rows=100_000):
+    results = {}
+    if "startup" in sections:
+        results["startup"] = measure_startup(runs)
+    if "dispatch" in sections:
+        results["dispatch"] = measure_dispatch(number)
+    if {"stats", "csv", "script"} & set(sections):
+        app = create_app()
+        if "stats" in sections:
+            results["stats"] = measure_stats(app, sizes, repeat)
+        if "csv" in sections:
+            results["csv"] = measure_csv(app, rows, repeat)
+        if "script" in sections:
+            results["script"] = measure_script(app, lines, repeat)
+    return results
+
+
+def metrics(results, prefix=""):
+    """Flatten the numeric leaves of a result into {'section.key.metric': value}."""
+    flat = {}
+    for key, value in results.items():
+        name = f"{prefix}{key}"
+        if isinstance(value, dict):
+            flat.update(metrics(value, f"{name}."))
+        elif isinstance(value, (int, float)) and not isinstance(value, bool):
+            flat[name] = value
+    return flat
+
+
+def compare(results, baseline, threshold):
+    """
+    List the metrics worse than `threshold` (a fraction) against baseline:
+    times (*_ms, *_ns) that grew and rates (*_per_s) that shrank. Times
+    under MIN_MS / MIN_NS are skipped as noise and REFERENCE metrics are
+    not ours to regress; startup is checked by its own module, which also
+    flags pandas being imported at startup.
+    """
+    regressions = []
+    if "startup" in results and "startup" in baseline:
+        regressions.extend(f"startup.{regression}"
+                           for regression in compare_startup(results["startup"], baseline["startup"], threshold))
+    current = metrics({key: value for key, value in results.items() if key != "startup"})
+    previous = metrics(baseline)
+    for name, value in current.items():
+        before = previous.get(name)
+        if not before or name.endswith(REFERENCE):
+            continue
+        if (name.endswith("_ms") and value < MIN_MS) or (name.endswith("_ns") and value < MIN_NS):
+            continue
+        if name.endswith(("_ms", "_ns")) and value > before * (1 + threshold):
+            regressions.append(f"{name}: {value} > {before} (+{threshold:.0%})")
+        elif name.endswith("_per_s") and value * (1 + threshold) < before:
+            regressions.append(f"{name}: {value} < {before} (-{threshold:.0%})")
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m app.bench", description="Run the calculator benchmark suite.")
+    parser.add_argument("--only", default=",".join(SECTIONS),
+                        help=f"comma-separated sections to run (default: {','.join(SECTIONS)})")
+    parser.add_argument("--max-size", type=float, default=1e6,
+                        help="largest number of values for the statistics commands (up to 1e8)")
+    parser.add_argument("--repeat", type=int, default=3, help="timed runs per measurement; the fastest counts")
+    parser.add_argument("--runs", type=int, default=5, help="cold starts sampled by the startup section")
+    parser.add_argument("--number", type=int, default=200_000, help="calls per timing in the dispatch section")
+    parser.add_argument("--script-lines", type=int, default=100_000, help="lines of each generated script")
+    parser.add_argument("--csv-rows", type=int, default=100_000, help="history rows saved and imported")
+    parser.add_argument("--baseline", help="JSON file from a previous --save to compare against")
+    parser.add_argument("--threshold", type=float, default=0.2, help="allowed slowdown as a fraction")
+    parser.add_argument("--save", help="write the result to this JSON file")
+    args = parser.parse_args(argv)
+
+    sections = [section.strip() for section in args.only.split(",") if section.strip()]
+    unknown = sorted(set(sections) - set(SECTIONS))
+    if unknown:
+        parser.error(f"unknown section(s): {', '.join(unknown)}")
+    sizes = [size for size in SIZES if size <= args.max_size]
+
+    results = run_suite(sections, sizes, args.repeat, args.runs, args.number, args.script_lines, args.csv_rows)
+    document = {
+        "machine": {"python": platform.python_version(), "numpy": np.__version__,
+                    "platform": platform.platform(), "cpus": os.cpu_count()},
+        "results": results,
+    }
+
+    status = 0
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as file:
+            baseline = json.load(file)
+        regressions = compare(results, baseline.get("results", baseline), args.threshold)
+        document["baseline"] = {"path": args.baseline, "threshold": args.threshold, "regressions": regressions}
+        for regression in regressions:
+            print(f"❌ Regression: {regression}", file=sys.stderr)
+        status = 1 if regressions else 0
+
+    print(json.dumps(document, indent=2))
+    if args.save:
+        with open(args.save, "w", encoding="utf-8") as file:
+            json.dump(document, file, indent=2)
+    return status
+
+
+if __name__ == "__main__":
+    sys.exit(main())
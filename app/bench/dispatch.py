@@ -0,0 +1,80 @@
+# app/bench/dispatch.py
+# Per-command overhead of CommandHandler: the precompiled dispatch table
+# against the previous path of looking the class up and allocating a new
+# command for every call. A no-op command isolates the dispatch cost; 'add'
+# shows it next to real work.
+
+import argparse
+import json
+import sys
+import timeit
+from app.commands import Command, CommandHandler, LazyCommand
+from app.plugins.calc import AddCommand
+from app.plugins.calc.calculator import Calculator
+
+
+class NoopCommand(Command):
+    def __init__(self, calculator, value=None):
+        self.calculator = calculator
+        self.value = value
+
+    def execute(self):
+        return self.value
+
+
+def allocate_per_call(commands, calculator):
+    """The former execute_command without history: lookup, lazy check, new instance, execute."""
+    def execute(command_name, command_value=None):
+        if command_name not in commands:
+            return None
+        command_class = commands[command_name]
+        if isinstance(command_class, LazyCommand):
+            command_class = commands[command_name] = command_class.resolve()
+        if command_value is not None:
+            return command_class(calculator, command_value).execute()
+        return command_class(calculator).execute()
+    return execute
+
+
+def per_call_ns(statement, number):
+    """Best of five timings of `statement`, in ns per call."""
+    return round(min(timeit.repeat(statement, number=number, repeat=5)) / number * 1e9, 1)
+
+
+def measure_dispatch(number=200_000):
+    calculator = Calculator()
+    handler = CommandHandler(calculator)
+    for name, command_class in (("noop", NoopCommand), ("add", AddCommand)):
+        handler.register_command(name, command_class)
+    legacy = allocate_per_call(dict(handler.commands), calculator)
+    table = handler._dispatch  # pylint: disable=protected-access
+
+    result = {}
+    for name in ("noop", "add"):
+        spec = handler.spec(name)
+        result[name] = {
+            "allocate_ns": per_call_ns(lambda: legacy(name, 1.0), number),
+            "execute_command_ns": per_call_ns(lambda: handler.execute_command(name, 1.0), number),
+            "lookup_and_call_ns": per_call_ns(lambda: table[name].run(1.0), number),
+            "takes_value": spec.takes_value,
+        }
+        calculator.reset()
+    return result
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Measure per-command dispatch overhead.")
+    parser.add_argument("--number", type=int, default=200_000, help="calls per timing")
+    parser.add_argument("--save", help="write the result to this JSON file")
+    args = parser.parse_args(argv)
+
+    result = measure_dispatch(args.number)
+    print(json.dumps(result, indent=2))
+    if args.save:
+        with open(args.save, "w", encoding="utf-8") as file:
+            json.dump(result, file, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
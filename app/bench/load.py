@@ -0,0 +1,100 @@
+# app/bench/load.py
+# Load generator for the calculator server: opens many concurrent sessions,
+# pipelines a batch of commands on each and reports throughput and latency.
+# Without --address it starts a server in-process on a temporary Unix socket.
+
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+COMMANDS = ("add 7", "add 1 2 3", "multiply 2", "subtract 4", "mean", "median", "print")
+
+
+def percentile(samples, p):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(p / 100 * len(ordered)))]
+
+
+async def open_client(address):
+    if address.startswith("unix:"):
+        return await asyncio.open_unix_connection(address[len("unix:"):])
+    host, _, port = address.rpartition(":")
+    return await asyncio.open_connection(host or "127.0.0.1", int(port))
+
+
+async def run_session(address, commands, pipeline):
+    """Send `commands` in pipelined batches; return (latency per batch in ms, failed replies)."""
+    reader, writer = await open_client(address)
+    latencies, failures = [], 0
+    for start in range(0, len(commands), pipeline):
+        batch = commands[start:start + pipeline]
+        sent = time.perf_counter()
+        writer.write("".join(command + "\n" for command in batch).encode("utf-8"))
+        await writer.drain()
+        for _ in batch:
+            failures += not json.loads(await reader.readline())["ok"]
+        latencies.append((time.perf_counter() - sent) * 1000)
+    writer.write(b"exit\n")
+    writer.close()
+    await writer.wait_closed()
+    return latencies, failures
+
+
+async def generate_load(address, sessions, commands_per_session, pipeline):
+    commands = [COMMANDS[i % len(COMMANDS)] for i in range(commands_per_session)]
+    start = time.perf_counter()
+    results = await asyncio.gather(*(run_session(address, commands, pipeline) for _ in range(sessions)))
+    elapsed = time.perf_counter() - start
+    latencies = [latency for session_latencies, _ in results for latency in session_latencies]
+    total = sessions * commands_per_session
+    return {
+        "sessions": sessions,
+        "commands": total,
+        "pipeline": pipeline,
+        "seconds": round(elapsed, 3),
+        "commands_per_s": round(total / elapsed),
+        "batch_latency_ms": {"p50": round(statistics.median(latencies), 2),
+                             "p99": round(percentile(latencies, 99), 2)},
+        "failures": sum(failures for _, failures in results),
+    }
+
+
+async def run_in_process(sessions, commands_per_session, pipeline):
+    from app import App  # pylint: disable=import-outside-toplevel
+    from app.server import CalculatorServer  # pylint: disable=import-outside-toplevel
+    with tempfile.TemporaryDirectory() as directory:
+        server = CalculatorServer(App(), f"unix:{os.path.join(directory, 'calc.sock')}")
+        address = await server.start()
+        try:
+            return await generate_load(address, sessions, commands_per_session, pipeline)
+        finally:
+            await server.stop()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Generate load against the calculator server.")
+    parser.add_argument("--address", help="server address ('host:port' or 'unix:/path'); default: in-process")
+    parser.add_argument("--sessions", type=int, default=1000, help="concurrent sessions")
+    parser.add_argument("--commands", type=int, default=100, help="commands per session")
+    parser.add_argument("--pipeline", type=int, default=20, help="commands sent before reading the replies")
+    parser.add_argument("--save", help="write the result to this JSON file")
+    args = parser.parse_args(argv)
+
+    if args.address:
+        result = asyncio.run(generate_load(args.address, args.sessions, args.commands, args.pipeline))
+    else:
+        result = asyncio.run(run_in_process(args.sessions, args.commands, args.pipeline))
+    print(json.dumps(result, indent=2))
+    if args.save:
+        with open(args.save, "w", encoding="utf-8") as file:
+            json.dump(result, file, indent=2)
+    return 1 if result["failures"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
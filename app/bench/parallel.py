@@ -0,0 +1,61 @@
+# app/bench/parallel.py
+# Shows how ParallelStats scales with the worker count: median and mode of a
+# large array against the single-core NumPy baseline used by StatsCache.
+
+import argparse
+import json
+import os
+import statistics
+import sys
+import time
+import numpy as np
+from app.plugins.calc.parallel import ParallelStats
+
+
+def time_call(func, repeat):
+    """Median wall time of `func()` in ms over `repeat` calls."""
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        samples.append((time.perf_counter() - start) * 1000)
+    return round(statistics.median(samples), 2)
+
+
+def single_core(values):
+    ordered = np.sort(values)
+    starts = np.flatnonzero(np.concatenate(([True], ordered[1:] != ordered[:-1])))
+    run_lengths = np.diff(np.append(starts, len(ordered)))
+    return np.median(ordered), ordered[starts[run_lengths == run_lengths.max()]]
+
+
+def measure_scaling(size, worker_counts, repeat=3, seed=0):
+    """Time single-core NumPy and ParallelStats at each worker count on `size` grade-like values."""
+    values = np.round(np.random.default_rng(seed).normal(75, 12, size), 1)
+    baseline = time_call(lambda: single_core(values), repeat)
+    result = {"size": size, "cpus": os.cpu_count(), "numpy_ms": baseline, "workers": {}}
+    for workers in worker_counts:
+        parallel = ParallelStats(workers)
+        elapsed = time_call(lambda: parallel.statistics(values), repeat)
+        result["workers"][str(workers)] = {"ms": elapsed, "speedup": round(baseline / elapsed, 2)}
+    return result
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Measure ParallelStats scaling across worker counts.")
+    parser.add_argument("--size", type=int, default=20_000_000, help="number of values")
+    parser.add_argument("--workers", default="1,2,4,8", help="comma-separated worker counts")
+    parser.add_argument("--repeat", type=int, default=3, help="timed runs per configuration")
+    parser.add_argument("--save", help="write the result to this JSON file")
+    args = parser.parse_args(argv)
+
+    result = measure_scaling(args.size, [int(count) for count in args.workers.split(",")], args.repeat)
+    print(json.dumps(result, indent=2))
+    if args.save:
+        with open(args.save, "w", encoding="utf-8") as file:
+            json.dump(result, file, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,87 @@
+# app/bench/startup.py
+# Tracks cold-start cost by running `python -X importtime main.py --script -`
+# with an empty script and comparing the result against a saved baseline.
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def parse_importtime(stderr):
+    """Return {module: (self_us, cumulative_us, depth)} from -X importtime output."""
+    imports = {}
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "imported package" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|", 2)
+        depth = (len(name) - len(name.lstrip()) - 1) // 2
+        imports[name.strip()] = (int(self_us), int(cumulative_us), depth)
+    return imports
+
+
+def measure_startup(runs=5):
+    """Start the app `runs` times and report median wall/import times in ms."""
+    env = dict(os.environ, LOG_LEVEL="ERROR", LOG_FILE=os.devnull)
+    wall_samples, import_samples = [], []
+    imports = {}
+    for _ in range(runs):
+        start = time.perf_counter()
+        proc = subprocess.run(
+            [sys.executable, "-X", "importtime", "main.py", "--script", "-"],
+            cwd=ROOT, input="", capture_output=True, text=True, env=env, check=True
+        )
+        wall_samples.append((time.perf_counter() - start) * 1000)
+        imports = parse_importtime(proc.stderr)
+        import_samples.append(sum(cumulative for _, cumulative, depth in imports.values() if depth == 0) / 1000)
+
+    slowest = sorted(imports.items(), key=lambda item: item[1][1], reverse=True)[:10]
+    return {
+        "wall_ms": round(statistics.median(wall_samples), 2),
+        "import_ms": round(statistics.median(import_samples), 2),
+        "pandas_imported": "pandas" in imports,
+        "top_imports": {name: round(cumulative / 1000, 2) for name, (_, cumulative, _) in slowest},
+    }
+
+
+def compare(result, baseline, threshold):
+    """List the metrics that are more than `threshold` (a fraction) above baseline."""
+    regressions = []
+    for metric in ("wall_ms", "import_ms"):
+        if metric in baseline and result[metric] > baseline[metric] * (1 + threshold):
+            regressions.append(f"{metric}: {result[metric]} > {baseline[metric]} (+{threshold:.0%})")
+    if result["pandas_imported"] and not baseline.get("pandas_imported", False):
+        regressions.append("pandas is imported at startup")
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Measure calculator startup time.")
+    parser.add_argument("--runs", type=int, default=5, help="number of cold starts to sample")
+    parser.add_argument("--baseline", help="JSON file from a previous --save to compare against")
+    parser.add_argument("--threshold", type=float, default=0.2, help="allowed slowdown as a fraction")
+    parser.add_argument("--save", help="write the result to this JSON file")
+    args = parser.parse_args(argv)
+
+    result = measure_startup(args.runs)
+    print(json.dumps(result, indent=2))
+    if args.save:
+        with open(args.save, "w", encoding="utf-8") as file:
+            json.dump(result, file, indent=2)
+
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as file:
+            regressions = compare(result, json.load(file), args.threshold)
+        for regression in regressions:
+            print(f"❌ Startup regression: {regression}", file=sys.stderr)
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,14 +1,161 @@
+import importlib
+import inspect
 from abc import ABC, abstractmethod
+import numpy as np
 
 class Command(ABC):
     @abstractmethod
     def execute(self):
         pass
 
+class LazyCommand:
+    """
+    Stand-in for a command class that imports its plugin module on first use.
+
+    Registering stubs keeps startup from importing every plugin (and pandas)
+    before the first prompt; once resolved it behaves like the class itself.
+    """
+    def __init__(self, module_name, class_name):
+        self.module_name = module_name
+        self.class_name = class_name
+        self._command_class = None
+
+    def resolve(self):
+        """Import the plugin module and return the real command class."""
+        if self._command_class is None:
+            module = importlib.import_module(self.module_name)
+            self._command_class = getattr(module, self.class_name)
+        return self._command_class
+
+    def __call__(self, *args, **kwargs):
+        return self.resolve()(*args, **kwargs)
+
+    def __repr__(self):
+        return f"LazyCommand({self.module_name}.{self.class_name})"
+
+class LazyHookCommand(LazyCommand):
+    """
+    Stand-in for a command that a plugin registers through its module-level
+    register_commands(command_handler, calculator) hook. On first use the hook
+    runs against the real handler and replaces every stub it registers.
+    """
+    def __init__(self, module_name, command_name, command_handler, calculator):
+        super().__init__(module_name, command_name)
+        self.command_handler = command_handler
+        self.calculator = calculator
+
+    def resolve(self):
+        if self._command_class is None:
+            module = importlib.import_module(self.module_name)
+            module.register_commands(self.command_handler, self.calculator)
+            self._command_class = self.command_handler.commands[self.class_name]
+        return self._command_class
+
+    def __repr__(self):
+        return f"LazyHookCommand({self.module_name}.register_commands: {self.class_name})"
+
+class CommandSpec:
+    """
+    Compiled form of a registered command: a bound `run(value=None,
+    cumulative=False)` callable plus the arity read from its signature.
+    `arguments` tells parsers how to read the command's arguments: 'none',
+    'numbers', or 'text' for classes that set `arguments = "text"`; classes
+    that set `value_optional = True` may also be given no numbers at all.
+    Text commands always receive a list of strings: a single string passed
+    to execute_command is wrapped here, not in every command.
+
+    Command classes get one reusable instance per handler; each run re-runs
+    __init__ on it with the new arguments instead of allocating a new object.
+    Pre-built instances are executed as they are and plain functions are
+    called with as many of (calculator, value) as they accept. Because of
+    the shared instances a handler must not run commands on several threads
+    at once; concurrent callers each get their own handler.
+    """
+
+    __slots__ = ("name", "target", "run", "takes_value", "value_required", "value_optional", "cumulative",
+                 "arguments")
+
+    def __init__(self, name, target, calculator):
+        self.name = name
+        self.target = target
+        self.cumulative = False  # Accepts cumulative=True to return every intermediate total
+
+        if isinstance(target, type):
+            params = [] if target.__init__ is object.__init__ else self._positional(target.__init__)[1:]
+            self.cumulative = any(param.name == "cumulative" for param in params)
+            self.run = self._bind_class(target, calculator, len(params))
+        elif hasattr(target, "execute"):
+            params = []
+            self.run = lambda value=None, cumulative=False: target.execute()
+        else:
+            params = self._positional(target)
+            self.run = self._bind_function(target, calculator, len(params))
+
+        value_param = params[1] if len(params) > 1 else None
+        self.takes_value = value_param is not None
+        self.value_required = value_param is not None and value_param.default is inspect.Parameter.empty
+        self.arguments = getattr(target, "arguments", "numbers") if self.takes_value else "none"
+        self.value_optional = self.takes_value and not self.value_required and getattr(target, "value_optional", False)
+        if self.arguments == "text":
+            self.run = self._text_arguments(self.run)
+
+    @staticmethod
+    def _positional(function):
+        kinds = (inspect.Parameter.POSITIONAL_ONLY, inspect.Parameter.POSITIONAL_OR_KEYWORD)
+        return [param for param in inspect.signature(function).parameters.values() if param.kind in kinds]
+
+    @staticmethod
+    def _text_arguments(run):
+        def run_text(value=None, cumulative=False):
+            return run([value] if isinstance(value, str) else value, cumulative)
+        return run_text
+
+    @staticmethod
+    def _bind_class(command_class, calculator, arity):
+        instance = command_class.__new__(command_class)
+        init, execute = command_class.__init__, command_class.execute
+
+        if arity == 0:
+            def run(value=None, cumulative=False):
+                init(instance)
+                return execute(instance)
+        elif arity == 1:
+            def run(value=None, cumulative=False):
+                init(instance, calculator)
+                return execute(instance)
+        else:
+            def run(value=None, cumulative=False):
+                if value is None:
+                    init(instance, calculator)
+                else:
+                    init(instance, calculator, value)
+                if cumulative:
+                    instance.cumulative = True
+                return execute(instance)
+        return run
+
+    @staticmethod
+    def _bind_function(function, calculator, arity):
+        if arity == 0:
+            return lambda value=None, cumulative=False: function()
+        if arity == 1:
+            return lambda value=None, cumulative=False: function(calculator)
+        return lambda value=None, cumulative=False: (
+            function(calculator) if value is None else function(calculator, value))
+
+    def __repr__(self):
+        return f"CommandSpec({self.name!r}, arguments={self.arguments!r}, cumulative={self.cumulative})"
+
+
 class CommandHandler:
-    def __init__(self, calculator=None):
+    def __init__(self, calculator=None, history=None):
         self.commands = {}
         self.calculator = calculator  # Initialize with a calculator instance
+        self.history = history  # Optional HistoryLog that records every executed command
+        self._dispatch = {}  # command name -> CommandSpec, compiled on first use
+        self.instrumentation = None  # Optional app.metrics.Instrumentation timing every command
+        self.profiler = None  # Optional app.profiler.SessionProfiler profiling chosen commands
+        self.journal = None  # Optional app.journal.Journal committing each command's changes
 
     def register_command(self, command_name, command_class):
         """
@@ -16,23 +163,82 @@ class CommandHandler:
         """
         if not command_name or not isinstance(command_name, str) or not command_class:
             raise ValueError("Invalid command name or command class.")
-        
+
         self.commands[command_name.lower()] = command_class  # Use lowercase for consistency
+        self._dispatch.pop(command_name.lower(), None)
+
+    def spec(self, command_name):
+        """
+        Return the compiled CommandSpec of a command (importing a lazy plugin
+        on first use), or None if no such command is registered.
+        """
+        spec = self._dispatch.get(command_name)
+        if spec is not None:
+            return spec
+        if command_name not in self.commands:
+            return None
+
+        # Swap a lazy stub for the real class before compiling it
+        target = self.commands[command_name]
+        if isinstance(target, LazyCommand):
+            target = self.commands[command_name] = target.resolve()
+        spec = self._dispatch[command_name] = CommandSpec(command_name, target, self.calculator)
+        if self.profiler is not None:
+            spec.run = self.profiler.wrap(command_name, spec.run)
+        if self.instrumentation is not None:
+            spec.run = self.instrumentation.wrap(command_name, spec.run)
+        return spec
+
+    def instrument(self, instrumentation):
+        """
+        Record every command through `instrumentation` (None switches it off).
+        The compiled specs are dropped so each is wrapped, or unwrapped, on
+        its next use; uninstrumented dispatch carries no extra cost.
+        """
+        self.instrumentation = instrumentation
+        self._dispatch.clear()
+
+    def attach_profiler(self, profiler):
+        """Run commands through `profiler.wrap` (None detaches it); like instrument(), specs recompile."""
+        self.profiler = profiler
+        self._dispatch.clear()
+
+    def record(self, command_name, command_value=None, result=None):
+        """Record a command executed outside execute_command (e.g. REPL specials)."""
+        if self.history is not None:
+            self.history.record(command_name, command_value, result)
+        if self.journal is not None:
+            self.journal.commit(self.calculator.value)
+
+    def record_many(self, command_name, command_values, results):
+        """Record a batch of operands applied outside execute_command."""
+        if self.history is not None:
+            self.history.record_many(command_name, command_values, results)
+        if self.journal is not None:
+            self.journal.commit(self.calculator.value)
 
     def execute_command(self, command_name, command_value=None):
         """Execute a registered command by its name and optional value."""
-        if command_name not in self.commands:
+        spec = self._dispatch.get(command_name) or self.spec(command_name)
+        if spec is None:
             print(f"Error: Command '{command_name}' not found.")
             return None
 
-        # Get the command class
-        command_class = self.commands[command_name]
-
-        # Create and execute the command
-        if command_value is not None:
-            command = command_class(self.calculator, command_value)
+        if self.history is None:
+            result = spec.run(command_value)
+        elif spec.cumulative and command_value is not None and np.ndim(command_value):
+            # Bulk operands are recorded one row per operand, so ask for the running totals
+            steps = spec.run(command_value, True)
+            if isinstance(steps, str):
+                self.history.record(command_name, None, None)
+                result = steps
+            else:
+                self.history.record_many(command_name, command_value, steps)
+                result = self.calculator.value
         else:
-            command = command_class(self.calculator)
-
-        return command.execute()
+            result = spec.run(command_value)
+            self.history.record(command_name, command_value, result)
 
+        if self.journal is not None:
+            self.journal.commit(self.calculator.value)
+        return result
@@ -0,0 +1,124 @@
+import numpy as np
+
+
+def _as_float(value):
+    """Coerce a command operand or result to a float, NaN when it is not numeric."""
+    if isinstance(value, (int, float, np.number)) and not isinstance(value, bool):
+        return float(value)
+    return np.nan
+
+
+class HistoryLog:
+    """
+    Append-only log of executed commands stored as columnar chunks.
+
+    Each row is an operation code (an index into the list of operation names)
+    plus float64 value and result columns. Rows are written into preallocated
+    chunks, so recording is O(1) amortized and nothing is copied until the log
+    is turned into a DataFrame for saving or analysis.
+    """
+
+    COLUMNS = ["Operation", "Value", "Result"]
+
+    def __init__(self, chunk_size=4096):
+        self.chunk_size = chunk_size
+        self.operations = []      # Operation names; a row's code indexes this list
+        self._codes_by_name = {}
+        self.journal = None  # Optional app.journal.Journal told about every recorded row
+        self.clear()
+
+    def clear(self):
+        """Drop every recorded row (the operation names are kept)."""
+        self._chunks = []
+        self._fill = 0
+        self._size = 0
+        self._new_chunk()
+
+    def _new_chunk(self):
+        self._codes = np.empty(self.chunk_size, dtype=np.int16)
+        self._values = np.empty(self.chunk_size, dtype=np.float64)
+        self._results = np.empty(self.chunk_size, dtype=np.float64)
+        self._chunks.append((self._codes, self._values, self._results))
+        self._fill = 0
+
+    def code_for(self, operation):
+        """Return the categorical code of an operation name, adding it if new."""
+        code = self._codes_by_name.get(operation)
+        if code is None:
+            code = len(self.operations)
+            self.operations.append(operation)
+            self._codes_by_name[operation] = code
+        return code
+
+    def record(self, operation, value=None, result=None):
+        """Append one executed command."""
+        if self._fill == self.chunk_size:
+            self._new_chunk()
+        self._codes[self._fill] = self.code_for(operation)
+        self._values[self._fill] = _as_float(value)
+        self._results[self._fill] = _as_float(result)
+        if self.journal is not None:
+            self.journal.history_added(operation, self._values[self._fill:self._fill + 1],
+                                       self._results[self._fill:self._fill + 1])
+        self._fill += 1
+        self._size += 1
+
+    def record_many(self, operation, values, results):
+        """Append one row per operand of a bulk command, filling chunks by slices."""
+        values = np.asarray(values, dtype=np.float64).ravel()
+        results = np.asarray(results, dtype=np.float64).ravel()
+        code = self.code_for(operation)
+        if self.journal is not None:
+            self.journal.history_added(operation, values, results)
+        start = 0
+        while start < values.size:
+            if self._fill == self.chunk_size:
+                self._new_chunk()
+            take = min(self.chunk_size - self._fill, values.size - start)
+            stop = self._fill + take
+            self._codes[self._fill:stop] = code
+            self._values[self._fill:stop] = values[start:start + take]
+            self._results[self._fill:stop] = results[start:start + take]
+            self._fill = stop
+            self._size += take
+            start += take
+
+    def adopt(self, operations, codes, values, results):
+        """
+        Take over saved columns (e.g. memory-mapped arrays) as a leading chunk
+        without copying; new rows go into fresh chunks after it.
+        """
+        self._codes_by_name = {}
+        self.operations = []
+        for operation in operations:
+            self.code_for(operation)
+        self._chunks = [(codes, values, results)]
+        self._size = len(codes)
+        self._new_chunk()
+
+    def columns(self):
+        """Return the (codes, values, results) columns as contiguous arrays."""
+        filled = list(self._chunks[:-1])  # every chunk but the current one is full
+        filled.append((self._codes[:self._fill], self._values[:self._fill], self._results[:self._fill]))
+        return tuple(np.concatenate(column) for column in zip(*filled))
+
+    def to_dataframe(self):
+        """Materialize the log as a DataFrame with a categorical Operation column."""
+        import pandas as pd  # pylint: disable=import-outside-toplevel
+        codes, values, results = self.columns()
+        operations = pd.Categorical.from_codes(codes, categories=self.operations) if self.operations \
+            else pd.Categorical([])
+        return pd.DataFrame({"Operation": operations, "Value": values, "Result": results})
+
+    def to_csv(self, path, index=False):
+        self.to_dataframe().to_csv(path, index=index)
+
+    @property
+    def empty(self):
+        return self._size == 0
+
+    def __len__(self):
+        return self._size
+
+    def __repr__(self):
+        return repr(self.to_dataframe())
@@ -0,0 +1,325 @@
+# app/journal/__init__.py
+# Write-ahead journal of the session state: every executed command appends
+# one checksummed frame describing what it changed (values appended,
+# truncated or cleared, history rows, the new total). Frames are fsynced in
+# groups, a snapshot periodically compacts the journal, and on startup the
+# frames written after the latest snapshot are replayed.
+
+import logging
+import os
+import struct
+import threading
+import time
+import zlib
+import numpy as np
+from app.snapshot import write_snapshot
+
+MAGIC = b"CALCJRNL"
+VERSION = 1
+_FILE_HEADER = struct.Struct("<8sI4x")  # magic, version
+_FRAME = struct.Struct("<IIQ")  # payload length, crc32 of the payload, sequence number
+_COUNT = struct.Struct("<Q")
+_TOTAL = struct.Struct("<d")
+_NAME = struct.Struct("<H")
+
+# Record types inside a frame's payload
+VALUES, CLEAR, TOTAL, HISTORY, TRUNCATE = b"V", b"C", b"T", b"H", b"R"
+
+
+def _floats(values):
+    return np.ascontiguousarray(values, dtype=np.float64).ravel()
+
+
+def encode_values(nums):
+    nums = _floats(nums)
+    return VALUES + _COUNT.pack(nums.size) + nums.tobytes()
+
+
+def encode_history(operation, values, results):
+    name = str(operation).encode("utf-8")
+    values, results = _floats(values), _floats(results)
+    return HISTORY + _NAME.pack(len(name)) + name + _COUNT.pack(values.size) + values.tobytes() + results.tobytes()
+
+
+def decode_records(payload):
+    """Yield (type, data) for each record of a frame payload."""
+    view = memoryview(payload)
+    offset = 0
+    while offset < len(view):
+        kind = bytes(view[offset:offset + 1])
+        offset += 1
+        if kind == VALUES:
+            (count,) = _COUNT.unpack_from(view, offset)
+            offset += _COUNT.size
+            yield kind, np.frombuffer(view, dtype=np.float64, count=count, offset=offset)
+            offset += count * 8
+        elif kind == CLEAR:
+            yield kind, None
+        elif kind == TOTAL:
+            yield kind, _TOTAL.unpack_from(view, offset)[0]
+            offset += _TOTAL.size
+        elif kind == TRUNCATE:
+            yield kind, _COUNT.unpack_from(view, offset)[0]
+            offset += _COUNT.size
+        elif kind == HISTORY:
+            (length,) = _NAME.unpack_from(view, offset)
+            offset += _NAME.size
+            operation = bytes(view[offset:offset + length]).decode("utf-8")
+            offset += length
+            (count,) = _COUNT.unpack_from(view, offset)
+            offset += _COUNT.size
+            values = np.frombuffer(view, dtype=np.float64, count=count, offset=offset)
+            results = np.frombuffer(view, dtype=np.float64, count=count, offset=offset + count * 8)
+            offset += count * 16
+            yield kind, (operation, values, results)
+        else:
+            raise ValueError(f"Unknown journal record type {kind!r}.")
+
+
+def read_frames(path):
+    """
+    Return ([(sequence, payload)], valid_length) for the intact frames of a
+    journal. Reading stops at the first truncated or corrupt frame, which
+    is what a crash in the middle of a write leaves behind.
+    """
+    with open(path, "rb") as file:
+        data = file.read()
+    if len(data) < _FILE_HEADER.size:
+        return [], 0
+    magic, version = _FILE_HEADER.unpack_from(data)
+    if magic != MAGIC:
+        raise ValueError(f"'{path}' is not a calculator journal.")
+    if version != VERSION:
+        raise ValueError(f"Unsupported journal version {version}.")
+
+    frames, offset = [], _FILE_HEADER.size
+    while offset + _FRAME.size <= len(data):
+        length, checksum, sequence = _FRAME.unpack_from(data, offset)
+        start, end = offset + _FRAME.size, offset + _FRAME.size + length
+        if end > len(data) or zlib.crc32(data[start:end]) != checksum:
+            break
+        frames.append((sequence, data[start:end]))
+        offset = end
+    return frames, offset
+
+
+class Journal:
+    """
+    Append-only binary journal for one calculator session.
+
+    CommandHandler, ValueStore and HistoryLog report their changes while a
+    command runs; commit() closes the command's frame with the new total
+    (changes made outside a command go into the next command's frame).
+    Frames are buffered and written with one fsync per group: by a
+    background thread every `sync_interval` seconds, or inline once
+    `group_size` frames are waiting. A `sync_interval` of 0 fsyncs every
+    commit before it returns. After `snapshot_every` frames, or
+    `snapshot_bytes` of journal, checkpoint() writes a snapshot and empties
+    the journal, which bounds the replay time after a crash.
+
+    Labeled grades (the per-class table) are not journaled, just as they
+    are not part of snapshots.
+    """
+
+    def __init__(self, path, snapshot_path=None, sync_interval=0.05, group_size=256, snapshot_every=10_000,
+                 snapshot_bytes=64 << 20):
+        self.path = path
+        self.snapshot_path = snapshot_path or f"{path}.snapshot"
+        self.sync_interval = sync_interval
+        self.group_size = group_size
+        self.snapshot_every = snapshot_every
+        self.snapshot_bytes = snapshot_bytes
+        self.sequence = 0  # Sequence number of the last committed frame
+        self.calculator = None
+        self.history = None
+        self.command_handler = None
+        self._records = []  # Records of the command being executed
+        self._pending = bytearray()  # Committed frames not written yet
+        self._pending_frames = 0
+        self._frames_since_snapshot = 0
+        self._size = 0  # Bytes in the journal file, written or pending
+        self._lock = threading.Lock()  # Guards the pending buffer
+        self._io_lock = threading.Lock()  # Orders writes and fsyncs
+        self._file = None
+        self._committed_total = None  # Total in the last committed frame
+        self._stop = threading.Event()
+        self._flusher = None
+
+    @classmethod
+    def from_settings(cls, settings):
+        """
+        Build a journal from JOURNAL_PATH, SNAPSHOT_PATH, JOURNAL_SYNC_MS and
+        JOURNAL_SNAPSHOT_EVERY; None when JOURNAL_PATH is not set.
+        """
+        path = settings.get('JOURNAL_PATH')
+        if not path:
+            return None
+        return cls(path, settings.get('SNAPSHOT_PATH') or None,
+                   sync_interval=float(settings.get('JOURNAL_SYNC_MS', 50)) / 1000,
+                   snapshot_every=int(settings.get('JOURNAL_SNAPSHOT_EVERY', 10_000)))
+
+    # Recovery
+
+    def recover(self, calculator, history, after_sequence=0):
+        """
+        Replay the frames newer than `after_sequence` (the sequence stored in
+        the snapshot already loaded) onto `calculator` and `history`, and
+        cut off a torn tail. Returns the number of frames replayed.
+        """
+        if not os.path.exists(self.path):
+            self.sequence = after_sequence
+            return 0
+        start = time.perf_counter()
+        frames, valid_length = read_frames(self.path)
+        replayed = 0
+        for sequence, payload in frames:
+            if sequence <= after_sequence:
+                continue  # Already in the snapshot: the journal was not emptied after it was written
+            self.apply(payload, calculator, history)
+            replayed += 1
+        self.sequence = max([after_sequence] + [sequence for sequence, _ in frames])
+        self._frames_since_snapshot = replayed
+
+        if valid_length < os.path.getsize(self.path):
+            logging.warning("Journal '%s' had a torn tail; truncating it to %s bytes.", self.path, valid_length)
+            with open(self.path, "r+b") as file:
+                file.truncate(valid_length)
+        logging.info("Replayed %s journal frames from '%s' in %.3fs.", replayed, self.path,
+                     time.perf_counter() - start)
+        return replayed
+
+    @staticmethod
+    def apply(payload, calculator, history):
+        """Apply one frame's records to a calculator and history."""
+        for kind, data in decode_records(payload):
+            if kind == VALUES:
+                calculator.values.extend(data)
+            elif kind == CLEAR:
+                calculator.values = ()
+            elif kind == TRUNCATE:
+                calculator.truncate_values(data)
+            elif kind == TOTAL:
+                calculator.value = data
+            elif history is not None:
+                history.record_many(*data)
+
+    # Recording
+
+    def attach(self, calculator, history, command_handler):
+        """Start journaling the changes of a recovered session and open the file for appending."""
+        self.calculator, self.history, self.command_handler = calculator, history, command_handler
+        self._committed_total = float(calculator.value)
+        calculator.values.journal = self
+        if history is not None:
+            history.journal = self
+        command_handler.journal = self
+
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._file = open(self.path, "ab")  # pylint: disable=consider-using-with
+        if self._file.tell() == 0:
+            self._file.write(_FILE_HEADER.pack(MAGIC, VERSION))
+            self._sync()
+        self._size = self._file.tell()
+        if self.sync_interval > 0:
+            self._stop.clear()
+            self._flusher = threading.Thread(target=self._flush_periodically, name="journal-flusher", daemon=True)
+            self._flusher.start()
+
+    # Changes reported once the journal is closed are dropped
+
+    def values_added(self, nums):
+        if self._file is not None:
+            self._records.append(encode_values(nums))
+
+    def values_cleared(self):
+        if self._file is not None:
+            self._records.append(CLEAR)
+
+    def values_truncated(self, size):
+        if self._file is not None:
+            self._records.append(TRUNCATE + _COUNT.pack(size))
+
+    def history_added(self, operation, values, results):
+        if self._file is not None:
+            self._records.append(encode_history(operation, values, results))
+
+    def commit(self, total):
+        """
+        Close the current command's frame with the calculator total. A
+        command that changed nothing (no records, same total) writes no frame.
+        """
+        total = float(total)
+        if self._file is None or (not self._records and total == self._committed_total):
+            return
+        self._committed_total = total
+        self._records.append(TOTAL + _TOTAL.pack(total))
+        payload = b"".join(self._records)
+        self._records.clear()
+        self.sequence += 1
+        frame = _FRAME.pack(len(payload), zlib.crc32(payload), self.sequence) + payload
+        with self._lock:
+            self._pending += frame
+            self._pending_frames += 1
+            waiting = self._pending_frames
+        self._size += len(frame)
+        self._frames_since_snapshot += 1
+
+        if self.sync_interval <= 0 or waiting >= self.group_size:
+            self.flush()
+        if self._frames_since_snapshot >= self.snapshot_every or self._size >= self.snapshot_bytes:
+            self.checkpoint()
+
+    def flush(self):
+        """Write the committed frames and fsync them as one group."""
+        with self._io_lock:
+            with self._lock:
+                data, self._pending = self._pending, bytearray()
+                self._pending_frames = 0
+            if data and self._file is not None:
+                self._file.write(data)
+                self._sync()
+
+    def _sync(self):
+        self._file.flush()
+        os.fsync(self._file.fileno())
+
+    def _flush_periodically(self):
+        while not self._stop.wait(self.sync_interval):
+            if self._pending_frames:
+                self.flush()
+
+    def checkpoint(self):
+        """Snapshot the session and empty the journal; frames up to `sequence` are in the snapshot."""
+        self.flush()
+        write_snapshot(self.snapshot_path, self.calculator.value, self.calculator.values.view(),
+                       self.calculator.stats.moments(), self.history, journal_sequence=self.sequence)
+        with self._io_lock:
+            self._file.truncate(_FILE_HEADER.size)
+            self._sync()
+        self._size = _FILE_HEADER.size
+        self._frames_since_snapshot = 0
+        logging.info("Journal checkpoint: snapshot '%s' at sequence %s.", self.snapshot_path, self.sequence)
+
+    def close(self, checkpoint=False):
+        """
+        Write what is pending (and optionally compact into a snapshot), then
+        stop journaling: the calculator, history and handler let go of the journal.
+        """
+        if self._file is None:
+            return
+        if self._flusher is not None:
+            self._stop.set()
+            self._flusher.join()
+            self._flusher = None
+        if checkpoint:
+            self.checkpoint()
+        else:
+            self.flush()
+        self._file.close()
+        self._file = None
+        self._records.clear()
+        for owner in (self.calculator.values, self.history, self.command_handler):
+            if owner is not None and owner.journal is self:
+                owner.journal = None
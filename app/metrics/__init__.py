@@ -0,0 +1,196 @@
+# app/metrics/__init__.py
+# Per-command instrumentation for CommandHandler: call counts, latency
+# histograms, exceptions and, optionally, tracemalloc allocation deltas.
+# Nothing here runs unless a handler is instrumented, so the default
+# dispatch path does not pay for it.
+
+import json
+import logging
+import math
+import os
+import time
+import tracemalloc
+
+DEFAULT_METRICS_FILE = "./logs/command_metrics.json"
+
+
+class LatencyHistogram:
+    """
+    Log-linear histogram of durations in ns: exact below 16 ns, then eight
+    buckets per power of two (at most 12.5% wide). Inserts are a couple of
+    integer operations into a fixed list, whatever the number of samples.
+    """
+
+    SUB_BUCKETS = 8
+    SIZE = (64 - 2) * SUB_BUCKETS
+
+    def __init__(self):
+        self.counts = [0] * self.SIZE
+        self.total = 0
+        self.max = 0
+
+    @classmethod
+    def bucket(cls, ns):
+        if ns < 2 * cls.SUB_BUCKETS:
+            return ns
+        shift = ns.bit_length() - 4
+        return shift * cls.SUB_BUCKETS + (ns >> shift)
+
+    @classmethod
+    def upper_bound(cls, bucket):
+        """Largest duration that falls into `bucket`."""
+        if bucket < 2 * cls.SUB_BUCKETS:
+            return bucket
+        shift, top = divmod(bucket, cls.SUB_BUCKETS)
+        return ((top + cls.SUB_BUCKETS + 1) << (shift - 1)) - 1
+
+    def add(self, ns, times=1):
+        self.counts[self.bucket(ns)] += times
+        self.total += times
+        if ns > self.max:
+            self.max = ns
+
+    def percentile(self, p):
+        """Upper bound of the bucket holding the p-th percentile (0-100), capped at the slowest sample."""
+        if not self.total:
+            return 0
+        rank = max(1, math.ceil(self.total * p / 100))
+        seen = 0
+        for bucket, count in enumerate(self.counts):
+            seen += count
+            if seen >= rank:
+                return min(self.upper_bound(bucket), self.max)
+        return self.max
+
+
+class CommandMetrics:
+    """Everything recorded for one command name."""
+
+    __slots__ = ("count", "total_ns", "latency", "errors", "allocated", "peak")
+
+    def __init__(self):
+        self.count = 0
+        self.total_ns = 0
+        self.latency = LatencyHistogram()
+        self.errors = {}  # Exception class name -> count
+        self.allocated = 0  # Net bytes still allocated after the calls
+        self.peak = 0  # Largest extra memory of a single call
+
+    def observe(self, ns, calls=1):
+        """Add `calls` calls that took `ns` together (each is counted at the average)."""
+        self.count += calls
+        self.total_ns += ns
+        self.latency.add(ns // calls, calls)
+
+    def summary(self, trace_allocations=False):
+        summary = {
+            "count": self.count,
+            "errors": dict(self.errors),
+            "total_ms": round(self.total_ns / 1e6, 3),
+            "mean_us": round(self.total_ns / self.count / 1e3, 2) if self.count else 0.0,
+            "p50_us": round(self.latency.percentile(50) / 1e3, 2),
+            "p99_us": round(self.latency.percentile(99) / 1e3, 2),
+            "max_us": round(self.latency.max / 1e3, 2),
+        }
+        if trace_allocations:
+            summary["allocated_kb"] = round(self.allocated / 1024, 1)
+            summary["peak_kb"] = round(self.peak / 1024, 1)
+        return summary
+
+
+class Instrumentation:
+    """
+    Collects CommandMetrics for the commands of one or more handlers.
+
+    CommandHandler.instrument() makes every compiled CommandSpec run through
+    wrap(), which times the call with perf_counter_ns and counts exceptions
+    by type before re-raising them. With trace_allocations the wrapper also
+    records the net and peak tracemalloc memory of each call; tracing slows
+    every allocation in the process, so it is off unless asked for.
+    """
+
+    def __init__(self, trace_allocations=False):
+        self.trace_allocations = trace_allocations
+        self.metrics = {}
+        self.started = time.time()
+        self._started_tracing = False
+        if trace_allocations and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self._started_tracing = True
+
+    def _metrics(self, command_name):
+        metrics = self.metrics.get(command_name)
+        if metrics is None:
+            metrics = self.metrics[command_name] = CommandMetrics()
+        return metrics
+
+    def wrap(self, command_name, run):
+        """Return `run` (a CommandSpec.run callable) recording into the metrics of `command_name`."""
+        metrics = self._metrics(command_name)
+        clock = time.perf_counter_ns
+
+        def timed(value=None, cumulative=False):
+            start = clock()
+            try:
+                return run(value, cumulative)
+            except Exception as e:
+                name = type(e).__name__
+                metrics.errors[name] = metrics.errors.get(name, 0) + 1
+                raise
+            finally:
+                metrics.observe(clock() - start)
+
+        if not self.trace_allocations:
+            return timed
+
+        def traced(value=None, cumulative=False):
+            before = tracemalloc.get_traced_memory()[0]
+            tracemalloc.reset_peak()
+            try:
+                return timed(value, cumulative)
+            finally:
+                current, peak = tracemalloc.get_traced_memory()
+                metrics.allocated += current - before
+                metrics.peak = max(metrics.peak, peak - before)
+
+        return traced
+
+    def record(self, command_name, ns, calls=1):
+        """
+        Record commands that ran outside a wrapped spec, e.g. the bulk
+        calculator call script mode makes for a run of arithmetic lines.
+        """
+        self._metrics(command_name).observe(ns, calls)
+
+    def reset(self):
+        """Forget what was recorded; wrapped commands keep recording into fresh metrics."""
+        for command_name in self.metrics:
+            self.metrics[command_name].__init__()
+        self.started = time.time()
+
+    def summary(self):
+        """{command: count, errors, total/mean/p50/p99/max latency[, allocations]}, slowest total first."""
+        ordered = sorted(self.metrics.items(), key=lambda item: item[1].total_ns, reverse=True)
+        return {name: metrics.summary(self.trace_allocations) for name, metrics in ordered if metrics.count}
+
+    def dump(self, path=DEFAULT_METRICS_FILE):
+        """Write the summary as JSON to `path` and return the path."""
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        document = {
+            "started": self.started,
+            "written": time.time(),
+            "trace_allocations": self.trace_allocations,
+            "commands": self.summary(),
+        }
+        with open(path, "w", encoding="utf-8") as file:
+            json.dump(document, file, indent=2)
+        logging.info("Command metrics written to '%s'.", path)
+        return path
+
+    def close(self):
+        """Stop tracemalloc if this instrumentation started it."""
+        if self._started_tracing:
+            tracemalloc.stop()
+            self._started_tracing = False
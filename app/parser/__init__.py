@@ -0,0 +1,190 @@
+# app/parser/__init__.py
+# Command-line parsing shared by the REPL, script mode and the server: each
+# line is tokenized once, ';' chains several commands, and how a command's
+# arguments are read comes from its compiled CommandSpec (none, numbers or
+# text) rather than from hardcoded name lists.
+
+import numpy as np
+from app.plugins.calc import parse_operands
+
+# Handled by the caller rather than dispatched; they take no arguments
+DIRECTIVES = ("exit", "print", "reset")
+ERROR = -1  # Op code of a command that failed to parse
+
+
+class ParseError(ValueError):
+    """A command that cannot be run as written; the message is shown to the user."""
+
+
+class ParsedCommand:
+    __slots__ = ("name", "value")
+
+    def __init__(self, name, value=None):
+        self.name = name
+        self.value = value
+
+    def __eq__(self, other):
+        if not isinstance(other, ParsedCommand):
+            return NotImplemented
+        return self.name == other.name and bool(np.array_equal(self.value, other.value))
+
+    __hash__ = None
+
+    def __repr__(self):
+        return f"ParsedCommand({self.name!r}, {self.value!r})"
+
+
+def tokenize(line):
+    """Split a line into the token lists of its ';'-separated commands; '#' starts a comment line."""
+    if line.lstrip().startswith("#"):
+        return []
+    return [parts for parts in (segment.split() for segment in line.split(";")) if parts]
+
+
+class CommandBatch:
+    """
+    A parsed script as parallel arrays with one row per command: `ops` holds
+    the op code (an index into `names`, or ERROR), `lines` the source line
+    and `starts` / `counts` the slice of the flat float64 `operands` holding
+    its numbers. Text arguments and error messages are kept by row in `text`.
+    """
+
+    def __init__(self, names, ops, lines, starts, counts, operands, text):
+        self.names = names
+        self.ops = ops
+        self.lines = lines
+        self.starts = starts
+        self.counts = counts
+        self.operands = operands
+        self.text = text
+
+    def code(self, name):
+        """Op code of `name`, or None when no row uses it."""
+        return self.names.index(name) if name in self.names else None
+
+    def operand_slice(self, row):
+        return self.operands[self.starts[row]:self.starts[row] + self.counts[row]]
+
+    def __len__(self):
+        return len(self.ops)
+
+    def __repr__(self):
+        return f"CommandBatch({len(self)} commands, {len(self.operands)} operands)"
+
+
+class CommandParser:
+    """Parses command lines against the commands registered on a CommandHandler."""
+
+    def __init__(self, command_handler, directives=DIRECTIVES):
+        self.command_handler = command_handler
+        self.directives = directives
+
+    def arguments(self, command_name):
+        """'none', 'numbers' or 'text' for a command; raises ParseError if it is unknown."""
+        if command_name in self.directives:
+            return "none"
+        spec = self.command_handler.spec(command_name)
+        if spec is None:
+            raise ParseError(f"Unknown command '{command_name}'.")
+        return spec.arguments
+
+    def value_optional(self, command_name):
+        """True for a numbers command that also runs without any (e.g. 'percentile' defaults to 50)."""
+        spec = self.command_handler.spec(command_name)
+        return spec is not None and spec.value_optional
+
+    def parse_command(self, parts):
+        """Turn one command's tokens into a ParsedCommand."""
+        command_name = parts[0]
+        arguments = self.arguments(command_name)
+        if arguments == "none":
+            if len(parts) > 1:
+                raise ParseError(f"'{command_name}' does not take a value.")
+            return ParsedCommand(command_name)
+        if arguments == "text":
+            return ParsedCommand(command_name, parts[1:])
+        if len(parts) < 2:
+            if self.value_optional(command_name):
+                return ParsedCommand(command_name)
+            raise ParseError("Please enter a command followed by a value.")
+        try:
+            return ParsedCommand(command_name, parse_operands(parts[1:]))
+        except (ValueError, OSError) as e:
+            raise ParseError("Please enter a valid number.") from e
+
+    def parse(self, line):
+        """Parse a line ('add 5; multiply 2; mean') into its commands."""
+        return [self.parse_command(parts) for parts in tokenize(line)]
+
+    def parse_batch(self, text):
+        """
+        Parse a whole buffer of lines into a CommandBatch. Lines that fail
+        to parse become ERROR rows carrying their message, so the caller can
+        report them in order; numbers are converted in a single pass.
+        """
+        names, codes = [], {}
+        ops, lines, counts, tokens, text_args = [], [], [], [], {}
+
+        def add_row(code, line_number, operands=()):
+            ops.append(code)
+            lines.append(line_number)
+            counts.append(len(operands))
+            tokens.extend(operands)
+
+        for line_number, line in enumerate(text.splitlines(), start=1):
+            for parts in tokenize(line):
+                command_name = parts[0]
+                try:
+                    arguments = self.arguments(command_name)
+                except ParseError as e:
+                    text_args[len(ops)] = str(e)
+                    add_row(ERROR, line_number)
+                    continue
+                code = codes.get(command_name)
+                if code is None:
+                    code = codes[command_name] = len(names)
+                    names.append(command_name)
+
+                if arguments == "text":
+                    text_args[len(ops)] = parts[1:]
+                    add_row(code, line_number)
+                elif arguments == "none" and len(parts) > 1:
+                    text_args[len(ops)] = f"'{command_name}' does not take a value."
+                    add_row(ERROR, line_number)
+                elif arguments == "none" or (len(parts) < 2 and self.value_optional(command_name)):
+                    add_row(code, line_number)
+                elif len(parts) < 2:
+                    text_args[len(ops)] = "Please enter a command followed by a value."
+                    add_row(ERROR, line_number)
+                elif parts[1].startswith("@"):
+                    try:
+                        add_row(code, line_number, parse_operands(parts[1:]).tolist())
+                    except (ValueError, OSError):
+                        text_args[len(ops)] = "Please enter a valid number."
+                        add_row(ERROR, line_number)
+                else:
+                    add_row(code, line_number, parts[1:])
+
+        row_counts = np.array(counts, dtype=np.int32)
+        op_codes = np.array(ops, dtype=np.int16)
+        try:
+            operands = np.array(tokens, dtype=np.float64)
+        except ValueError:
+            operands = self._convert_rows(tokens, op_codes, row_counts, text_args)
+        starts = np.zeros(len(row_counts), dtype=np.int32)
+        np.cumsum(row_counts[:-1], out=starts[1:])
+        return CommandBatch(names, op_codes, np.array(lines, dtype=np.int32), starts, row_counts, operands, text_args)
+
+    @staticmethod
+    def _convert_rows(tokens, ops, counts, text_args):
+        """Slow path for a batch with bad numbers: mark those rows as errors and drop their operands."""
+        converted, offset = [], 0
+        for row, count in enumerate(counts.tolist()):
+            try:
+                converted.append(np.array(tokens[offset:offset + count], dtype=np.float64))
+            except ValueError:
+                ops[row] = ERROR
+                counts[row] = 0
+                text_args[row] = "Please enter a valid number."
+            offset += count
+        return np.concatenate(converted) if converted else np.empty(0)
@@ -0,0 +1,196 @@
+# app/plugins/__init__.py
+# Plugin discovery: finds the commands in every app/plugins package (and in
+# installed "app.plugins" entry points) without importing them, and caches
+# the result in a manifest keyed by file mtimes.
+
+import ast
+import importlib
+import importlib.metadata
+import json
+import logging
+import os
+import pkgutil
+import re
+import site
+
+from app.commands import CommandHandler, LazyCommand, LazyHookCommand
+
+PLUGIN_DIR = os.path.dirname(os.path.abspath(__file__))
+PLUGIN_PACKAGE = "app.plugins"
+ENTRY_POINT_GROUP = "app.plugins"
+MANIFEST_VERSION = 1
+
+
+def command_name_for(class_name):
+    """Default command name of a class: 'StandardDeviationCommand' -> 'standard_deviation'."""
+    base = class_name[:-len("Command")] if class_name.endswith("Command") else class_name
+    return re.sub(r"(?<!^)(?=[A-Z])", "_", base).lower()
+
+
+def scan_module_source(path):
+    """
+    Read a plugin module with `ast` (no import) and return its commands as
+    {command_name: class_name} plus whether it defines a register_commands hook.
+    A class can override its default name with a `command_name = "..."` attribute.
+    """
+    with open(path, encoding="utf-8") as file:
+        tree = ast.parse(file.read(), filename=path)
+
+    commands = {}
+    has_hook = False
+    for node in tree.body:
+        if isinstance(node, ast.FunctionDef) and node.name == "register_commands":
+            has_hook = True
+        elif isinstance(node, ast.ClassDef):
+            bases = {base.id if isinstance(base, ast.Name) else getattr(base, "attr", None) for base in node.bases}
+            if "Command" not in bases:
+                continue
+            name = command_name_for(node.name)
+            for statement in node.body:
+                if (isinstance(statement, ast.Assign) and isinstance(statement.value, ast.Constant)
+                        and any(getattr(target, "id", None) == "command_name" for target in statement.targets)):
+                    name = statement.value.value
+            commands[name] = node.name
+    return commands, has_hook
+
+
+def hook_command_names(module_name):
+    """Import a module and list the command names its register_commands hook registers."""
+    recorder = CommandHandler()
+    importlib.import_module(module_name).register_commands(recorder, None)
+    return sorted(recorder.commands)
+
+
+def _module_path(module_info):
+    if module_info.ispkg:
+        return os.path.join(module_info.module_finder.path, module_info.name.rsplit(".", 1)[-1], "__init__.py")
+    return os.path.join(module_info.module_finder.path, module_info.name.rsplit(".", 1)[-1] + ".py")
+
+
+def scan_plugin_dir(plugin_dir=PLUGIN_DIR, package=PLUGIN_PACKAGE):
+    """Walk a plugin directory with pkgutil and describe every plugin module."""
+    plugins = {}
+    for module_info in pkgutil.iter_modules([plugin_dir], package + "."):
+        path = _module_path(module_info)
+        if not os.path.exists(path):
+            continue
+        commands, has_hook = scan_module_source(path)
+        if not commands and not has_hook:
+            continue
+        plugins[module_info.name] = {
+            "path": path,
+            "mtime": os.stat(path).st_mtime,
+            "commands": commands,
+            "hook_commands": hook_command_names(module_info.name) if has_hook else [],
+        }
+    return plugins
+
+
+def _site_mtimes():
+    """mtimes of the site-packages directories, which change when distributions are (un)installed."""
+    directories = site.getsitepackages() + [site.getusersitepackages()]
+    return {directory: os.stat(directory).st_mtime for directory in directories if os.path.isdir(directory)}
+
+
+def scan_entry_points(group=ENTRY_POINT_GROUP):
+    """
+    Describe installed entry points: 'name = module:Class' registers one command,
+    'name = module' means the module has a register_commands hook.
+    """
+    entries = []
+    for entry_point in importlib.metadata.entry_points(group=group):
+        if entry_point.attr:
+            entries.append({"name": entry_point.name, "module": entry_point.module, "class": entry_point.attr})
+        else:
+            for name in hook_command_names(entry_point.module):
+                entries.append({"name": name, "module": entry_point.module, "class": None})
+    return entries
+
+
+def _plugins_fresh(manifest, plugin_dir):
+    if manifest.get("plugin_dir") != plugin_dir or manifest.get("plugin_dir_mtime") != os.stat(plugin_dir).st_mtime:
+        return False
+    for plugin in manifest["plugins"].values():
+        try:
+            if os.stat(plugin["path"]).st_mtime != plugin["mtime"]:
+                return False
+        except OSError:
+            return False
+    return True
+
+
+def load_manifest(manifest_path):
+    try:
+        with open(manifest_path, encoding="utf-8") as file:
+            manifest = json.load(file)
+    except (OSError, ValueError):
+        return None
+    return manifest if manifest.get("version") == MANIFEST_VERSION else None
+
+
+def save_manifest(manifest_path, manifest):
+    try:
+        directory = os.path.dirname(manifest_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with open(manifest_path, "w", encoding="utf-8") as file:
+            json.dump(manifest, file, indent=2)
+    except OSError as e:
+        logging.warning("Could not write plugin manifest '%s': %s", manifest_path, e)
+
+
+def build_manifest(manifest_path=None, plugin_dir=PLUGIN_DIR, package=PLUGIN_PACKAGE):
+    """Return the discovery manifest, rescanning only the parts whose mtimes changed."""
+    manifest = load_manifest(manifest_path) if manifest_path else None
+    changed = False
+
+    if manifest is None or manifest.get("package") != package or not _plugins_fresh(manifest, plugin_dir):
+        plugins = scan_plugin_dir(plugin_dir, package)
+        entry_points = manifest.get("entry_points") if manifest else None
+        manifest = {
+            "version": MANIFEST_VERSION,
+            "package": package,
+            "plugin_dir": plugin_dir,
+            "plugin_dir_mtime": os.stat(plugin_dir).st_mtime,
+            "plugins": plugins,
+            "entry_points": entry_points,
+        }
+        changed = True
+        logging.info("Scanned %s plugin modules in '%s'.", len(plugins), plugin_dir)
+
+    site_mtimes = _site_mtimes()
+    if not manifest.get("entry_points") or manifest["entry_points"]["site_mtimes"] != site_mtimes:
+        manifest["entry_points"] = {"site_mtimes": site_mtimes, "commands": scan_entry_points()}
+        changed = True
+
+    if changed and manifest_path:
+        save_manifest(manifest_path, manifest)
+    return manifest
+
+
+def discover_commands(command_handler, calculator, manifest_path=None, plugin_dir=PLUGIN_DIR, package=PLUGIN_PACKAGE):
+    """
+    Return {command_name: stub} for every discovered command. Nothing is
+    imported here; each stub imports its plugin (or runs its hook) on first use.
+    """
+    manifest = build_manifest(manifest_path, plugin_dir, package)
+    return commands_from_manifest(manifest, command_handler, calculator)
+
+
+def commands_from_manifest(manifest, command_handler, calculator):
+    """Build the {command_name: stub} map of a manifest for one handler/calculator pair."""
+    commands = {}
+    for module_name, plugin in sorted(manifest["plugins"].items()):
+        if plugin["hook_commands"]:
+            for name in plugin["hook_commands"]:
+                commands[name] = LazyHookCommand(module_name, name, command_handler, calculator)
+        else:
+            for name, class_name in plugin["commands"].items():
+                commands[name] = LazyCommand(module_name, class_name)
+
+    for entry in manifest["entry_points"]["commands"]:
+        if entry["class"]:
+            commands[entry["name"]] = LazyCommand(entry["module"], entry["class"])
+        else:
+            commands[entry["name"]] = LazyHookCommand(entry["module"], entry["name"], command_handler, calculator)
+    return commands
@@ -1,46 +1,81 @@
 # app/plugins/calc/__init__.py
 
+import numpy as np
 from app.commands import Command
 
 
+def parse_operands(tokens):
+    """
+    Turn the arguments of an arithmetic command into its operand(s).
+
+    A single number stays a float, several numbers become a float64 array and
+    '@path' loads an array from a .npy file (or a whitespace-separated text file).
+    """
+    if len(tokens) == 1 and tokens[0].startswith('@'):
+        path = tokens[0][1:]
+        if path.endswith('.npy'):
+            return np.load(path).astype(np.float64, copy=False).ravel()
+        return np.loadtxt(path, dtype=np.float64, ndmin=1).ravel()
+    if len(tokens) == 1:
+        return float(tokens[0])
+    return np.array(tokens, dtype=np.float64)
+
+
 class AddCommand(Command):
-    def __init__(self, calculator, value=0):
+    def __init__(self, calculator, value=0, cumulative=False):
         self.calculator = calculator
         self.value = value
+        self.cumulative = cumulative  # Return every intermediate total for bulk operands
 
     def execute(self):
+        if np.ndim(self.value):
+            steps = self.calculator.add_values(self.value, cumulative=self.cumulative)
+            return steps if self.cumulative else self.calculator.value
         self.calculator.add_value(self.value)
         return self.calculator.value
 
 
 class SubtractCommand(Command):
-    def __init__(self, calculator, value=0):
+    def __init__(self, calculator, value=0, cumulative=False):
         self.calculator = calculator
         self.value = value
+        self.cumulative = cumulative
 
     def execute(self):
+        if np.ndim(self.value):
+            steps = self.calculator.subtract_values(self.value, cumulative=self.cumulative)
+            return steps if self.cumulative else self.calculator.value
         self.calculator.subtract_value(self.value)
         return self.calculator.value
 
 
 class MultiplyCommand(Command):
-    def __init__(self, calculator, value=0):
+    def __init__(self, calculator, value=0, cumulative=False):
         self.calculator = calculator
         self.value = value
+        self.cumulative = cumulative
 
     def execute(self):
+        if np.ndim(self.value):
+            steps = self.calculator.multiply_values(self.value, cumulative=self.cumulative)
+            return steps if self.cumulative else self.calculator.value
         self.calculator.multiply_value(self.value)
         return self.calculator.value
 
 
 class DivideCommand(Command):
-    def __init__(self, calculator, value=0):
+    def __init__(self, calculator, value=0, cumulative=False):
         self.calculator = calculator
         self.value = value
+        self.cumulative = cumulative
 
     def execute(self):
+        if np.ndim(self.value):
+            steps = self.calculator.divide_values(self.value, cumulative=self.cumulative)
+            if isinstance(steps, str):
+                return steps
+            return steps if self.cumulative else self.calculator.value
         if self.value == 0:
             return "Error: Division by zero"
         self.calculator.divide_value(self.value)
         return self.calculator.value
-
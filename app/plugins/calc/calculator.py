@@ -1,28 +1,520 @@
 # app/plugins/calc/calculator.py
 
+import math
+import numpy as np
+from app.plugins.calc.value_store import ValueStore
+from app.plugins.calc.grade_store import GradeStore
+from app.plugins.calc.sketch import StatsSketch
+from app.plugins.calc.undo_log import (UndoLog, OPERATIONS, FORWARD, INVERSE, ADD, SUBTRACT, MULTIPLY, DIVIDE,
+                                       EXACT, BULK, CUMULATIVE)
+
+_UFUNCS = {ADD: np.add, SUBTRACT: np.subtract, MULTIPLY: np.multiply, DIVIDE: np.divide}
+
+
+def _modes(ordered):
+    """All values sharing the longest run of a sorted array, in ascending order."""
+    starts = np.flatnonzero(np.concatenate(([True], ordered[1:] != ordered[:-1])))
+    run_lengths = np.diff(np.append(starts, len(ordered)))
+    return ordered[starts[run_lengths == run_lengths.max()]].tolist()
+
+
+class RunningStats:
+    """
+    Running aggregates over the calculator's values, updated on every insert.
+
+    Mean and variance use Welford's algorithm. Median and mode come from a
+    sorted float64 copy of the values kept as a list of sorted blocks of up
+    to 2 * BLOCK values, with each block's length and largest value in
+    small arrays. Inserts only append to an unsorted pending buffer; the
+    next order-statistic query sorts it and merges each value into its
+    block (or, when the batch is as large as the block count, rebuilds the
+    blocks in one pass). The median then finds its block from the running
+    lengths, so it copies one block, never the whole array; the mode needs
+    one pass over all of them. A value costs 8 bytes and bulk loads create
+    no Python objects. Values can also be taken out again (for undo): the
+    moments run Welford backwards, values still pending are dropped off its
+    end and others deleted from their block.
+
+    After a snapshot is restored the moments come from the snapshot and the
+    sorted copy is not rebuilt; the median is then a partition and the mode
+    a sort of the (memory-mapped) values until the next reset. A bulk load
+    that takes the count to DETACH_AT does the same with `fallback`, so
+    large data sets hold 8 bytes per value in the store alone.
+    """
+
+    CANCELLATION = 1e-8
+    DETACH_AT = 1 << 22  # Values at which push_many drops the sorted copy for `fallback`
+    BLOCK = 2048  # Values per block of the sorted copy; a block is split once it holds twice as many
+    _INITIAL_PENDING = 1024
+
+    def __init__(self, fallback=None):
+        self.fallback = fallback  # Callable returning the values, used once a bulk load detaches the order stats
+        self.reset()
+
+    def reset(self):
+        """
+        Forget every value seen so far.
+        """
+        self.count = 0
+        self._mean = 0.0
+        self._m2 = 0.0
+        self._blocks = []  # Sorted copy of the merged values, in ascending blocks
+        self._maxes = np.empty(0, dtype=np.float64)  # Largest value of each block
+        self._lens = np.empty(0, dtype=np.int64)  # Values in each block
+        self._pending = np.empty(self._INITIAL_PENDING, dtype=np.float64)  # Inserted since, in insertion order
+        self._pending_size = 0
+        self._source = None    # Callable returning the values while order stats are detached
+
+    @property
+    def detached(self):
+        """
+        True while median/mode are answered from the values instead of the sorted copy.
+        """
+        return self._source is not None
+
+    def moments(self):
+        """
+        Return (count, mean, m2), enough to restore mean and variance.
+        """
+        return self.count, self._mean, self._m2
+
+    def restore(self, count, mean, m2, source):
+        """
+        Adopt saved moments and answer median/mode from `source()` (an array)
+        instead of rebuilding the sorted copy.
+        """
+        self.reset()
+        self.count, self._mean, self._m2 = count, mean, m2
+        self._source = source
+
+    def push(self, num):
+        """
+        Fold a single value into every aggregate in O(1) amortized.
+        """
+        num = float(num)
+        self.count += 1
+
+        # Welford update for mean and sum of squared deviations
+        delta = num - self._mean
+        self._mean += delta / self.count
+        self._m2 += delta * (num - self._mean)
+
+        if self._source is None:
+            if self._pending_size == len(self._pending):
+                self._grow_pending(1)
+            self._pending[self._pending_size] = num
+            self._pending_size += 1
+
+    def push_many(self, nums):
+        """
+        Fold a batch of values in with vectorized moments and one copy into the pending buffer.
+        """
+        nums = np.asarray(nums, dtype=np.float64).ravel()
+        if nums.size == 0:
+            return
+
+        # Chan et al. merge of the batch moments into the running ones
+        batch_count = nums.size
+        batch_mean = float(nums.mean())
+        batch_m2 = float(np.square(nums - batch_mean).sum())
+        total = self.count + batch_count
+        delta = batch_mean - self._mean
+        self._mean += delta * batch_count / total
+        self._m2 += batch_m2 + delta * delta * self.count * batch_count / total
+        self.count = total
+
+        if self._source is None and self.fallback is not None and total >= self.DETACH_AT:
+            self.restore(total, self._mean, self._m2, self.fallback)
+        elif self._source is None:
+            if self._pending_size + batch_count > len(self._pending):
+                self._grow_pending(batch_count)
+            self._pending[self._pending_size:self._pending_size + batch_count] = nums
+            self._pending_size += batch_count
+
+    def remove(self, num, kept=None):
+        """
+        Take one previously pushed value out of every aggregate: a Welford
+        step in reverse for the moments, O(1) for the sorted copy when the
+        value is the latest one pushed and O(n) otherwise.
+        `kept` (the values that remain) lets the moments be recomputed when
+        the subtraction cancels, e.g. after removing a huge outlier.
+        """
+        num = float(num)
+        if self.count <= 1:
+            self._clear_keeping_source()
+            return
+        mean, m2 = self._mean, self._m2
+        delta = num - self._mean
+        self._mean -= delta / (self.count - 1)
+        self._m2 = max(self._m2 - delta * (num - self._mean), 0.0) if self.count > 2 else 0.0
+        self.count -= 1
+        self._check_cancellation(mean, m2, kept)
+
+        if self._source is None:
+            self._remove_ordered(np.array([num]))
+
+    def remove_many(self, nums, kept=None):
+        """
+        Take a batch of previously pushed values out, undoing push_many.
+        """
+        nums = np.asarray(nums, dtype=np.float64).ravel()
+        if nums.size == 0:
+            return
+        remaining = self.count - nums.size
+        if remaining <= 0:
+            self._clear_keeping_source()
+            return
+
+        # Chan et al. merge run backwards: split the batch moments off the running ones
+        batch_count = nums.size
+        batch_mean = float(nums.mean())
+        batch_m2 = float(np.square(nums - batch_mean).sum())
+        mean, m2 = self._mean, self._m2
+        self._mean = (self.count * mean - batch_count * batch_mean) / remaining
+        delta = batch_mean - self._mean
+        self._m2 = max(m2 - batch_m2 - delta * delta * remaining * batch_count / self.count, 0.0) \
+            if remaining > 1 else 0.0
+        self.count = remaining
+        self._check_cancellation(mean, m2, kept)
+
+        if self._source is None:
+            self._remove_ordered(nums)
+
+    def _check_cancellation(self, mean, m2, kept):
+        """
+        Recompute the moments from `kept` when a removal took them down by
+        more than CANCELLATION (relative), where the subtraction has
+        lost most of its significant digits.
+        """
+        if kept is None or len(kept) != self.count:
+            return
+        if self._m2 < m2 * self.CANCELLATION or abs(self._mean) < abs(mean) * self.CANCELLATION:
+            kept = np.asarray(kept, dtype=np.float64)
+            self._mean = float(kept.mean())
+            self._m2 = float(np.square(kept - self._mean).sum())
+
+    def _clear_keeping_source(self):
+        source = self._source
+        self.reset()
+        self._source = source
+
+    def _grow_pending(self, extra):
+        """Make room for `extra` more pending values, doubling the buffer."""
+        capacity = max(len(self._pending) * 2, self._pending_size + extra)
+        grown = np.empty(capacity, dtype=np.float64)
+        grown[:self._pending_size] = self._pending[:self._pending_size]
+        self._pending = grown
+
+    def _remove_ordered(self, nums):
+        """
+        Take `nums` out of the sorted copy. Undo removes the latest values
+        first, so they are usually still the tail of the pending buffer;
+        otherwise each is deleted from its block, or a large batch from all
+        the blocks in one pass.
+        """
+        size, count = self._pending_size, len(nums)
+        if count <= size and np.array_equal(self._pending[size - count:size], nums):
+            self._pending_size = size - count
+            return
+        self._merge_pending()
+        nums = np.sort(nums)
+        if count > self.BLOCK:
+            ordered = self._concatenated()
+            # Equal values sit next to each other: the k-th copy of a value goes k places after the first
+            duplicates = np.arange(count) - np.searchsorted(nums, nums)
+            self._split(np.delete(ordered, np.searchsorted(ordered, nums) + duplicates))
+            return
+        for num in nums.tolist():
+            index = int(np.searchsorted(self._maxes, num))  # The first block that can hold it holds its first copy
+            block = self._blocks[index]
+            block = np.delete(block, np.searchsorted(block, num))
+            if len(block):
+                self._blocks[index] = block
+                self._maxes[index] = block[-1]
+                self._lens[index] -= 1
+            else:
+                del self._blocks[index]
+                self._maxes = np.delete(self._maxes, index)
+                self._lens = np.delete(self._lens, index)
+
+    def _concatenated(self):
+        return np.concatenate(self._blocks) if self._blocks else np.empty(0, dtype=np.float64)
+
+    def _split(self, ordered):
+        """Replace the blocks with `ordered` (ascending) cut into BLOCK-sized pieces."""
+        starts = np.arange(0, len(ordered), self.BLOCK)
+        self._blocks = [ordered[start:start + self.BLOCK] for start in starts.tolist()]
+        self._lens = np.diff(np.append(starts, len(ordered)))
+        self._maxes = ordered[starts + self._lens - 1]
+
+    def _merge_pending(self):
+        """Sort the pending values into the blocks."""
+        if not self._pending_size:
+            return
+        pending = np.sort(self._pending[:self._pending_size])
+        self._pending_size = 0
+        if len(self._pending) > self._INITIAL_PENDING:
+            self._pending = np.empty(self._INITIAL_PENDING, dtype=np.float64)
+        if len(pending) >= len(self._blocks):
+            # About one value per block or more: one merge of everything costs no more than block by block
+            ordered = self._concatenated()
+            self._split(np.insert(ordered, np.searchsorted(ordered, pending), pending) if len(ordered) else pending)
+            return
+
+        targets = np.minimum(self._maxes.searchsorted(pending), len(self._blocks) - 1).tolist()
+        if len(pending) == 1:  # The usual interactive case, without the grouping below
+            groups = [(0, 1)]
+        else:
+            starts = np.flatnonzero(np.diff(targets, prepend=-1)).tolist()
+            groups = zip(starts, starts[1:] + [len(pending)])
+        # Back to front, as splitting a block shifts the ones after it
+        for start, end in reversed(list(groups)):
+            index, part = targets[start], pending[start:end]
+            old = self._blocks[index]
+            positions = old.searchsorted(part)
+            block = np.empty(len(old) + len(part), dtype=np.float64)
+            taken = positions + np.arange(len(part))  # Where the new values land in the merged block
+            block[taken] = part
+            kept = np.ones(len(block), dtype=bool)
+            kept[taken] = False
+            block[kept] = old
+            if len(block) <= 2 * self.BLOCK:
+                self._blocks[index] = block
+                self._maxes[index] = block[-1]
+                self._lens[index] = len(block)
+                continue
+            pieces = [block[piece:piece + self.BLOCK] for piece in range(0, len(block), self.BLOCK)]
+            self._blocks[index:index + 1] = pieces
+            self._maxes = np.concatenate((self._maxes[:index], [piece[-1] for piece in pieces],
+                                          self._maxes[index + 1:]))
+            self._lens = np.concatenate((self._lens[:index], [len(piece) for piece in pieces],
+                                         self._lens[index + 1:]))
+
+    def _kth(self, k, ends):
+        """The k-th smallest value (0-based) of the live sorted copy; `ends` are the cumulative block lengths."""
+        index = int(ends.searchsorted(k, side="right"))
+        return float(self._blocks[index][k - int(ends[index]) + int(self._lens[index])])
+
+    def ordered(self):
+        """Every value in ascending order, as a new array."""
+        if self._source is not None:
+            return np.sort(self._source())
+        self._merge_pending()
+        return self._concatenated()
+
+    def mean(self):
+        """
+        Arithmetic mean in O(1).
+        """
+        return self._mean
+
+    def std(self):
+        """
+        Population standard deviation (same as np.std) in O(1).
+        """
+        if self.count == 0:
+            return 0.0
+        return math.sqrt(self._m2 / self.count)
+
+    def median(self):
+        """
+        Median from the middle block(s) of the sorted copy, or a partition
+        of the values while detached.
+        """
+        middle = self.count // 2
+        if self._source is not None:
+            values = self._source()
+            if len(values) % 2:
+                return float(np.partition(values, middle)[middle])
+            below, above = np.partition(values, (middle - 1, middle))[middle - 1:middle + 1]
+            return float((below + above) / 2)
+        self._merge_pending()
+        ends = self._lens.cumsum()
+        if self.count % 2:
+            return self._kth(middle, ends)
+        return (self._kth(middle - 1, ends) + self._kth(middle, ends)) / 2
+
+    def mode(self):
+        """
+        All values sharing the highest count, in ascending order.
+        """
+        return _modes(self.ordered())
+
+
+class StatsCache:
+    """
+    Results of the statistics commands, shared by all of them and valid for
+    one version of the calculator's values.
+
+    Mean and std are read straight from the running moments in O(1) and
+    never cached. Median and mode are cached, each computed only when it is
+    asked for (see RunningStats). With a ParallelStats set on the
+    calculator, a miss on a large restored array fills both at once from
+    its worker pool instead of partitioning and sorting on one core.
+    """
+
+    STATISTICS = ("mean", "median", "mode", "std")
+
+    def __init__(self, calculator):
+        self.calculator = calculator
+        self.hits = 0
+        self.misses = 0
+        self._version = None
+        self._results = {}
+
+    def get(self, name):
+        stats = self.calculator.stats
+        if name == "mean":
+            return stats.mean()
+        if name == "std":
+            return stats.std()
+        version = self.calculator.version
+        if version != self._version:
+            self._results = {}
+            self._version = version
+        if name in self._results:
+            self.hits += 1
+        else:
+            self.misses += 1
+            self._results.update(self._compute(name))
+        result = self._results[name]
+        return list(result) if isinstance(result, list) else result
+
+    def _compute(self, name):
+        stats = self.calculator.stats
+        parallel = self.calculator.parallel
+        if stats.detached and parallel is not None and len(self.calculator.values) >= parallel.min_size:
+            results = parallel.statistics(self.calculator.values.view())
+            return {"median": results["median"], "mode": results["mode"]}
+
+        return {name: stats.median() if name == "median" else stats.mode()}
+
+    def info(self):
+        """Hit/miss counters and the version the cached results belong to."""
+        return {"hits": self.hits, "misses": self.misses, "version": self._version}
+
+
 class Calculator:
-    def __init__(self):
+    SKETCH_CHUNK = 1 << 16  # Values fed to the sketch at a time when catching up after a restore
+
+    def __init__(self, sketch=None):
         self.value = 0
-        self.values = []  # Initialize an empty list to store grades
+        self.stats = RunningStats()
+        self.sketch = sketch if sketch is not None else StatsSketch()  # Bounded-memory quantiles
+        self._sketch_backlog = None  # Restored values the sketch has not seen yet
+        self.parallel = None  # Optional ParallelStats for full recomputations over large arrays
+        self._values = ValueStore(stats=self.stats, sketch=self.sketch)  # Compact float64 store of grades
+        self.stats.fallback = self._values.view
+        self.stats_cache = StatsCache(self)
+        self.grades = GradeStore()  # The same grades labeled by class and category
+        self.undo_log = UndoLog()  # Inverse operations for undo/redo of the arithmetic
+
+    @property
+    def version(self):
+        """
+        Mutation counter of the values, bumped by add_value, reset and every extend.
+        """
+        return self._values.version
+
+    def statistic(self, name):
+        """
+        Return 'mean', 'median', 'mode' or 'std' of the values through the shared cache.
+        """
+        return self.stats_cache.get(name)
+
+    def percentile(self, p):
+        """
+        Approximate p-th percentile (0-100, scalar or array) from the sketch,
+        without touching the stored values.
+        """
+        self._catch_up_sketch()
+        return self.sketch.quantile(np.asarray(p, dtype=np.float64) / 100)
+
+    def histogram(self):
+        """
+        The sketch's fixed-bin histogram of the values (SKETCH_BINS bins over
+        SKETCH_RANGE plus an underflow and an overflow bin).
+        """
+        self._catch_up_sketch()
+        return self.sketch.histogram
+
+    def _catch_up_sketch(self):
+        if self._sketch_backlog is not None:
+            backlog, self._sketch_backlog = self._sketch_backlog, None
+            for start in range(0, len(backlog), self.SKETCH_CHUNK):
+                self.sketch.push_many(backlog[start:start + self.SKETCH_CHUNK])
+
+    @property
+    def values(self):
+        return self._values
+
+    @values.setter
+    def values(self, nums):
+        """
+        Replace the stored values, rebuilding the running aggregates.
+        """
+        self._sketch_backlog = None
+        self.undo_log.clear()
+        self._values.clear()
+        self._values.extend(nums)
+
+    def truncate_values(self, size):
+        """
+        Keep only the first `size` values. The sketch cannot forget values,
+        so it starts over and catches up on the first percentile query.
+        """
+        removed = self._values.truncate(size)
+        if removed.size:
+            self.sketch.reset()
+            self._sketch_backlog = self._values.view()
+        return removed
+
+    def load_state(self, value, values, moments):
+        """
+        Restore a saved session: adopt `values` (e.g. a memory-mapped array)
+        as the store's buffer without copying and restore the running moments.
+        The sketch catches up with the restored values on the first percentile query.
+        """
+        self.value = value
+        self.undo_log.clear()
+        self.sketch.reset()
+        self._sketch_backlog = values
+        self._values.adopt(values)
+        self.stats.restore(*moments, source=self._values.view)
+
+    def add_grades(self, classes, categories, grades):
+        """
+        Store labeled grades: the values feed the overall statistics and the
+        labeled copy feeds the per-class / per-category statistics.
+        """
+        grades = np.asarray(grades, dtype=np.float64).ravel()
+        self.values.extend(grades)
+        self.grades.extend(classes, categories, grades)
 
     def add_value(self, num):
         """
         Add a value to the current total and to the list of values.
         """
+        previous, version = self.value, self._values.version
         self.value += num
         self.values.append(num)
+        self.undo_log.push(ADD, num, previous, self.value, version, self._values.version)
 
     def subtract_value(self, num):
         """
         Subtract a value from the current total.
         """
+        previous = self.value
         self.value -= num
+        self.undo_log.push(SUBTRACT, num, previous, self.value, self._values.version)
 
     def multiply_value(self, num):
         """
         Multiply the current total by a given number.
         """
+        previous = self.value
         self.value *= num
+        self.undo_log.push(MULTIPLY, num, previous, self.value, self._values.version)
 
     def divide_value(self, num):
         """
@@ -30,11 +522,131 @@ class Calculator:
         """
         if num == 0:
             return "Error: Division by zero"
+        previous = self.value
         self.value /= num
+        self.undo_log.push(DIVIDE, num, previous, self.value, self._values.version)
+        return None
+
+    def _accumulate(self, ufunc, nums):
+        """
+        Running totals of applying `ufunc` to the current value and each number
+        in turn, in the same order (and rounding) as the scalar methods.
+        """
+        steps = ufunc.accumulate(np.concatenate(([self.value], nums)))[1:]
+        if steps.size:
+            self.value = float(steps[-1])
+        return steps
+
+    def _apply_bulk(self, op, nums, cumulative):
+        """
+        Apply a batch to the total: step by step when `cumulative` (returning
+        the running totals), otherwise with one sum or product.
+        """
+        if cumulative:
+            return self._accumulate(_UFUNCS[op], nums)
+        reduced = float(nums.sum()) if op in (ADD, SUBTRACT) else float(nums.prod())
+        self.value = FORWARD[op](self.value, reduced)
+        return None
+
+    def _record_bulk(self, op, nums, previous, version, cumulative):
+        """Log a batch applied by one of the *_values methods for undo."""
+        if nums.size:
+            self.undo_log.push_many(op, nums, previous, self.value, version, self._values.version, cumulative)
+
+    def undo(self):
+        """
+        Revert the latest arithmetic operation that is not undone yet: apply
+        its inverse (or restore the saved total) and drop the values an add
+        appended. Returns (operation name, operands), or None when there is
+        nothing to undo.
+        """
+        log = self.undo_log
+        if not log.matches(self.value, self.version):
+            log.clear()
+        entry = log.undo()
+        if entry is None:
+            return None
+        op, flags, operands, previous = entry
+        if op == ADD:
+            self.truncate_values(len(self._values) - len(operands))
+        self.value = INVERSE[op](self.value, float(operands[0])) if flags & EXACT else previous
+        log.synced(self.value, self.version)
+        return OPERATIONS[op], operands
+
+    def redo(self):
+        """
+        Apply the latest undone operation again, with the same rounding as
+        the first time. Returns (operation name, operands), or None when
+        there is nothing to redo.
+        """
+        log = self.undo_log
+        if not log.matches(self.value, self.version):
+            log.clear()
+        entry = log.redo()
+        if entry is None:
+            return None
+        op, flags, operands, _ = entry
+        if op == ADD and flags & BULK:
+            self._values.extend(operands)
+        elif op == ADD:
+            self._values.append(float(operands[0]))
+        if flags & BULK:
+            self._apply_bulk(op, operands, bool(flags & CUMULATIVE))
+        else:
+            self.value = FORWARD[op](self.value, float(operands[0]))
+        log.synced(self.value, self.version)
+        return OPERATIONS[op], operands
+
+    def add_values(self, nums, cumulative=False):
+        """
+        Add a batch of values to the total and the stored values in one step.
+        Returns the running totals when `cumulative` is set.
+        """
+        nums = np.asarray(nums, dtype=np.float64).ravel()
+        previous, version = self.value, self._values.version
+        self.values.extend(nums)
+        steps = self._apply_bulk(ADD, nums, cumulative)
+        self._record_bulk(ADD, nums, previous, version, cumulative)
+        return steps
+
+    def subtract_values(self, nums, cumulative=False):
+        """
+        Subtract a batch of values from the current total.
+        """
+        nums = np.asarray(nums, dtype=np.float64).ravel()
+        previous = self.value
+        steps = self._apply_bulk(SUBTRACT, nums, cumulative)
+        self._record_bulk(SUBTRACT, nums, previous, self._values.version, cumulative)
+        return steps
+
+    def multiply_values(self, nums, cumulative=False):
+        """
+        Multiply the current total by every number in a batch.
+        """
+        nums = np.asarray(nums, dtype=np.float64).ravel()
+        previous = self.value
+        steps = self._apply_bulk(MULTIPLY, nums, cumulative)
+        self._record_bulk(MULTIPLY, nums, previous, self._values.version, cumulative)
+        return steps
+
+    def divide_values(self, nums, cumulative=False):
+        """
+        Divide the current total by every number in a batch.
+        """
+        nums = np.asarray(nums, dtype=np.float64).ravel()
+        if not nums.all():
+            return "Error: Division by zero"
+        previous = self.value
+        steps = self._apply_bulk(DIVIDE, nums, cumulative)
+        self._record_bulk(DIVIDE, nums, previous, self._values.version, cumulative)
+        return steps
 
     def reset(self):
         """
         Reset the calculator's value and clear stored values.
         """
         self.value = 0
+        self._sketch_backlog = None
+        self.undo_log.clear()
         self.values.clear()
+        self.grades.clear()
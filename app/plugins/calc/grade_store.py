@@ -0,0 +1,167 @@
+# app/plugins/calc/grade_store.py
+
+import numpy as np
+
+
+def grouped_statistics(codes, grades):
+    """
+    Count, mean, median, population std and modes of `grades` per group code,
+    computed with one lexsort and segment reductions instead of a filter per group.
+    Groups without grades are left out; returns a dict of per-group arrays.
+    """
+    codes = np.asarray(codes)
+    grades = np.asarray(grades, dtype=np.float64)
+    if codes.size == 0:
+        empty = np.empty(0)
+        return {"groups": codes, "count": empty.astype(int), "mean": empty, "median": empty, "std": empty, "mode": []}
+
+    order = np.lexsort((grades, codes))
+    codes, grades = codes[order], grades[order]
+
+    starts = np.flatnonzero(np.concatenate(([True], codes[1:] != codes[:-1])))
+    groups = codes[starts]
+    counts = np.diff(np.append(starts, codes.size))
+
+    means = np.add.reduceat(grades, starts) / counts
+    deviations = grades - np.repeat(means, counts)
+    stds = np.sqrt(np.add.reduceat(deviations * deviations, starts) / counts)
+
+    # Grades are sorted inside each group, so the median sits in the middle of its segment
+    medians = (grades[starts + (counts - 1) // 2] + grades[starts + counts // 2]) / 2
+
+    # Runs of equal (group, grade) pairs; a group's modes are its longest runs
+    run_starts = np.flatnonzero(np.concatenate(
+        ([True], (codes[1:] != codes[:-1]) | (grades[1:] != grades[:-1]))))
+    run_lengths = np.diff(np.append(run_starts, codes.size))
+    run_groups = np.searchsorted(starts, run_starts, side="right") - 1
+    first_runs = np.flatnonzero(np.concatenate(([True], run_groups[1:] != run_groups[:-1])))
+    longest = np.maximum.reduceat(run_lengths, first_runs)
+    is_mode = run_lengths == longest[run_groups]
+    mode_splits = np.cumsum(np.bincount(run_groups[is_mode], minlength=len(groups)))[:-1]
+    modes = [group_modes.tolist() for group_modes in np.split(grades[run_starts[is_mode]], mode_splits)]
+
+    return {"groups": groups, "count": counts, "mean": means, "median": medians, "std": stds, "mode": modes}
+
+
+def weighted_final_grades(class_codes, category_codes, grades, weights, n_classes, n_categories):
+    """
+    Weighted final grade per class in one matrix pass: the grades are pivoted
+    into a classes x categories matrix of category means, which is multiplied
+    by the category weight vector. Each class is normalised by the weights of
+    the categories it actually has, so a missing category does not count as 0.
+    Returns (category_means, final_grades); cells and classes without grades are NaN.
+    """
+    weights = np.asarray(weights, dtype=np.float64)
+    cells = np.asarray(class_codes, dtype=np.int64) * n_categories + category_codes
+    sums = np.bincount(cells, weights=grades, minlength=n_classes * n_categories).reshape(n_classes, n_categories)
+    counts = np.bincount(cells, minlength=n_classes * n_categories).reshape(n_classes, n_categories)
+
+    present = counts > 0
+    means = np.divide(sums, counts, out=np.full(sums.shape, np.nan), where=present)
+    covered = present @ weights
+    weighted = np.where(present, means, 0.0) @ weights
+    finals = np.divide(weighted, covered, out=np.full(n_classes, np.nan), where=covered > 0)
+    return means, finals
+
+
+class GradeStore:
+    """
+    Columnar store of labeled grades: a class code, a category code and a
+    float64 grade per row, in buffers that double when full. Labels are kept
+    once in `class_names` / `category_names`; rows only hold their codes.
+    """
+
+    _INITIAL_CAPACITY = 16
+    GROUPINGS = ("class", "category")
+
+    def __init__(self):
+        self.class_names = []
+        self.category_names = []
+        self._class_codes_by_name = {}
+        self._category_codes_by_name = {}
+        self.clear()
+
+    def clear(self):
+        self._class_codes = np.empty(self._INITIAL_CAPACITY, dtype=np.int32)
+        self._category_codes = np.empty(self._INITIAL_CAPACITY, dtype=np.int32)
+        self._grades = np.empty(self._INITIAL_CAPACITY, dtype=np.float64)
+        self._size = 0
+
+    @staticmethod
+    def _codes_for(labels, names, codes_by_name):
+        """Map an array of labels to codes, adding unseen labels to `names` in order of appearance."""
+        uniques, first_seen, inverse = np.unique(np.asarray(labels, dtype=str), return_index=True,
+                                                 return_inverse=True)
+        mapping = np.empty(len(uniques), dtype=np.int32)
+        for index in np.argsort(first_seen).tolist():
+            label = uniques[index].item()
+            code = codes_by_name.get(label)
+            if code is None:
+                code = codes_by_name[label] = len(names)
+                names.append(label)
+            mapping[index] = code
+        return mapping[inverse.ravel()]
+
+    def _reserve(self, extra):
+        needed = self._size + extra
+        capacity = len(self._grades)
+        if needed <= capacity:
+            return
+        while capacity < needed:
+            capacity *= 2
+        for name in ("_class_codes", "_category_codes", "_grades"):
+            old = getattr(self, name)
+            new = np.empty(capacity, dtype=old.dtype)
+            new[:self._size] = old[:self._size]
+            setattr(self, name, new)
+
+    def extend(self, classes, categories, grades):
+        """Append labeled grades; `classes` and `categories` are label sequences."""
+        grades = np.asarray(grades, dtype=np.float64).ravel()
+        if grades.size == 0:
+            return
+        class_codes = self._codes_for(classes, self.class_names, self._class_codes_by_name)
+        category_codes = self._codes_for(categories, self.category_names, self._category_codes_by_name)
+        self._reserve(grades.size)
+        stop = self._size + grades.size
+        self._class_codes[self._size:stop] = class_codes
+        self._category_codes[self._size:stop] = category_codes
+        self._grades[self._size:stop] = grades
+        self._size = stop
+
+    def append(self, class_name, category, grade):
+        self.extend([class_name], [category], [grade])
+
+    def columns(self):
+        """Return (class_codes, category_codes, grades) views of the stored rows."""
+        return self._class_codes[:self._size], self._category_codes[:self._size], self._grades[:self._size]
+
+    def group_stats(self, by="class"):
+        """Per-class or per-category statistics, with group labels in place of codes."""
+        if by not in self.GROUPINGS:
+            raise ValueError(f"Unknown grouping '{by}'; use 'class' or 'category'.")
+        class_codes, category_codes, grades = self.columns()
+        codes, names = (class_codes, self.class_names) if by == "class" else (category_codes, self.category_names)
+        result = grouped_statistics(codes, grades)
+        result["groups"] = [names[code] for code in result["groups"].tolist()]
+        return result
+
+    def final_grades(self, weights):
+        """
+        Weighted final grade per class; `weights` maps category labels to
+        weights, and categories without a weight do not count.
+        Returns a dict with the class and category labels, the category means and the finals.
+        """
+        class_codes, category_codes, grades = self.columns()
+        weight_vector = [weights.get(name, 0.0) for name in self.category_names]
+        means, finals = weighted_final_grades(class_codes, category_codes, grades, weight_vector,
+                                              len(self.class_names), len(self.category_names))
+        # Labels outlive clear(); leave out the classes and categories without current rows
+        classes = np.flatnonzero(np.bincount(class_codes, minlength=len(self.class_names)))
+        categories = np.flatnonzero(np.bincount(category_codes, minlength=len(self.category_names)))
+        return {"classes": [self.class_names[code] for code in classes.tolist()],
+                "categories": [self.category_names[code] for code in categories.tolist()],
+                "means": means[np.ix_(classes, categories)], "final": finals[classes]}
+
+    def __len__(self):
+        return self._size
@@ -0,0 +1,127 @@
+# app/plugins/calc/parallel.py
+
+import math
+import os
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+import numpy as np
+
+
+def _moments(chunk):
+    """Count, sum, sum of squared deviations from the chunk mean, min and max of one chunk."""
+    total = float(chunk.sum())
+    deviations = chunk - total / len(chunk)
+    return len(chunk), total, float(np.dot(deviations, deviations)), float(chunk.min()), float(chunk.max())
+
+
+def _value_counts(chunk):
+    return np.unique(chunk, return_counts=True)
+
+
+def _bin_index(chunk, low, high, bins):
+    """Bin of each value of `chunk` in [low, high]: -1 below the range, `bins` above it."""
+    if high <= low:
+        return np.where(chunk < low, -1, np.where(chunk > high, bins, 0))
+    index = np.floor((chunk - low) * (bins / (high - low))).astype(np.int64)
+    np.clip(index, 0, bins - 1, out=index)
+    index[chunk < low] = -1
+    index[chunk > high] = bins
+    return index
+
+
+def _bin_counts(chunk, low, high, bins):
+    """Number of values below `low` and per-bin counts over [low, high]."""
+    index = _bin_index(chunk, low, high, bins)
+    counts = np.bincount(index + 1, minlength=bins + 2)
+    return counts[0], counts[1:-1]
+
+
+def _bin_values(chunk, low, high, bins, target):
+    return chunk[_bin_index(chunk, low, high, bins) == target]
+
+
+def _bin_range(chunk, low, high, bins, target):
+    """Smallest and largest value of `chunk` in bin `target` (inf, -inf when it has none)."""
+    values = _bin_values(chunk, low, high, bins, target)
+    return (float(values.min()), float(values.max())) if len(values) else (math.inf, -math.inf)
+
+
+class ParallelStats:
+    """
+    Mean, std, median and mode of a large array computed on a thread pool
+    over contiguous chunks. NumPy releases the GIL inside these kernels, and
+    threads share the array, so chunks are views rather than pickled copies.
+
+    Each chunk returns partial aggregates that are merged here: count, sum
+    and squared deviations (Chan's merge) for mean/std, value counts for mode,
+    and bin counts for the median, which is found exactly by refining the bin
+    that holds the middle rank until few enough values remain to gather.
+    """
+
+    def __init__(self, workers=None, chunk_size=1 << 20, bins=4096, gather_limit=1 << 16, max_rounds=8,
+                 min_size=1 << 18):
+        self.workers = workers or os.cpu_count() or 1
+        self.min_size = min_size  # Smaller arrays are not worth the pool
+        self.chunk_size = chunk_size
+        self.bins = bins
+        self.gather_limit = gather_limit
+        self.max_rounds = max_rounds
+
+    def chunks(self, values):
+        values = np.asarray(values, dtype=np.float64).ravel()
+        pieces = max(self.workers, math.ceil(len(values) / self.chunk_size))
+        return [chunk for chunk in np.array_split(values, pieces) if len(chunk)]
+
+    def _moments(self, pool, chunks):
+        count, total, m2, low, high = 0, 0.0, 0.0, math.inf, -math.inf
+        for chunk_count, chunk_sum, chunk_m2, chunk_min, chunk_max in pool.map(_moments, chunks):
+            if count:
+                delta = chunk_sum / chunk_count - total / count
+                m2 += chunk_m2 + delta * delta * count * chunk_count / (count + chunk_count)
+            else:
+                m2 = chunk_m2
+            count += chunk_count
+            total += chunk_sum
+            low, high = min(low, chunk_min), max(high, chunk_max)
+        return count, total / count, m2, low, high
+
+    def _mode(self, pool, chunks):
+        partials = list(pool.map(_value_counts, chunks))
+        uniques, inverse = np.unique(np.concatenate([values for values, _ in partials]), return_inverse=True)
+        totals = np.bincount(inverse.ravel(), weights=np.concatenate([counts for _, counts in partials]))
+        return uniques[totals == totals.max()].tolist()
+
+    def _kth(self, pool, chunks, k, low, high):
+        """Exact k-th smallest value (0-based) by histogram refinement."""
+        for refinement in range(self.max_rounds + 1):
+            if high <= low:
+                return low
+            partials = list(pool.map(partial(_bin_counts, low=low, high=high, bins=self.bins), chunks))
+            below = sum(int(count) for count, _ in partials)
+            counts = np.sum([counts for _, counts in partials], axis=0)
+            cumulative = below + np.cumsum(counts)
+            target = int(np.searchsorted(cumulative, k, side="right"))
+            if counts[target] <= self.gather_limit or refinement == self.max_rounds:
+                break
+            # Binning is monotonic, so the target bin is exactly the values between its own min and max
+            ranges = list(pool.map(partial(_bin_range, low=low, high=high, bins=self.bins, target=target), chunks))
+            low, high = min(low for low, _ in ranges), max(high for _, high in ranges)
+
+        candidates = np.concatenate(list(pool.map(
+            partial(_bin_values, low=low, high=high, bins=self.bins, target=target), chunks)))
+        rank = k - (int(cumulative[target]) - len(candidates))
+        return float(np.partition(candidates, rank)[rank])
+
+    def statistics(self, values):
+        """Return {'mean', 'median', 'mode', 'std'} of `values`, like StatsCache does."""
+        chunks = self.chunks(values)
+        if not chunks:
+            raise ValueError("Cannot compute statistics of no values.")
+        with ThreadPoolExecutor(max_workers=self.workers) as pool:
+            count, mean, m2, low, high = self._moments(pool, chunks)
+            middle = count // 2
+            median = self._kth(pool, chunks, middle, low, high)
+            if count % 2 == 0:
+                median = (self._kth(pool, chunks, middle - 1, low, high) + median) / 2
+            modes = self._mode(pool, chunks)
+        return {"mean": mean, "median": median, "mode": modes, "std": math.sqrt(m2 / count)}
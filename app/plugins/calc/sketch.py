@@ -0,0 +1,268 @@
+# app/plugins/calc/sketch.py
+
+import math
+import numpy as np
+
+
+class KLLSketch:
+    """
+    KLL quantile sketch: a stack of compactors where an item on level h
+    stands for 2**h values. A level that outgrows its capacity is sorted and
+    every other item (from a random offset) moves up, so memory stays around
+    3k items while rank errors stay near 1.7 / k of the count.
+    Sketches with the same k can be merged. NaN is not a quantity and is
+    left out.
+    """
+
+    def __init__(self, k=200, seed=None):
+        if k < 8:
+            raise ValueError("KLL sketch parameter k must be at least 8.")
+        self.k = k
+        self._rng = np.random.default_rng(seed)
+        self.reset()
+
+    def reset(self):
+        self.count = 0
+        self.min = math.inf
+        self.max = -math.inf
+        self._levels = [np.empty(0)]
+        self._pending = []  # Scalar updates waiting to join level 0
+
+    def _capacity(self, level):
+        depth = len(self._levels) - level - 1
+        return max(2, math.ceil(self.k * (2 / 3) ** depth))
+
+    def update(self, num):
+        num = float(num)
+        if math.isnan(num):
+            return
+        self._pending.append(num)
+        self.count += 1
+        if num < self.min:
+            self.min = num
+        if num > self.max:
+            self.max = num
+        if len(self._pending) >= self.k:
+            self._compress()
+
+    def update_many(self, nums):
+        nums = np.asarray(nums, dtype=np.float64).ravel()
+        if np.isnan(nums).any():
+            nums = nums[~np.isnan(nums)]
+        if nums.size == 0:
+            return
+        self.count += nums.size
+        self.min = min(self.min, float(nums.min()))
+        self.max = max(self.max, float(nums.max()))
+        self._levels[0] = np.concatenate((self._levels[0], nums))
+        self._compress()
+
+    def _compress(self):
+        if self._pending:
+            self._levels[0] = np.concatenate((self._levels[0], self._pending))
+            self._pending = []
+        level = 0
+        while level < len(self._levels):
+            items = self._levels[level]
+            if len(items) > self._capacity(level):
+                if level + 1 == len(self._levels):
+                    self._levels.append(np.empty(0))
+                items = np.sort(items)
+                leftover, items = (items[:1], items[1:]) if len(items) % 2 else (items[:0], items)
+                promoted = items[self._rng.integers(2)::2]
+                self._levels[level] = leftover
+                self._levels[level + 1] = np.concatenate((self._levels[level + 1], promoted))
+            level += 1
+
+    def merge(self, other):
+        """Fold another sketch into this one; the other sketch is left unchanged."""
+        if other.k != self.k:
+            raise ValueError("Only sketches with the same k can be merged.")
+        other_levels = other._levels[:]
+        if other._pending:
+            other_levels[0] = np.concatenate((other_levels[0], other._pending))
+        while len(self._levels) < len(other_levels):
+            self._levels.append(np.empty(0))
+        for level, items in enumerate(other_levels):
+            self._levels[level] = np.concatenate((self._levels[level], items))
+        self.count += other.count
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+        self._compress()
+        return self
+
+    def _weighted(self):
+        """Retained items in ascending order with the cumulative weight up to each."""
+        self._compress()
+        items = np.concatenate(self._levels)
+        weights = np.concatenate([np.full(len(items), 2 ** level, dtype=np.int64)
+                                  for level, items in enumerate(self._levels)])
+        order = np.argsort(items, kind="stable")
+        return items[order], np.cumsum(weights[order])
+
+    def quantile(self, q):
+        """Approximate q-quantile (0 <= q <= 1); `q` may be an array."""
+        if self.count == 0:
+            raise ValueError("Cannot take a quantile of an empty sketch.")
+        q = np.asarray(q, dtype=np.float64)
+        if np.any((q < 0) | (q > 1)):
+            raise ValueError("Quantiles must be between 0 and 1.")
+        items, cumulative = self._weighted()
+        index = np.minimum(np.searchsorted(cumulative, q * cumulative[-1], side="left"), len(items) - 1)
+        result = np.where(q == 0, self.min, np.where(q == 1, self.max, items[index]))
+        return float(result) if result.ndim == 0 else result
+
+    def rank(self, num):
+        """Approximate fraction of the values that are <= `num`."""
+        if self.count == 0:
+            return 0.0
+        items, cumulative = self._weighted()
+        position = np.searchsorted(items, num, side="right")
+        return float(cumulative[position - 1] / cumulative[-1]) if position else 0.0
+
+    def retained(self):
+        """Number of items held, which bounds the sketch's memory."""
+        return sum(len(items) for items in self._levels) + len(self._pending)
+
+    def __len__(self):
+        return self.count
+
+
+class FixedHistogram:
+    """
+    Histogram with fixed, equal-width bins over [low, high] plus an underflow
+    and an overflow bin, which also take -inf and inf; NaN is not counted.
+    Memory is constant and histograms with the same edges merge by adding
+    counts.
+    """
+
+    def __init__(self, low=0.0, high=100.0, bins=100):
+        if not high > low or bins < 1:
+            raise ValueError("Histogram needs high > low and at least one bin.")
+        self.low, self.high, self.bins = float(low), float(high), int(bins)
+        self._scale = self.bins / (self.high - self.low)
+        self.counts = np.zeros(self.bins + 2, dtype=np.int64)  # [underflow, bins..., overflow]
+
+    @property
+    def edges(self):
+        return np.linspace(self.low, self.high, self.bins + 1)
+
+    def reset(self):
+        self.counts[:] = 0
+
+    def _index(self, nums):
+        index = np.floor((nums - self.low) * self._scale) + 1
+        index[nums == self.high] = self.bins  # The top edge belongs to the last bin
+        return np.clip(index, 0, self.bins + 1).astype(np.int64)  # Clipped as floats: infinities fit no int64
+
+    def update(self, num):
+        if math.isnan(num):
+            return
+        if num < self.low:
+            self.counts[0] += 1
+        elif num >= self.high:
+            self.counts[self.bins if num == self.high else self.bins + 1] += 1
+        else:
+            self.counts[int((num - self.low) * self._scale) + 1] += 1
+
+    def update_many(self, nums):
+        nums = np.asarray(nums, dtype=np.float64).ravel()
+        if np.isnan(nums).any():
+            nums = nums[~np.isnan(nums)]
+        if nums.size:
+            self.counts += np.bincount(self._index(nums), minlength=self.bins + 2)
+
+    def merge(self, other):
+        if (other.low, other.high, other.bins) != (self.low, self.high, self.bins):
+            raise ValueError("Only histograms with the same bins can be merged.")
+        self.counts += other.counts
+        return self
+
+    def quantile(self, q):
+        """
+        q-quantile interpolated inside its bin. Values outside [low, high]
+        are clamped to the range, so those quantiles are only bounds.
+        """
+        total = int(self.counts.sum())
+        if total == 0:
+            raise ValueError("Cannot take a quantile of an empty histogram.")
+        q = np.asarray(q, dtype=np.float64)
+        target = q * total
+        cumulative = np.cumsum(self.counts)
+        index = np.minimum(np.searchsorted(cumulative, target, side="left"), self.bins + 1)
+        before = np.where(index > 0, cumulative[index - 1], 0)
+        within = np.divide(target - before, self.counts[index], out=np.zeros_like(target),
+                           where=self.counts[index] > 0)
+        result = np.clip(self.low + (index - 1 + within) / self._scale, self.low, self.high)
+        return float(result) if result.ndim == 0 else result
+
+    def __len__(self):
+        return int(self.counts.sum())
+
+
+class StatsSketch:
+    """
+    Bounded-memory summary of the calculator's values: a KLL sketch for
+    quantiles and a fixed-bin histogram, both fed on every insert.
+    `k` sets the quantile accuracy and `bins` / `low` / `high` the histogram.
+    Single values are only appended to a short list and reach both through
+    their bulk updates, FLUSH_AT at a time or before the next read.
+    """
+
+    FLUSH_AT = 512
+
+    def __init__(self, k=200, bins=100, low=0.0, high=100.0, seed=None):
+        self._quantiles = KLLSketch(k, seed=seed)
+        self._histogram = FixedHistogram(low, high, bins)
+        self._pending = []  # Values pushed one at a time since the last flush
+
+    @classmethod
+    def from_settings(cls, settings):
+        """Build a sketch from SKETCH_K, SKETCH_BINS and SKETCH_RANGE ('low,high')."""
+        low, high = (float(bound) for bound in settings.get('SKETCH_RANGE', '0,100').split(','))
+        return cls(k=int(settings.get('SKETCH_K', 200)), bins=int(settings.get('SKETCH_BINS', 100)),
+                   low=low, high=high)
+
+    @property
+    def quantiles(self):
+        self._flush()
+        return self._quantiles
+
+    @property
+    def histogram(self):
+        self._flush()
+        return self._histogram
+
+    def _flush(self):
+        if self._pending:
+            nums = np.array(self._pending, dtype=np.float64)
+            self._pending = []
+            self._quantiles.update_many(nums)
+            self._histogram.update_many(nums)
+
+    def push(self, num):
+        pending = self._pending
+        pending.append(num)
+        if len(pending) >= self.FLUSH_AT:
+            self._flush()
+
+    def push_many(self, nums):
+        nums = np.asarray(nums, dtype=np.float64).ravel()
+        self._quantiles.update_many(nums)
+        self._histogram.update_many(nums)
+
+    def reset(self):
+        self._pending = []
+        self._quantiles.reset()
+        self._histogram.reset()
+
+    def merge(self, other):
+        self.quantiles.merge(other.quantiles)
+        self.histogram.merge(other.histogram)
+        return self
+
+    def quantile(self, q):
+        return self.quantiles.quantile(q)
+
+    def __len__(self):
+        return self.quantiles.count
@@ -0,0 +1,141 @@
+# app/plugins/calc/thread_safe.py
+
+import collections
+import math
+import threading
+import numpy as np
+from app.plugins.calc.calculator import Calculator
+
+
+class CalculatorSnapshot:
+    """
+    Immutable view of a calculator at one version: the total, the values and
+    the running moments, captured together under the write lock. The values
+    are a read-only view of the store's buffer; the store only ever writes
+    past its current size (or into a new buffer), so the view never changes.
+    """
+
+    __slots__ = ("value", "values", "count", "mean", "m2", "version", "_results")
+
+    def __init__(self, value, values, moments, version):
+        self.value = value
+        self.values = values
+        self.count, self.mean, self.m2 = moments
+        self.version = version
+        self._results = {}
+
+    def statistic(self, name):
+        """'mean', 'median', 'mode' or 'std' of this snapshot, computed once per snapshot."""
+        if name not in self._results:
+            self._results[name] = self._compute(name)
+        result = self._results[name]
+        return list(result) if isinstance(result, list) else result
+
+    def _compute(self, name):
+        if name == "mean":
+            return self.mean
+        if name == "std":
+            return math.sqrt(self.m2 / self.count) if self.count else 0.0
+        if name == "median":
+            return float(np.median(self.values))
+        if name == "mode":
+            uniques, counts = np.unique(self.values, return_counts=True)
+            return uniques[counts == counts.max()].tolist()
+        raise ValueError(f"Unknown statistic '{name}'.")
+
+
+class ThreadSafeCalculator(Calculator):
+    """
+    Calculator that can be shared between threads.
+
+    add_value only queues the number and then combines: whichever writer
+    holds the lock applies every queued number as one batch (one extend,
+    one stats merge), so contended writers batch instead of convoying. Other
+    writes drain the queue first, keeping the order of operations.
+
+    After every write a new CalculatorSnapshot is published with a single
+    reference assignment; readers (snapshot(), statistic()) never take the
+    lock and always see a total, values and moments that belong together.
+    """
+
+    def __init__(self, sketch=None):
+        self._lock = threading.RLock()
+        self._queued = collections.deque()
+        self._snapshot = None
+        super().__init__(sketch)
+        self._publish()
+
+    def _publish(self):
+        self._snapshot = CalculatorSnapshot(self.value, self._values.view(), self.stats.moments(),
+                                            self._values.version)
+
+    def _apply_queued(self):
+        """Apply the numbers queued by add_value; the caller holds the lock."""
+        batch = []
+        while True:
+            try:
+                batch.append(self._queued.popleft())
+            except IndexError:
+                break
+        if batch:
+            super().add_values(batch)
+
+    def _locked(method):  # pylint: disable=no-self-argument
+        """Run a Calculator write under the lock, after the queued adds, and publish the result."""
+        def write(self, *args, **kwargs):
+            with self._lock:
+                self._apply_queued()
+                result = method(self, *args, **kwargs)  # pylint: disable=not-callable
+                self._publish()
+                return result
+        write.__name__, write.__doc__ = method.__name__, method.__doc__
+        return write
+
+    def add_value(self, num):
+        """
+        Queue a value, then apply the queue unless another writer is already
+        doing so; either way the value is applied before this returns.
+        """
+        self._queued.append(float(num))
+        with self._lock:
+            if self._queued:
+                self._apply_queued()
+                self._publish()
+
+    @_locked
+    def flush(self):
+        """Apply any queued values now."""
+
+    subtract_value = _locked(Calculator.subtract_value)
+    multiply_value = _locked(Calculator.multiply_value)
+    divide_value = _locked(Calculator.divide_value)
+    add_values = _locked(Calculator.add_values)
+    subtract_values = _locked(Calculator.subtract_values)
+    multiply_values = _locked(Calculator.multiply_values)
+    divide_values = _locked(Calculator.divide_values)
+    add_grades = _locked(Calculator.add_grades)
+    load_state = _locked(Calculator.load_state)
+    reset = _locked(Calculator.reset)
+    undo = _locked(Calculator.undo)
+    redo = _locked(Calculator.redo)
+    truncate_values = _locked(Calculator.truncate_values)
+
+    del _locked
+
+    @Calculator.values.setter
+    def values(self, nums):
+        with self._lock:
+            self._apply_queued()
+            Calculator.values.fset(self, nums)
+            self._publish()
+
+    def snapshot(self):
+        """The latest consistent state; never blocks on writers."""
+        return self._snapshot
+
+    def statistic(self, name):
+        return self._snapshot.statistic(name)
+
+    def percentile(self, p):
+        with self._lock:
+            return super().percentile(p)
@@ -0,0 +1,192 @@
+# app/plugins/calc/undo_log.py
+
+import operator
+import numpy as np
+
+# Op codes of the operations the log can undo
+ADD, SUBTRACT, MULTIPLY, DIVIDE = 1, 2, 3, 4
+OPERATIONS = {ADD: "add", SUBTRACT: "subtract", MULTIPLY: "multiply", DIVIDE: "divide"}
+
+# Flags stored in the same byte as the op code
+OP_MASK = 7
+EXACT = 8        # The inverse operation gives the previous total back bit for bit
+BULK = 16        # Applied by one of the *_values methods
+CUMULATIVE = 32  # ... with cumulative=True, i.e. ufunc.accumulate rounding
+
+FORWARD = {ADD: operator.add, SUBTRACT: operator.sub, MULTIPLY: operator.mul, DIVIDE: operator.truediv}
+INVERSE = {ADD: operator.sub, SUBTRACT: operator.add, MULTIPLY: operator.truediv, DIVIDE: operator.mul}
+
+
+def _same(total, expected):
+    """Totals compare equal, NaN included: a NaN total is still the state the log left."""
+    return total == expected or (total != total and expected != expected)
+
+
+class UndoLog:
+    """
+    Undo/redo history of a calculator's arithmetic, one compact row per operation.
+
+    A row is a byte holding the op code and flags, the previous total and
+    where its operand(s) end in one flat float64 array: 17 bytes plus 8 per
+    operand, stored in columns that double when full. Rows before `cursor`
+    are applied, rows from it on were undone and can be redone until a new
+    operation cuts them off.
+
+    Undoing a scalar operation applies its inverse to the total (subtract
+    for add, multiply for divide, ...). Floating point does not always
+    invert, so push() tries the inverse once and, where it fails, the row
+    keeps the previous total to restore instead: multiplying by zero, most
+    divisions, additions that lose the low bits of a large total, and every
+    bulk operation. An undone add truncates the values; nothing is ever
+    copied from them.
+
+    The log also remembers the total and values version it expects. When
+    something it did not record changed them (reset, grades, an import),
+    the older rows no longer describe the state and the log starts over.
+
+    Scalar rows are first appended to a short list of tuples and written to
+    the columns FLUSH_AT at a time, or before anything reads them, so
+    interactive arithmetic does not pay for NumPy scalar stores.
+    """
+
+    FLUSH_AT = 256
+    _INITIAL_CAPACITY = 16
+
+    def __init__(self):
+        self.clear()
+
+    def clear(self):
+        """Forget every row."""
+        self._codes = np.zeros(self._INITIAL_CAPACITY, dtype=np.int8)  # Op code | flags
+        self._previous = np.zeros(self._INITIAL_CAPACITY, dtype=np.float64)
+        self._ends = np.zeros(self._INITIAL_CAPACITY, dtype=np.int64)  # End of each row's operands
+        self._operands = np.empty(self._INITIAL_CAPACITY, dtype=np.float64)
+        self._rows = 0
+        self.cursor = 0
+        self._end = 0  # End of the operands of the rows before the cursor
+        self._scalar = []  # (code, previous total, operand) of scalar rows after the cursor, not in the columns yet
+        self._total = None  # Total and values version after the last recorded, undone or redone operation
+        self._version = None
+
+    def __len__(self):
+        self._flush()
+        return self._rows
+
+    @property
+    def undoable(self):
+        self._flush()
+        return self.cursor
+
+    @property
+    def redoable(self):
+        self._flush()
+        return self._rows - self.cursor
+
+    def nbytes(self):
+        """Memory held by the columns and operands."""
+        self._flush()
+        return sum(column.nbytes for column in (self._codes, self._previous, self._ends, self._operands))
+
+    def matches(self, total, version):
+        """True when the calculator is still in the state the log last left it in."""
+        return _same(total, self._total) and version == self._version
+
+    def synced(self, total, version):
+        """Remember the state an undo or redo left the calculator in."""
+        self._total, self._version = total, version
+
+    def _reserve(self, operands, rows=1):
+        """Make room for `rows` more rows and `operands` more operands, doubling the columns."""
+        capacity = len(self._codes)
+        if self.cursor + rows > capacity:
+            while capacity < self.cursor + rows:
+                capacity *= 2
+            for name in ("_codes", "_previous", "_ends"):
+                column = getattr(self, name)
+                grown = np.zeros(capacity, dtype=column.dtype)
+                grown[:len(column)] = column
+                setattr(self, name, grown)
+        capacity = len(self._operands)
+        if self._end + operands > capacity:
+            while capacity < self._end + operands:
+                capacity *= 2
+            grown = np.empty(capacity, dtype=np.float64)
+            grown[:self._end] = self._operands[:self._end]
+            self._operands = grown
+
+    def push(self, op, operand, previous, total, version, version_after=None):
+        """
+        Record a scalar operation that took the total from `previous` to
+        `total` (and the values version from `version` to `version_after`,
+        when it changed). It gets the EXACT flag when its inverse gives
+        `previous` back. Rows that were undone are dropped.
+        """
+        if not _same(previous, self._total) or version != self._version:
+            self.clear()
+        self._rows = self.cursor
+        if (op != MULTIPLY or operand != 0) and INVERSE[op](total, operand) == previous:
+            op |= EXACT
+        self._scalar.append((op, previous, operand))
+        if len(self._scalar) >= self.FLUSH_AT:
+            self._flush()
+        self._total, self._version = total, version if version_after is None else version_after
+
+    def _flush(self):
+        """Write the buffered scalar rows to the columns."""
+        if not self._scalar:
+            return
+        codes, previous, operands = zip(*self._scalar)
+        self._scalar = []
+        count = len(codes)
+        self._reserve(count, count)
+        row, end = self.cursor, self._end
+        self._codes[row:row + count] = codes
+        self._previous[row:row + count] = previous
+        self._operands[end:end + count] = operands
+        self._ends[row:row + count] = np.arange(end + 1, end + count + 1)
+        self._rows = self.cursor = row + count
+        self._end = end + count
+
+    def push_many(self, op, operands, previous, total, version, version_after=None, cumulative=False):
+        """Record a bulk operation; its undo always restores the previous total."""
+        if not _same(previous, self._total) or version != self._version:
+            self.clear()
+        self._flush()
+        count = len(operands)
+        self._reserve(count)
+        row, end = self.cursor, self._end
+        self._codes[row] = op | BULK | (CUMULATIVE if cumulative else 0)
+        self._previous[row] = previous
+        self._operands[end:end + count] = operands
+        self._ends[row] = end + count
+        self._rows = self.cursor = row + 1
+        self._end = end + count
+        self._total, self._version = total, version if version_after is None else version_after
+
+    def _entry(self, row):
+        start = int(self._ends[row - 1]) if row else 0
+        operands = self._operands[start:int(self._ends[row])]
+        operands.flags.writeable = False
+        code = int(self._codes[row])
+        return code & OP_MASK, code & ~OP_MASK, operands, float(self._previous[row])
+
+    def undo(self):
+        """
+        Step back over the latest applied row and return it as
+        (op, flags, operands, previous total), or None at the start.
+        """
+        self._flush()
+        if not self.cursor:
+            return None
+        self.cursor -= 1
+        self._end = int(self._ends[self.cursor - 1]) if self.cursor else 0
+        return self._entry(self.cursor)
+
+    def redo(self):
+        """Step forward over the next undone row and return it like undo(), or None at the end."""
+        self._flush()
+        if self.cursor == self._rows:
+            return None
+        self.cursor += 1
+        self._end = int(self._ends[self.cursor - 1])
+        return self._entry(self.cursor - 1)
@@ -0,0 +1,169 @@
+# app/plugins/calc/value_store.py
+
+import numpy as np
+
+
+class ValueStore:
+    """
+    Compact, growable float64 store for the calculator's values.
+
+    Values live in a NumPy buffer that doubles when full, so appends are O(1)
+    amortized and each element costs 8 bytes instead of a boxed Python float.
+    The store keeps the list-like append/extend/clear semantics the commands
+    rely on and hands out a zero-copy view for vectorized consumers.
+
+    A slot is never written twice in the same buffer, so views handed out
+    earlier never change: after truncate() the next write copies the kept
+    values into a fresh buffer instead of overwriting the dropped ones.
+    """
+
+    _INITIAL_CAPACITY = 16
+
+    def __init__(self, iterable=(), stats=None, sketch=None):
+        self._buffer = np.empty(self._INITIAL_CAPACITY, dtype=np.float64)
+        self._size = 0
+        self._written = 0  # Slots of the buffer ever written; writes below it need a new buffer
+        self.version = 0  # Bumped on every mutation so derived results can be cached
+        self.stats = stats  # Optional RunningStats kept in sync with the contents
+        self.sketch = sketch  # Optional StatsSketch fed with every inserted value
+        self.journal = None  # Optional app.journal.Journal told about every append and clear
+        self.extend(iterable)
+
+    def _reserve(self, extra):
+        """
+        Make room for `extra` more values, growing the buffer geometrically.
+        """
+        needed = self._size + extra
+        capacity = len(self._buffer)
+        if needed <= capacity and self._size == self._written:
+            return
+        capacity = max(capacity, self._INITIAL_CAPACITY)
+        while capacity < needed:
+            capacity *= 2
+        buffer = np.empty(capacity, dtype=np.float64)
+        buffer[:self._size] = self._buffer[:self._size]
+        self._buffer = buffer
+        self._written = self._size
+
+    def append(self, num):
+        self._reserve(1)
+        self._buffer[self._size] = num
+        self._size += 1
+        self._written = self._size
+        self.version += 1
+        if self.stats is not None:
+            self.stats.push(num)
+        if self.sketch is not None:
+            self.sketch.push(num)
+        if self.journal is not None:
+            self.journal.values_added((num,))
+
+    def extend(self, nums):
+        if isinstance(nums, ValueStore):
+            nums = nums.view()
+        elif not isinstance(nums, np.ndarray) and not hasattr(nums, '__len__'):
+            nums = np.fromiter(nums, dtype=np.float64)
+        nums = np.asarray(nums, dtype=np.float64).ravel()
+        if nums.size == 0:
+            return
+        self._reserve(nums.size)
+        self._buffer[self._size:self._size + nums.size] = nums
+        self._size += nums.size
+        self._written = self._size
+        self.version += 1
+        if self.stats is not None:
+            self.stats.push_many(nums)
+        if self.sketch is not None:
+            self.sketch.push_many(nums)
+        if self.journal is not None:
+            self.journal.values_added(nums)
+
+    def __iadd__(self, nums):
+        self.extend(nums)
+        return self
+
+    def clear(self):
+        """
+        Drop every value and shrink back to the initial capacity.
+        """
+        self._buffer = np.empty(self._INITIAL_CAPACITY, dtype=np.float64)
+        self._size = self._written = 0
+        self.version += 1
+        if self.stats is not None:
+            self.stats.reset()
+        if self.sketch is not None:
+            self.sketch.reset()
+        if self.journal is not None:
+            self.journal.values_cleared()
+
+    def adopt(self, buffer):
+        """
+        Use an existing float64 array (e.g. a read-only memmap) as the contents
+        without copying or notifying the stats or the sketch. The first append that needs
+        more room copies it into a new, larger in-memory buffer.
+        """
+        if buffer.dtype != np.float64 or buffer.ndim != 1:
+            raise ValueError("ValueStore can only adopt a 1-D float64 array.")
+        self._buffer = buffer
+        self._size = self._written = len(buffer)
+        self.version += 1
+
+    def truncate(self, size):
+        """
+        Drop the values past the first `size`, taking them back out of the
+        stats, and return them (a read-only view that stays valid). The
+        sketch cannot forget values, so the caller decides how to rebuild it.
+        """
+        removed = self.view()[size:]
+        if removed.size == 0:
+            return removed
+        self._size = size
+        self.version += 1
+        if self.stats is not None:
+            if removed.size == 1:
+                self.stats.remove(removed[0], kept=self.view())
+            else:
+                self.stats.remove_many(removed, kept=self.view())
+        if self.journal is not None:
+            self.journal.values_truncated(size)
+        return removed
+
+    def view(self):
+        """
+        Read-only NumPy view of the stored values (no copy).
+        """
+        view = self._buffer[:self._size]
+        view.flags.writeable = False
+        return view
+
+    def tolist(self):
+        return self.view().tolist()
+
+    def __array__(self, dtype=None, copy=None):
+        view = self.view()
+        if dtype is not None and dtype != view.dtype:
+            return view.astype(dtype)
+        return view.copy() if copy else view
+
+    def __len__(self):
+        return self._size
+
+    def __iter__(self):
+        return iter(self.view())
+
+    def __getitem__(self, index):
+        return self.view()[index]
+
+    def __eq__(self, other):
+        if isinstance(other, ValueStore):
+            other = other.view()
+        try:
+            other = np.asarray(other, dtype=np.float64)
+        except (TypeError, ValueError):
+            return NotImplemented
+        return other.shape == (self._size,) and bool(np.array_equal(self.view(), other))
+
+    __hash__ = None
+
+    def __repr__(self):
+        return f"ValueStore({self.tolist()})"
@@ -3,17 +3,37 @@ import os
 from app.commands import Command
 import pandas as pd
 
+DATA_DIR = './data'
+
+
+def ensure_data_dir(data_dir=DATA_DIR):
+    """Create the data directory if needed and check it is writable (LBYL)."""
+    if not os.path.exists(data_dir):
+        os.makedirs(data_dir)
+        logging.info("The directory '%s' was created.", data_dir)
+    elif not os.access(data_dir, os.W_OK):
+        logging.error("The directory '%s' is not writable.", data_dir)
+        return False
+    return True
+
+
+def export_csv(df, file_name, data_dir=DATA_DIR):
+    """Write a DataFrame to `file_name` in the data directory; returns the path or None."""
+    if not ensure_data_dir(data_dir):
+        return None
+    csv_file_path = os.path.join(data_dir, file_name)
+    df.to_csv(csv_file_path, index=False)
+    logging.info("Grades saved to CSV at '%s'.", csv_file_path)
+    return csv_file_path
+
+
 class CsvCommand(Command):
     def __init__(self, calculator):
         self.calculator = calculator
 
     def execute(self):
-        data_dir = './data'
-        if not os.path.exists(data_dir):
-            os.makedirs(data_dir)
-            logging.info(f"The directory '{data_dir}' was created.")
-        elif not os.access(data_dir, os.W_OK):
-            logging.error(f"The directory '{data_dir}' is not writable.")
+        data_dir = DATA_DIR
+        if not ensure_data_dir(data_dir):
             return
 
         # Example dictionary for grades (updated content)
@@ -32,11 +52,12 @@ class CsvCommand(Command):
         df_grades = pd.DataFrame(list(grades_dict.items()), columns=['Category', 'Grade'])
         csv_file_path = os.path.join(data_dir, 'grades_export.csv')
         df_grades.to_csv(csv_file_path, index=False)
-        logging.info(f"Grades saved to CSV at '{csv_file_path}'.")
+        logging.info("Grades saved to CSV at '%s'.", csv_file_path)
 
         # Only update calculator if grades are found
         if not df_grades.empty:
-            self.calculator.values.extend(df_grades['Grade'].tolist())
+            labels = df_grades['Category'].str.split('_', n=1, expand=True)
+            self.calculator.add_grades(labels[0].to_numpy(), labels[1].to_numpy(), df_grades['Grade'].to_numpy())
             print("\n📊 Added grades from CSV for statistical calculations. Use 'mean', 'median', or 'standard_deviation' to analyze.")
         else:
             logging.warning("No grades found to add to the calculator.")
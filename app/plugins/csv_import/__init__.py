@@ -0,0 +1,67 @@
+# app/plugins/csv_import/__init__.py
+
+import logging
+import os
+import time
+import numpy as np
+import pandas as pd
+from app.commands import Command
+
+
+class ImportCommand(Command):
+    """
+    Stream one column of a CSV file into the calculator's values.
+
+    Usage: import <path> [column] [dtype]. The file is read in chunks, each
+    chunk is coerced to `dtype` and appended to the value store in one call,
+    and rows that are empty or not numeric are counted and skipped. A file
+    that fails part-way is rolled back: nothing of it stays in the values.
+    """
+    command_name = "import"
+    arguments = "text"
+
+    def __init__(self, calculator, args=None, column="Grade", dtype="float64", chunk_size=100_000):
+        self.calculator = calculator
+        args = list(args or [])
+        self.path = args[0] if args else None
+        self.column = args[1] if len(args) > 1 else column
+        self.dtype = args[2] if len(args) > 2 else dtype
+        self.chunk_size = chunk_size
+
+    def execute(self):
+        if not self.path:
+            print("❌ Error: Please enter a CSV file to import (e.g., 'import data/grades_export.csv Grade').")
+            return None
+        if not os.path.exists(self.path):
+            print(f"❌ Error: File '{self.path}' does not exist.")
+            return None
+        try:
+            dtype = np.dtype(self.dtype)
+        except TypeError:
+            print(f"❌ Error: Unknown dtype '{self.dtype}'.")
+            return None
+
+        start = time.perf_counter()
+        imported = bad = 0
+        size = len(self.calculator.values)
+        try:
+            for chunk in pd.read_csv(self.path, usecols=[self.column], chunksize=self.chunk_size):
+                numbers = pd.to_numeric(chunk[self.column], errors="coerce").to_numpy(dtype=np.float64)
+                valid = ~np.isnan(numbers)
+                if dtype.kind in "iu":
+                    valid &= np.mod(numbers, 1) == 0
+                grades = numbers[valid].astype(dtype, copy=False)
+                self.calculator.values.extend(grades)
+                imported += grades.size
+                bad += numbers.size - grades.size
+        except ValueError as e:
+            self.calculator.truncate_values(size)
+            print(f"❌ Error: Could not import '{self.path}': {e}")
+            return None
+
+        elapsed = time.perf_counter() - start
+        rate = (imported + bad) / elapsed if elapsed > 0 else float("inf")
+        logging.info("Imported %s rows (%s bad) from '%s' in %.3fs.", imported, bad, self.path, elapsed)
+        print(f"\n📥 Imported {imported} rows from '{self.path}' ({bad} bad rows skipped) "
+              f"in {elapsed:.3f}s ({rate:,.0f} rows/s).")
+        return imported
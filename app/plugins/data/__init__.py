@@ -1,16 +1,114 @@
 import logging
 import os
+import sys
+import numpy as np
 import pandas as pd
 from app.commands import Command
 
+CATEGORIES = ('assignment', 'project', 'midterm', 'finals')
+
+
+def read_grade_table(source):
+    """
+    Read a batch of grades into (classes, categories, raw cells).
+
+    A path, '-' (stdin), a file-like object or a DataFrame holds one row per
+    class: the class label, then one column per category (the CSV header names
+    the categories). A plain matrix holds only grades, in CATEGORIES order,
+    for classes named class1..classN. Cells are not validated here.
+    """
+    if isinstance(source, (str, os.PathLike)) or hasattr(source, 'read'):
+        source = sys.stdin if source == '-' else source
+        source = pd.read_csv(source, dtype=str, keep_default_na=False, skipinitialspace=True)
+    if isinstance(source, pd.DataFrame):
+        if source.shape[1] < 2:
+            raise ValueError("Expected a class column followed by one column per category.")
+        classes = source.iloc[:, 0].astype(str).to_numpy()
+        return classes, [str(name) for name in source.columns[1:]], source.iloc[:, 1:].to_numpy(dtype=object)
+
+    raw = np.asarray(source, dtype=object)
+    if raw.ndim != 2 or raw.shape[1] != len(CATEGORIES):
+        raise ValueError(f"Expected a matrix with one column per category {CATEGORIES}.")
+    classes = np.array([f"class{row}" for row in range(1, len(raw) + 1)])
+    return classes, list(CATEGORIES), raw
+
+
+def validate_grades(raw):
+    """
+    Validate a matrix of grade cells in one pass. Returns the float grades and
+    a dict of boolean masks: 'non-numeric', 'missing or NaN' and 'negative'.
+    """
+    grades = pd.to_numeric(pd.Series(raw.ravel()), errors='coerce').to_numpy(dtype=np.float64).reshape(raw.shape)
+    text = np.char.lower(np.char.strip(raw.astype(str)))
+    missing = pd.isna(raw) | np.isin(text, ('', 'nan', 'none'))
+    return grades, {
+        'non-numeric': np.isnan(grades) & ~missing,
+        'missing or NaN': missing,
+        'negative': grades < 0,
+    }
+
+
 class DataCommand(Command):
-    def __init__(self, calculator):
+    """
+    Enter grades per class and category. Without a source the grades are
+    prompted for interactively; with one ('grades <file>', 'grades -' for
+    stdin, or a matrix passed in code) the whole batch is validated at once.
+    """
+
+    command_name = "grades"
+    arguments = "text"
+
+    def __init__(self, calculator, source=None):
         self.calculator = calculator
+        if isinstance(source, (list, tuple)) and all(isinstance(token, str) for token in source):
+            source = source[0] if source else None  # REPL/script arguments: the path
+        self.source = source
 
     def execute(self):
-        categories = ('assignment', 'project', 'midterm', 'finals')
+        if self.source is not None:
+            try:
+                added, rejected = self.add_bulk(self.source)
+            except (OSError, ValueError, pd.errors.ParserError) as e:
+                print(f"❌ Error: Could not read grades: {e}")
+                return None
+            for row, reasons in rejected:
+                print(f"❌ Row {row}: {reasons}")
+            print(f"\n✅ Added {added} grades; {len(rejected)} rows rejected.")
+            return None
+        return self.prompt_grades()
+
+    def add_bulk(self, source):
+        """
+        Validate a batch of grades and add the valid rows in one operation.
+        Returns (grades added, [(row number, reasons)]) with 1-based row numbers.
+        """
+        classes, categories, raw = read_grade_table(source)
+        grades, problems = validate_grades(raw)
+        bad = np.zeros(grades.shape, dtype=bool)
+        for mask in problems.values():
+            bad |= mask
+        rejected_rows = bad.any(axis=1)
+
+        rejected = []
+        for row in np.flatnonzero(rejected_rows).tolist():
+            reasons = [f"{problem} value in '{categories[column]}'"
+                       for problem, mask in problems.items() for column in np.flatnonzero(mask[row]).tolist()]
+            rejected.append((row + 1, "; ".join(reasons)))
+
+        accepted = grades[~rejected_rows]
+        if accepted.size:
+            self.calculator.add_grades(np.repeat(classes[~rejected_rows], len(categories)),
+                                       np.tile(categories, len(accepted)), accepted.ravel())
+        if rejected:
+            logging.warning("Rejected %s of %s grade rows.", len(rejected), len(grades))
+        return accepted.size, rejected
+
+    def prompt_grades(self):
+        categories = CATEGORIES
         classes = ['class1', 'class2']
         grades_list = []
+        class_labels = []
+        category_labels = []
 
         print("\n📊 Enter grades for each category and class.")
         
@@ -33,6 +131,8 @@ class DataCommand(Command):
                             break
 
                         grades_list.append(grade)
+                        class_labels.append(cls)
+                        category_labels.append(category)
                         break
                     
                     except ValueError:
@@ -40,7 +140,7 @@ class DataCommand(Command):
 
         # Update calculator values
         if grades_list:
-            self.calculator.values.extend(grades_list)
+            self.calculator.add_grades(class_labels, category_labels, grades_list)
             print("\n✅ Grades added to the calculator.")
         else:
             print("\n⚠️ No valid grades were added.")
@@ -55,10 +155,10 @@ class DataCommand(Command):
         
         if not os.path.exists(data_dir):
             os.makedirs(data_dir)
-            logging.info(f"The directory '{data_dir}' was created.")
+            logging.info("The directory '%s' was created.", data_dir)
 
         csv_file_path = os.path.join(data_dir, 'grades_export.csv')
-        df_grades = pd.DataFrame(self.calculator.values, columns=['Grade'])
+        df_grades = pd.DataFrame({'Grade': self.calculator.values.view()})
         df_grades.to_csv(csv_file_path, index=False)
-        logging.info(f"Grades saved to CSV at '{csv_file_path}'.")
+        logging.info("Grades saved to CSV at '%s'.", csv_file_path)
         print(f"\n📁 Grades saved to '{csv_file_path}'.")
@@ -0,0 +1,69 @@
+# app/plugins/final_grades/__init__.py
+
+import logging
+import os
+import pandas as pd
+from app.commands import Command
+from app.plugins.csv import export_csv
+
+# The 'csv' command labels the last exam 'final' and 'grades' labels it 'finals'; both get the same weight
+DEFAULT_WEIGHTS = {"assignment": 0.2, "project": 0.2, "midterm": 0.25, "final": 0.35, "finals": 0.35}
+
+
+def parse_weights(spec):
+    """Parse 'category=weight' pairs (a comma-separated string or a list of tokens) into a dict."""
+    if isinstance(spec, str):
+        spec = spec.replace(",", " ").split()
+    weights = {}
+    for pair in spec:
+        category, sep, weight = pair.partition("=")
+        if not sep or not category:
+            raise ValueError(f"Invalid weight '{pair}'; use category=weight.")
+        weights[category] = float(weight)
+        if weights[category] < 0:
+            raise ValueError(f"Weight for '{category}' must not be negative.")
+    return weights
+
+
+class FinalGradesCommand(Command):
+    """
+    Weighted final grade per class from the labeled grades, exported to
+    ./data/final_grades.csv. Weights come from the command arguments
+    (e.g. 'final_grades midterm=0.3 final=0.4'), else GRADE_WEIGHTS, else DEFAULT_WEIGHTS.
+    """
+
+    arguments = "text"
+
+    def __init__(self, calculator, args=None):
+        self.calculator = calculator
+        self.args = args or []
+
+    def weights(self):
+        if self.args:
+            return parse_weights(self.args)
+        spec = os.getenv("GRADE_WEIGHTS")
+        return parse_weights(spec) if spec else dict(DEFAULT_WEIGHTS)
+
+    def execute(self):
+        if not len(self.calculator.grades):
+            print("⚠️ No labeled grades added yet. Use 'grades' or 'csv' first.")
+            return None
+        try:
+            weights = self.weights()
+        except ValueError as e:
+            print(f"❌ Error: {e}")
+            return None
+
+        result = self.calculator.grades.final_grades(weights)
+        table = pd.DataFrame(result["means"].round(2), columns=result["categories"],
+                             index=pd.Index(result["classes"], name="Class"))
+        table["Final Grade"] = result["final"].round(2)
+        print("📊 Weighted final grades:")
+        print(table.to_string())
+
+        csv_file_path = export_csv(table.reset_index(), "final_grades.csv")
+        if csv_file_path:
+            print(f"\n📁 Final grades saved to '{csv_file_path}'.")
+        else:
+            logging.warning("Final grades were not exported.")
+        return None
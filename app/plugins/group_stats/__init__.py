@@ -0,0 +1,34 @@
+# app/plugins/group_stats/__init__.py
+
+import pandas as pd
+from app.commands import Command
+
+
+class GroupStatsCommand(Command):
+    """Mean, median, standard deviation and mode of the grades per class or per category."""
+
+    arguments = "text"
+
+    def __init__(self, calculator, args=None):
+        self.calculator = calculator
+        self.by = args[0] if args else "class"
+
+    def execute(self):
+        if not len(self.calculator.grades):
+            print("⚠️ No labeled grades added yet. Use 'grades' or 'csv' first.")
+            return None
+        if self.by not in self.calculator.grades.GROUPINGS:
+            print(f"❌ Error: Unknown grouping '{self.by}'. Use 'class' or 'category'.")
+            return None
+
+        stats = self.calculator.grades.group_stats(self.by)
+        table = pd.DataFrame({
+            "Count": stats["count"],
+            "Mean": stats["mean"].round(2),
+            "Median": stats["median"].round(2),
+            "Standard Deviation": stats["std"].round(2),
+            "Mode": stats["mode"],
+        }, index=pd.Index(stats["groups"], name=self.by.capitalize()))
+        print(f"📊 Statistics by {self.by}:")
+        print(table.to_string())
+        return None
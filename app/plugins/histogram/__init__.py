@@ -0,0 +1,26 @@
+# app/plugins/histogram/__init__.py
+
+from app.commands import Command
+
+
+class HistogramCommand(Command):
+    """Counts of the values per bin of the sketch's fixed-bin histogram, e.g. 'histogram'."""
+
+    def __init__(self, calculator):
+        self.calculator = calculator
+
+    def execute(self):
+        if not self.calculator.values:
+            print("⚠️ No values added yet. Cannot build a histogram.")
+            return None
+        histogram = self.calculator.histogram()
+        counts = histogram.counts.tolist()
+        edges = histogram.edges.tolist()
+        if counts[0]:
+            print(f"📊 below {edges[0]:g}: {counts[0]}")
+        for low, high, count in zip(edges, edges[1:], counts[1:-1]):
+            if count:
+                print(f"📊 {low:g} to {high:g}: {count}")
+        if counts[-1]:
+            print(f"📊 above {edges[-1]:g}: {counts[-1]}")
+        return counts
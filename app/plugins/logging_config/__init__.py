@@ -1,36 +1,183 @@
+import atexit
 import logging
+import logging.handlers
 import os
-from dotenv import load_dotenv
+import queue
+import threading
+
+# Listener draining the log queue; replaced each time logging is (re)configured
+_listener = None
+
+
+class BufferedRotatingFileHandler(logging.handlers.RotatingFileHandler):
+    """
+    Rotating file handler that collects formatted records and writes them in
+    one batch on flush(), checking the size limit once per batch instead of
+    once per record. Errors (and a full buffer) are written immediately.
+    """
+
+    def __init__(self, filename, max_bytes=0, backup_count=0, capacity=512):
+        super().__init__(filename, maxBytes=max_bytes, backupCount=backup_count, delay=True)
+        self.capacity = capacity
+        self.buffer = []
+
+    def emit(self, record):
+        try:
+            self.buffer.append(self.format(record) + self.terminator)
+        except Exception:  # pylint: disable=broad-except
+            self.handleError(record)
+            return
+        if len(self.buffer) >= self.capacity or record.levelno >= logging.ERROR:
+            self.flush()
+
+    def flush(self):
+        self.acquire()
+        try:
+            if not self.buffer:
+                return
+            if self.stream is None:
+                self.stream = self._open()
+            self.stream.write("".join(self.buffer))
+            self.stream.flush()
+            self.buffer = []
+            if self.maxBytes > 0 and self.stream.tell() >= self.maxBytes:
+                self.doRollover()
+        finally:
+            self.release()
+
+    def close(self):
+        self.flush()
+        super().close()
+
+
+class RecordQueueHandler(logging.handlers.QueueHandler):
+    """
+    QueueHandler that enqueues the record with its message already merged
+    (so arguments mutated after the call are logged as they were) but
+    otherwise untouched: the formatter runs on the listener thread.
+    """
+
+    def prepare(self, record):
+        record.msg = record.getMessage()
+        record.args = None
+        return record
+
+
+class BatchingQueueListener:
+    """
+    Background thread draining a log queue: it handles every record already
+    queued (up to batch_size) and then flushes its handlers once per batch.
+    """
+
+    _stop = object()  # Queued by stop() to end the thread
+
+    def __init__(self, log_queue, *handlers, batch_size=512):
+        self.queue = log_queue
+        self.handlers = handlers
+        self.batch_size = batch_size
+        self._thread = None
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name="log-listener", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """Handle whatever is still queued, then end the thread."""
+        if self._thread is not None:
+            self.queue.put(self._stop)
+            self._thread.join()
+            self._thread = None
+
+    def handle(self, record):
+        for handler in self.handlers:
+            if record.levelno >= handler.level:
+                handler.handle(record)
+
+    def _run(self):
+        has_task_done = hasattr(self.queue, 'task_done')
+        stop = False
+        while not stop:
+            batch = [self.queue.get()]
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(self.queue.get_nowait())
+                except queue.Empty:
+                    break
+
+            for record in batch:
+                if record is self._stop:
+                    stop = True
+                else:
+                    self.handle(record)
+            for handler in self.handlers:
+                try:
+                    handler.flush()
+                except (OSError, ValueError):  # e.g. the console stream was closed under us
+                    pass
+            if has_task_done:
+                for _ in batch:
+                    self.queue.task_done()
+
+
+def stop_logging():
+    """Flush and stop the background log listener, if one is running."""
+    global _listener  # pylint: disable=global-statement
+    if _listener is not None:
+        _listener.stop()
+        for handler in _listener.handlers:
+            handler.close()
+        _listener = None
+
 
 def configure_logging():
-    """Configure logging settings based on environment variables."""
-    load_dotenv()  # Load environment variables
+    """Configure logging settings based on environment variables (.env is loaded by App).
 
-    # Get log level and log file path from environment variables
-    log_level = os.getenv('LOG_LEVEL', 'DEBUG').upper()  # Default to DEBUG if not set
+    By default records go through a queue to a background listener that writes
+    them to a size-rotated file in batches (and to the console); set
+    LOG_ASYNC=false to attach the handlers to the root logger directly.
+    """
+    global _listener  # pylint: disable=global-statement
+
+    # Get log level, log file path and rotation settings from environment variables
+    log_level = os.getenv('LOG_LEVEL', 'INFO').upper()  # Default to INFO, as in logging.conf
     log_file = os.getenv('LOG_FILE', './app.log')  # Default to 'app.log' if not set
+    max_bytes = int(os.getenv('LOG_MAX_BYTES', '1048576'))  # Rotation limits from logging.conf
+    backup_count = int(os.getenv('LOG_BACKUP_COUNT', '5'))
+    use_queue = os.getenv('LOG_ASYNC', 'true').lower() not in ('0', 'false', 'no')
+    level = getattr(logging, log_level, logging.INFO)
 
     # Set up log format
-    log_format = '%(asctime)s - %(levelname)s - %(message)s'
+    log_format = logging.Formatter('%(asctime)s - %(levelname)s - %(message)s')
 
     # Create a logger
     logger = logging.getLogger()
-    logger.setLevel(getattr(logging, log_level, logging.DEBUG))
+    logger.setLevel(level)
 
     # Create file handler
-    file_handler = logging.FileHandler(log_file)
-    file_handler.setLevel(getattr(logging, log_level, logging.DEBUG))
-    file_handler.setFormatter(logging.Formatter(log_format))
+    file_handler = BufferedRotatingFileHandler(log_file, max_bytes=max_bytes, backup_count=backup_count,
+                                               capacity=512 if use_queue else 1)
+    file_handler.setLevel(level)
+    file_handler.setFormatter(log_format)
 
     # Create console handler
     console_handler = logging.StreamHandler()
-    console_handler.setLevel(getattr(logging, log_level, logging.DEBUG))
-    console_handler.setFormatter(logging.Formatter(log_format))
+    console_handler.setLevel(level)
+    console_handler.setFormatter(log_format)
 
-    # Clear existing handlers and add new ones
+    # Clear existing handlers (stopping a previous listener) and add new ones
+    stop_logging()
     logger.handlers = []
-    logger.addHandler(file_handler)
-    logger.addHandler(console_handler)
+    if use_queue:
+        log_queue = queue.SimpleQueue()
+        _listener = BatchingQueueListener(log_queue, file_handler, console_handler)
+        _listener.start()
+        logger.addHandler(RecordQueueHandler(log_queue))
+    else:
+        logger.addHandler(file_handler)
+        logger.addHandler(console_handler)
 
     # Log the initial configuration
-    logger.debug(f"Logging configured. Level: {log_level}, File: {log_file}")
+    logger.debug("Logging configured. Level: %s, File: %s, Queue: %s", log_level, log_file, use_queue)
+
+
+atexit.register(stop_logging)
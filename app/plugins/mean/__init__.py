@@ -1,4 +1,3 @@
-import numpy as np
 from app.commands import Command
 
 class MeanCommand(Command):
@@ -9,7 +8,7 @@ class MeanCommand(Command):
         if not self.calculator.values:
             print("⚠️ No values added yet. Cannot calculate mean.")
             return None
-        mean_value = np.mean(self.calculator.values)
+        mean_value = self.calculator.statistic("mean")
         mean_value = round(mean_value, 2)  # Round to 2 decimal places
         print(f"📊 Mean: {mean_value}")
         return mean_value
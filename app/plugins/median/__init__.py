@@ -1,4 +1,3 @@
-import numpy as np
 from app.commands import Command
 
 class MedianCommand(Command):
@@ -9,7 +8,7 @@ class MedianCommand(Command):
         if not self.calculator.values:
             print("⚠️ No values added yet. Cannot calculate median.")
             return None
-        median_value = np.median(self.calculator.values)
+        median_value = self.calculator.statistic("median")
         median_value = round(median_value, 2)  # Round to 2 decimal places
         print(f"📊 Median: {median_value}")
         return median_value
@@ -0,0 +1,27 @@
+# app/plugins/percentile/__init__.py
+
+import numpy as np
+from app.commands import Command
+
+
+class PercentileCommand(Command):
+    """Approximate percentile(s) of the values from the bounded-memory sketch, e.g. 'percentile 90'."""
+
+    value_optional = True  # A bare 'percentile' is the median
+
+    def __init__(self, calculator, value=50):
+        self.calculator = calculator
+        self.value = value
+
+    def execute(self):
+        if not self.calculator.values:
+            print("⚠️ No values added yet. Cannot calculate percentile.")
+            return None
+        percentiles = np.asarray(self.value, dtype=np.float64)
+        if np.any((percentiles < 0) | (percentiles > 100)):
+            print("❌ Error: Percentiles must be between 0 and 100.")
+            return None
+        result = self.calculator.percentile(percentiles)
+        for p, estimate in zip(np.atleast_1d(percentiles).tolist(), np.atleast_1d(result).tolist()):
+            print(f"📊 {p:g}th percentile (approx.): {round(estimate, 2)}")
+        return result
@@ -0,0 +1,76 @@
+# app/plugins/profile/__init__.py
+
+import os
+from app.commands import Command
+from app.metrics import DEFAULT_METRICS_FILE, Instrumentation
+
+
+class ProfileCommand(Command):
+    """
+    Per-command metrics of this session's handler.
+
+    Usage: 'profile' shows count, errors and p50/p99/max latency per command;
+    'profile on [alloc]' and 'profile off' switch the instrumentation (alloc
+    also traces allocations), 'profile reset' clears the numbers and
+    'profile dump [path]' writes them as JSON (METRICS_FILE by default).
+    """
+
+    def __init__(self, command_handler, args=None):
+        self.command_handler = command_handler
+        self.args = list(args or [])
+
+    def execute(self):
+        action = self.args[0] if self.args else "show"
+        instrumentation = self.command_handler.instrumentation
+
+        if action == "on":
+            if instrumentation is not None:
+                instrumentation.close()
+            instrumentation = Instrumentation(trace_allocations="alloc" in self.args[1:])
+            self.command_handler.instrument(instrumentation)
+            print("✅ Command metrics on" + (" (tracing allocations)." if instrumentation.trace_allocations else "."))
+            return None
+        if instrumentation is None:
+            print("⚠️ Command metrics are off. Use 'profile on' or set COMMAND_METRICS=1.")
+            return None
+        if action == "off":
+            instrumentation.close()
+            self.command_handler.instrument(None)
+            print("✅ Command metrics off.")
+        elif action == "reset":
+            instrumentation.reset()
+            print("✅ Command metrics cleared.")
+        elif action == "dump":
+            path = self.args[1] if len(self.args) > 1 else os.getenv("METRICS_FILE", DEFAULT_METRICS_FILE)
+            print(f"📁 Command metrics saved to '{instrumentation.dump(path)}'.")
+        elif action == "show":
+            return self.show(instrumentation)
+        else:
+            print(f"❌ Error: Unknown profile action '{action}'; use on, off, reset or dump.")
+        return None
+
+    @staticmethod
+    def show(instrumentation):
+        summary = instrumentation.summary()
+        if not summary:
+            print("⚠️ No commands recorded yet.")
+            return summary
+        columns = ["count", "errors", "mean_us", "p50_us", "p99_us", "max_us"]
+        if instrumentation.trace_allocations:
+            columns += ["allocated_kb", "peak_kb"]
+        width = max(len("command"), *(len(name) for name in summary))
+        print("📈 Command metrics:")
+        print(f"{'command':<{width}}" + "".join(f"{column:>14}" for column in columns))
+        for name, metrics in summary.items():
+            metrics = dict(metrics, errors=sum(metrics["errors"].values()))
+            print(f"{name:<{width}}" + "".join(f"{metrics[column]:>14}" for column in columns))
+        return summary
+
+
+def register_commands(command_handler, calculator):
+    # The command reports on the handler it runs on, so it is bound to it here
+    def profile(_calculator, args=None):
+        return ProfileCommand(command_handler, args).execute()
+
+    profile.arguments = "text"
+    command_handler.register_command("profile", profile)
@@ -1,5 +1,4 @@
 import logging
-import numpy as np
 from app.commands import Command
 
 class StandardDeviationCommand(Command):
@@ -11,7 +10,7 @@ class StandardDeviationCommand(Command):
             print("⚠️ No values added yet. Cannot calculate standard deviation.")
             return None
 
-        std_dev = np.std(self.calculator.values)
+        std_dev = self.calculator.statistic("std")
         std_dev_rounded = round(std_dev, 2)  # Round to 2 decimal places
 
         print(f"📊 Standard Deviation: {std_dev_rounded}")
@@ -0,0 +1,71 @@
+# app/plugins/undo/__init__.py
+
+from app.commands import Command
+
+
+def describe(operation, operands):
+    """'add 5' or 'add 3 values' for a step returned by Calculator.undo()/redo()."""
+    if len(operands) == 1:
+        return f"{operation} {float(operands[0]):g}"
+    return f"{operation} {len(operands)} values"
+
+
+def parse_steps(args):
+    """The step count of 'undo [n]' / 'redo [n]' (1 without an argument), or None unless n is a positive integer."""
+    if not args:
+        return 1
+    try:
+        steps = int(args[0])
+    except ValueError:
+        return None
+    return steps if steps > 0 else None
+
+
+class UndoCommand(Command):
+    """Revert the last arithmetic command(s), e.g. 'undo' or 'undo 3'."""
+
+    arguments = "text"
+
+    def __init__(self, calculator, args=None):
+        self.calculator = calculator
+        self.steps = parse_steps(args)
+
+    def execute(self):
+        if self.steps is None:
+            print("❌ Error: The number of steps must be a positive whole number.")
+            return None
+        undone = 0
+        for _ in range(self.steps):
+            step = self.calculator.undo()
+            if step is None:
+                break
+            undone += 1
+            print(f"↩️ Undid {describe(*step)}.")
+        if not undone:
+            print("⚠️ Nothing to undo.")
+        return self.calculator.value
+
+
+class RedoCommand(Command):
+    """Apply the last undone arithmetic command(s) again, e.g. 'redo' or 'redo 3'."""
+
+    arguments = "text"
+
+    def __init__(self, calculator, args=None):
+        self.calculator = calculator
+        self.steps = parse_steps(args)
+
+    def execute(self):
+        if self.steps is None:
+            print("❌ Error: The number of steps must be a positive whole number.")
+            return None
+        redone = 0
+        for _ in range(self.steps):
+            step = self.calculator.redo()
+            if step is None:
+                break
+            redone += 1
+            print(f"↪️ Redid {describe(*step)}.")
+        if not redone:
+            print("⚠️ Nothing to redo.")
+        return self.calculator.value
@@ -0,0 +1,172 @@
+# app/profiler/__init__.py
+# Opt-in profiling of an App session: cProfile for exact call counts and
+# times (written as .pstats) or a sampling thread for low-overhead stacks
+# (written as collapsed stacks for flame graphs). Either covers the whole
+# session or only the commands named in PROFILE_COMMANDS.
+
+import cProfile
+import logging
+import os
+import sys
+import threading
+import time
+
+DEFAULT_PROFILE_DIR = "./logs/profile"
+MODES = ("cprofile", "sample")
+
+
+class StackSampler:
+    """
+    Samples the stack of one thread every `interval` seconds from a daemon
+    thread and counts each distinct stack. Only samples taken while `active`
+    is set are kept, so it can be narrowed to chosen commands.
+    """
+
+    def __init__(self, interval=0.005, thread_id=None):
+        self.interval = interval
+        self.thread_id = thread_id if thread_id is not None else threading.get_ident()
+        self.active = False
+        self.stacks = {}  # Collapsed stack -> number of samples
+        self.samples = 0
+        self._labels = {}  # Code object -> frame label
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="stack-sampler", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        if self._thread is not None:
+            self._stop.set()
+            self._thread.join()
+            self._thread = None
+
+    def _label(self, code):
+        label = self._labels.get(code)
+        if label is None:
+            path = code.co_filename
+            try:
+                path = os.path.relpath(path)
+            except ValueError:  # Another drive on Windows
+                pass
+            if path.startswith(".."):
+                path = os.path.basename(path)
+            label = self._labels[code] = f"{path}:{code.co_name}"
+        return label
+
+    def sample(self):
+        """Record the current stack of the sampled thread, outermost frame first."""
+        frame = sys._current_frames().get(self.thread_id)  # pylint: disable=protected-access
+        frames = []
+        while frame is not None:
+            frames.append(self._label(frame.f_code))
+            frame = frame.f_back
+        if frames:
+            stack = ";".join(reversed(frames))
+            self.stacks[stack] = self.stacks.get(stack, 0) + 1
+            self.samples += 1
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            if self.active:
+                self.sample()
+
+    def collapsed(self):
+        """Lines of 'frame;frame;frame count', most sampled first, as flamegraph.pl and speedscope read them."""
+        return [f"{stack} {count}" for stack, count in sorted(self.stacks.items(), key=lambda item: -item[1])]
+
+
+class SessionProfiler:
+    """
+    Profiles a session with cProfile ('cprofile') or the StackSampler
+    ('sample'). Without `commands` it runs from start() until write();
+    with them, CommandHandler wraps only those commands through wrap(), so
+    the rest of the session runs unprofiled.
+    """
+
+    def __init__(self, mode="cprofile", output_dir=DEFAULT_PROFILE_DIR, commands=None, interval=0.005):
+        if mode not in MODES:
+            raise ValueError(f"Unknown profiling mode '{mode}'; use {' or '.join(MODES)}.")
+        self.mode = mode
+        self.output_dir = output_dir
+        self.commands = frozenset(commands) if commands else None
+        self.profile = cProfile.Profile() if mode == "cprofile" else None
+        self.sampler = StackSampler(interval) if mode == "sample" else None
+        self.started = None
+        self._written = None
+
+    @classmethod
+    def from_settings(cls, settings):
+        """
+        Build a profiler from PROFILE ('cprofile', 'sample', or 1/true for
+        cprofile), PROFILE_DIR, PROFILE_COMMANDS and PROFILE_INTERVAL (ms);
+        None when PROFILE is unset or off.
+        """
+        mode = settings.get('PROFILE', '').lower()
+        if mode in ('', '0', 'false', 'no', 'off'):
+            return None
+        if mode in ('1', 'true', 'yes', 'on'):
+            mode = "cprofile"
+        commands = [name.strip() for name in settings.get('PROFILE_COMMANDS', '').split(',') if name.strip()]
+        return cls(mode, settings.get('PROFILE_DIR', DEFAULT_PROFILE_DIR), commands,
+                   float(settings.get('PROFILE_INTERVAL', 5)) / 1000)
+
+    def _enable(self):
+        if self.profile is not None:
+            self.profile.enable()
+        else:
+            self.sampler.active = True
+
+    def _disable(self):
+        if self.profile is not None:
+            self.profile.disable()
+        else:
+            self.sampler.active = False
+
+    def start(self):
+        self.started = time.time()
+        if self.sampler is not None:
+            self.sampler.start()
+        if self.commands is None:
+            self._enable()
+        logging.info("Profiling %s with %s.", "the session" if self.commands is None
+                     else "commands " + ", ".join(sorted(self.commands)), self.mode)
+
+    def wrap(self, command_name, run):
+        """Profile `run` (a CommandSpec.run callable) when `command_name` is one of the chosen commands."""
+        if self.commands is None or command_name not in self.commands:
+            return run
+
+        def profiled(value=None, cumulative=False):
+            self._enable()
+            try:
+                return run(value, cumulative)
+            finally:
+                self._disable()
+
+        return profiled
+
+    def write(self):
+        """Stop profiling and write the output once; returns the paths written."""
+        if self._written is not None:
+            return self._written
+        if self.commands is None:
+            self._disable()
+        if self.sampler is not None:
+            self.sampler.stop()
+
+        os.makedirs(self.output_dir, exist_ok=True)
+        stamp = time.strftime("%Y%m%d-%H%M%S", time.localtime(self.started or time.time()))
+        base = os.path.join(self.output_dir, f"session-{stamp}-{os.getpid()}")
+        if self.profile is not None:
+            path = f"{base}.pstats"
+            self.profile.dump_stats(path)
+        else:
+            path = f"{base}.collapsed"
+            with open(path, "w", encoding="utf-8") as file:
+                file.writelines(f"{line}\n" for line in self.sampler.collapsed())
+        self._written = [path]
+        logging.info("Profile written to '%s'.", path)
+        return self._written
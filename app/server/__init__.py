@@ -0,0 +1,197 @@
+# app/server/__init__.py
+# Multi-session calculator server: newline-delimited commands over a local
+# TCP or Unix socket, one isolated Calculator + CommandHandler per connection
+# and one JSON reply line per command, in order, so clients can pipeline.
+
+import asyncio
+import contextlib
+import io
+import json
+import logging
+import os
+import sys
+import threading
+import numpy as np
+from app.parser import CommandParser
+
+DEFAULT_ADDRESS = "127.0.0.1:8765"
+BACKLOG = 4096
+CLOSE_COMMANDS = ("exit", "quit")  # Whole lines that end the session
+
+
+def parse_address(address):
+    """'unix:/path' -> ('unix', '/path'); 'host:port' or 'port' -> ('tcp', (host, port))."""
+    if address.startswith("unix:"):
+        return "unix", address[len("unix:"):]
+    host, _, port = address.rpartition(":")
+    return "tcp", (host or "127.0.0.1", int(port))
+
+
+def _jsonable(result):
+    if isinstance(result, np.ndarray):
+        return result.tolist()
+    if isinstance(result, np.generic):
+        return result.item()
+    return result
+
+
+class _ThreadStream:
+    """sys.stdout or sys.stdin for whichever thread writes or reads: a session's own stream, else the real one."""
+
+    def __init__(self, local, index, default):
+        self._local = local
+        self._index = index
+        self._default = default
+
+    def __getattr__(self, name):
+        streams = getattr(self._local, "streams", None)
+        return getattr(self._default if streams is None else streams[self._index], name)
+
+
+class _SessionStreams:
+    """
+    Per-thread stdout/stdin while commands run: the thread running a
+    session's command prints into that session's buffer and reads an empty
+    stdin (so an interactive prompt fails instead of blocking), every other
+    thread still sees the real streams.
+    """
+
+    def __init__(self):
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._users = 0
+        self._saved = None
+
+    @contextlib.contextmanager
+    def capture(self, output):
+        with self._lock:
+            if not self._users:
+                self._saved = sys.stdout, sys.stdin
+                sys.stdout = _ThreadStream(self._local, 0, sys.stdout)
+                sys.stdin = _ThreadStream(self._local, 1, sys.stdin)
+            self._users += 1
+        self._local.streams = output, io.StringIO()
+        try:
+            yield
+        finally:
+            self._local.streams = None
+            with self._lock:
+                self._users -= 1
+                if not self._users:
+                    sys.stdout, sys.stdin = self._saved
+                    self._saved = None
+
+
+_session_streams = _SessionStreams()
+
+
+class Session:
+    """One client's calculator, history and command handler."""
+
+    def __init__(self, app):
+        self.calculator, self.history, self.command_handler = app.create_session()
+        self.parser = CommandParser(self.command_handler, directives=("print", "reset"))
+
+    def execute(self, line):
+        """
+        Run one command line and return its reply: {'ok', 'result', 'output'}
+        or {'ok': False, 'error', 'output'}. A chained line ('add 5; mean')
+        replies once, with the last command's result. What the commands print
+        is captured into 'output', per thread, so sessions running in the
+        server's executor never mix their output.
+        """
+        output = io.StringIO()
+        result = None
+        try:
+            with _session_streams.capture(output):
+                for command in self.parser.parse(line):
+                    if command.name == "print":
+                        result = self.calculator.value
+                    elif command.name == "reset":
+                        self.calculator.reset()
+                        self.command_handler.record("reset", None, 0)
+                        result = 0
+                    else:
+                        result = self.command_handler.execute_command(command.name, command.value)
+        except Exception as e:  # pylint: disable=broad-except
+            return {"ok": False, "error": str(e), "output": output.getvalue().splitlines()}
+        return {"ok": True, "result": _jsonable(result), "output": output.getvalue().splitlines()}
+
+
+class CalculatorServer:
+    """asyncio server giving every connection its own Session."""
+
+    def __init__(self, app, address=DEFAULT_ADDRESS):
+        self.app = app
+        self.address = address
+        self.server = None
+        self._handlers = set()  # Tasks serving the open connections
+
+    @property
+    def active_sessions(self):
+        return len(self._handlers)
+
+    async def handle(self, reader, writer):
+        session = Session(self.app)
+        loop = asyncio.get_running_loop()
+        self._handlers.add(asyncio.current_task())
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                command = line.decode("utf-8", "replace").strip()
+                if not command or command.startswith("#"):
+                    continue
+                if command in CLOSE_COMMANDS:
+                    break
+                # A slow command only holds up its own connection, not the event loop
+                reply = await loop.run_in_executor(None, session.execute, command)
+                writer.write(json.dumps(reply, default=str, ensure_ascii=False).encode("utf-8") + b"\n")
+                await writer.drain()  # Only waits when the client stops reading replies
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass  # The client went away; a CancelledError (server shutting down) propagates after the cleanup
+        finally:
+            self._handlers.discard(asyncio.current_task())
+            writer.close()
+            with contextlib.suppress(ConnectionError):
+                await writer.wait_closed()
+
+    async def start(self):
+        """Start listening; returns the bound address ('unix:...' or 'host:port')."""
+        kind, target = parse_address(self.address)
+        if kind == "unix":
+            if os.path.exists(target):
+                os.unlink(target)  # Stale socket from a previous run
+            self.server = await asyncio.start_unix_server(self.handle, path=target, backlog=BACKLOG)
+            bound = f"unix:{target}"
+        else:
+            self.server = await asyncio.start_server(self.handle, *target, backlog=BACKLOG)
+            host, port = self.server.sockets[0].getsockname()[:2]
+            bound = f"{host}:{port}"
+        logging.info("Calculator server listening on %s.", bound)
+        return bound
+
+    async def stop(self):
+        """Stop listening and end the open sessions."""
+        if self.server is not None:
+            self.server.close()
+            handlers = list(self._handlers)
+            for handler in handlers:
+                handler.cancel()
+            await asyncio.gather(*handlers, return_exceptions=True)
+            await self.server.wait_closed()
+            self.server = None
+
+    async def serve_forever(self):
+        await self.start()
+        async with self.server:
+            await self.server.serve_forever()
+
+
+def serve(app, address=DEFAULT_ADDRESS):
+    """Run the server until interrupted."""
+    try:
+        asyncio.run(CalculatorServer(app, address).serve_forever())
+    except KeyboardInterrupt:
+        logging.info("Calculator server stopped.")
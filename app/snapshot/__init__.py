@@ -0,0 +1,84 @@
+# app/snapshot/__init__.py
+# Binary session snapshots: a small JSON header followed by the raw float64
+# values and the history columns, each 64-byte aligned so they can be
+# memory-mapped back without parsing or copying.
+
+import json
+import os
+import struct
+import numpy as np
+
+MAGIC = b"CALCSNAP"
+VERSION = 1
+ALIGNMENT = 64
+_PREFIX = struct.Struct("<8sI")  # magic, header length
+
+
+def _align(offset):
+    return -(-offset // ALIGNMENT) * ALIGNMENT
+
+
+def write_snapshot(path, value, values, moments, history, journal_sequence=0):
+    """
+    Write the calculator state and history to `path`. `journal_sequence` is
+    the last journal frame the state includes, so replay can skip up to it.
+
+    The file is written next to `path` and renamed over it, so a session that
+    currently has the old snapshot memory-mapped keeps a valid mapping.
+    """
+    values = np.ascontiguousarray(values, dtype=np.float64)
+    codes, history_values, results = history.columns()
+    arrays = [("values", values), ("history_codes", codes.astype(np.int16, copy=False)),
+              ("history_values", history_values), ("history_results", results)]
+
+    header = {
+        "version": VERSION,
+        "value": float(value),
+        "moments": list(moments),
+        "journal_sequence": journal_sequence,
+        "operations": list(history.operations),
+        "arrays": {},
+    }
+    # The header holds the array offsets, which depend on the header length; reserve room and iterate once
+    header_size = _align(_PREFIX.size + len(json.dumps(header)) + 512)
+    offset = header_size
+    for name, array in arrays:
+        header["arrays"][name] = {"offset": offset, "count": len(array), "dtype": array.dtype.str}
+        offset = _align(offset + array.nbytes)
+    encoded = json.dumps(header).encode("utf-8")
+    if _PREFIX.size + len(encoded) > header_size:
+        raise ValueError("Snapshot header does not fit its reserved space.")
+
+    temp_path = f"{path}.tmp"
+    with open(temp_path, "wb") as file:
+        file.write(_PREFIX.pack(MAGIC, len(encoded)))
+        file.write(encoded)
+        for name, array in arrays:
+            file.seek(header["arrays"][name]["offset"])
+            array.tofile(file)
+        file.truncate(offset)
+        file.flush()
+        os.fsync(file.fileno())
+    os.replace(temp_path, path)
+
+
+def read_snapshot(path):
+    """
+    Open a snapshot and return its header with each array memory-mapped
+    read-only under header["arrays"][name]["data"].
+    """
+    with open(path, "rb") as file:
+        magic, header_length = _PREFIX.unpack(file.read(_PREFIX.size))
+        if magic != MAGIC:
+            raise ValueError(f"'{path}' is not a calculator snapshot.")
+        header = json.loads(file.read(header_length))
+    if header.get("version") != VERSION:
+        raise ValueError(f"Unsupported snapshot version {header.get('version')}.")
+
+    for entry in header["arrays"].values():
+        if entry["count"]:
+            entry["data"] = np.memmap(path, dtype=np.dtype(entry["dtype"]), mode="r",
+                                      offset=entry["offset"], shape=(entry["count"],))
+        else:
+            entry["data"] = np.empty(0, dtype=np.dtype(entry["dtype"]))
+    return header
@@ -1,5 +1,34 @@
+import argparse
+import os
+import sys
 from app import App
 
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Command-line calculator with statistical operations.")
+    parser.add_argument("--script", metavar="FILE",
+                        help="run the commands in FILE ('-' for stdin) instead of starting the REPL")
+    parser.add_argument("--serve", metavar="ADDRESS", nargs="?", const="",
+                        help="serve one session per connection on 'host:port' or 'unix:/path' "
+                             "(default 127.0.0.1:8765)")
+    parser.add_argument("--profile", metavar="MODE", nargs="?", const="cprofile", choices=("cprofile", "sample"),
+                        help="profile the session with cProfile (default) or a sampling profiler and write "
+                             "the output to PROFILE_DIR on exit")
+    return parser.parse_args(argv)
+
+
 if __name__ == "__main__":
+    args = parse_args()
+    if args.profile:
+        os.environ["PROFILE"] = args.profile  # Read by App.load_environment_variables like any setting
     app = App()
-    app.start()
+    if args.serve is not None:
+        from app.server import DEFAULT_ADDRESS, serve  # asyncio is only needed in server mode
+        serve(app, args.serve or DEFAULT_ADDRESS)
+    elif args.script == "-" or (args.script is None and not sys.stdin.isatty()):
+        app.run_script(sys.stdin)
+    elif args.script:
+        with open(args.script, encoding="utf-8") as script:
+            app.run_script(script)
+    else:
+        app.start()
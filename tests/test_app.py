@@ -1,12 +1,18 @@
+import io
 import os
+import subprocess
 import sys
 from unittest.mock import patch
 import numpy as np
 import pandas as pd
 import pytest
 from app import App
-from app.commands import Command
+from app.history import HistoryLog
+from app.commands import Command, CommandHandler
+from app.plugins.calc import AddCommand, DivideCommand, parse_operands
 from app.plugins.greet import GreetCommand
+from app.plugins.calc.calculator import Calculator
+from app.plugins.reset import ResetCommand
 
 
 @pytest.fixture(scope="module")
@@ -130,6 +136,7 @@ def test_save_history_no_directory(app_instance):
 
 def test_save_calculator_values(app_instance, tmp_path):
     """Test saving calculator values to CSV when history is empty."""
+    app_instance.history.clear()
     app_instance.calculator.values = [10, 20, 30]
     csv_file_path = tmp_path / "test_calc_values_export.csv"
     app_instance.save_history(file_path=str(csv_file_path))
@@ -215,3 +222,318 @@ def test_calculator_subtraction(app_instance):
     app_instance.calculator.value = 20
     app_instance.calculator.subtract_value(5)
     assert app_instance.calculator.value == 15, "Subtraction failed."
+
+
+def test_running_stats_match_numpy(app_instance):
+    """Test running aggregates stay in sync with add_value, extend and reset."""
+    calculator = app_instance.calculator
+    calculator.reset()
+    data = [3, 7, 7, 1, 9, 4, 4, 10]
+    calculator.add_value(data[0])
+    calculator.values.extend(data[1:])
+
+    assert calculator.stats.mean() == pytest.approx(np.mean(data))
+    assert calculator.stats.std() == pytest.approx(np.std(data))
+    assert calculator.stats.median() == np.median(data)
+    assert calculator.stats.mode() == [4, 7]
+
+    calculator.reset()
+    assert calculator.stats.count == 0
+    calculator.values = [2, 8]
+    assert calculator.stats.median() == 5
+
+
+def test_value_store_list_semantics(app_instance):
+    """Test the array-backed value store behaves like the list it replaced."""
+    values = app_instance.calculator.values
+    app_instance.calculator.reset()
+    for num in range(40):
+        values.append(num)
+    values.extend(np.arange(40, 100))
+
+    assert len(values) == 100
+    assert values == list(range(100))
+    assert values[-1] == 99
+    view = values.view()
+    assert view.dtype == np.float64 and not view.flags.writeable
+    assert np.shares_memory(view, values.view()), "View should not copy the buffer."
+    assert app_instance.calculator.stats.median() == 49.5
+
+    values.clear()
+    assert not values and app_instance.calculator.stats.count == 0
+
+
+def test_run_script_batches_arithmetic(app_instance, capsys):
+    """Test script mode folds arithmetic runs and prints only requested output."""
+    app_instance.calculator.reset()
+    script = io.StringIO("add 5\nadd 10\nsubtract 3\n# comment\nmultiply 2\ndivide 0\ndivide 4\nprint\nmean\nexit\nadd 99\n")
+
+    executed = app_instance.run_script(script)
+
+    captured = capsys.readouterr()
+    assert executed == 9
+    assert app_instance.calculator.value == 6
+    assert app_instance.calculator.values == [5, 10]
+    assert "Line 6: Error: Division by zero" in captured.out
+    assert "✅ Result: 6.0" in captured.out
+    assert "📊 Mean: 7.5" in captured.out
+    assert "commands/s" in captured.err
+
+
+def test_run_script_matches_execute_command(app_instance, capsys):
+    """Test script mode, short runs and batched ones, gives the same total, values and history as single commands."""
+    lines = ["add 1e16", "subtract 1e16", "add 1", "multiply 3", "divide 7", "multiply 7", "add 0.1 0.2",
+             "subtract 0.3", "divide 0", "divide 3", "add 2", "add 4"]
+    # Runs this long take the batched path rather than execute_command
+    lines += ["add 0.5"] * App.SCRIPT_BATCH_MIN + ["divide 1.5"] * 20 + ["divide 0"] + ["divide 1.5"] * 20
+    app_instance.calculator.reset()
+    app_instance.history.clear()
+    app_instance.run_script(io.StringIO("\n".join(lines[:3] + ["print"] + lines[3:])))
+    assert "✅ Result: 1.0" in capsys.readouterr().out  # 1e16 - 1e16 + 1, not 1e16 + 1 - 1e16
+    script = (app_instance.calculator.value, app_instance.calculator.values.tolist(),
+              app_instance.history.to_dataframe().values.tolist())
+
+    app_instance.calculator.reset()
+    app_instance.history.clear()
+    for line in lines:
+        name, *operands = line.split()
+        value = float(operands[0]) if len(operands) == 1 else np.array(operands, dtype=np.float64)
+        app_instance.command_handler.execute_command(name, value)
+    scalar = (app_instance.calculator.value, app_instance.calculator.values.tolist(),
+              app_instance.history.to_dataframe().values.tolist())
+    capsys.readouterr()
+
+    assert script[:2] == scalar[:2]
+    # Only the failed division differs: the scalar command records its error text as the result
+    assert script[2] == [row for row in scalar[2] if row[0] != "divide" or row[1] != 0]
+
+
+def test_run_script_reports_arithmetic_errors_and_continues(app_instance, capsys, monkeypatch):
+    """Test a failing arithmetic line, short run or batched, is reported with its line number and the script goes on."""
+    execute_command = app_instance.command_handler.execute_command
+
+    def failing(command_name, command_value=None):
+        if command_name == "multiply":
+            raise ValueError("multiply failed")
+        return execute_command(command_name, command_value)
+
+    def failing_bulk(command_name, nums, commands):
+        raise ValueError(f"{command_name} failed")
+
+    monkeypatch.setattr(app_instance.command_handler, "execute_command", failing)
+    monkeypatch.setattr(app_instance, "_apply_operands", failing_bulk)
+    app_instance.calculator.reset()
+    lines = ["add 5", "multiply 2", "add 1"] + ["subtract 1"] * App.SCRIPT_BATCH_MIN + ["print"]
+
+    executed = app_instance.run_script(io.StringIO("\n".join(lines)))
+
+    captured = capsys.readouterr()
+    assert executed == len(lines)
+    assert "❌ Line 2: multiply failed" in captured.out
+    assert "❌ Line 4: subtract failed" in captured.out
+    assert "✅ Result: 6.0" in captured.out
+
+
+def test_bulk_arithmetic_matches_scalar_path(app_instance):
+    """Test bulk add/subtract/multiply/divide agree with repeated scalar commands."""
+    operands = [1.5, 2.25, 3.0, 4.75]
+    scalar = App().calculator
+    for name in ("add", "subtract", "multiply", "divide"):
+        for num in operands:
+            getattr(scalar, f"{name}_value")(num)
+
+    app_instance.calculator.reset()
+    for name in ("add", "subtract", "multiply", "divide"):
+        app_instance.command_handler.execute_command(name, np.array(operands))
+
+    assert app_instance.calculator.value == pytest.approx(scalar.value)
+    assert app_instance.calculator.values == scalar.values
+
+
+def test_bulk_arithmetic_cumulative_and_files(app_instance, tmp_path):
+    """Test cumulative results, '@file' operands and division by zero in a batch."""
+    app_instance.calculator.reset()
+    steps = AddCommand(app_instance.calculator, np.array([1, 2, 3]), cumulative=True).execute()
+    assert steps.tolist() == [1, 3, 6]
+    assert app_instance.calculator.value == 6
+
+    np.save(tmp_path / "operands.npy", np.array([2.0, 3.0]))
+    assert parse_operands([f"@{tmp_path / 'operands.npy'}"]).tolist() == [2.0, 3.0]
+    assert parse_operands(["4", "5"]).tolist() == [4.0, 5.0]
+    assert parse_operands(["4"]) == 4.0
+
+    result = DivideCommand(app_instance.calculator, np.array([2.0, 0.0])).execute()
+    assert result == "Error: Division by zero"
+    assert app_instance.calculator.value == 6
+
+
+def test_repl_bulk_add(app_instance, monkeypatch, capsys):
+    """Test the REPL accepts several operands for one command."""
+    app_instance.calculator.reset()
+    inputs = iter(["add 1 2 3", "exit"])
+    monkeypatch.setattr("builtins.input", lambda _: next(inputs))
+
+    with pytest.raises(SystemExit):
+        app_instance.repl()
+
+    assert "✅ Result: 6.0" in capsys.readouterr().out
+
+
+def test_history_log_chunks_and_dataframe():
+    """Test the columnar history spans chunks and converts to a DataFrame on demand."""
+    history = HistoryLog(chunk_size=4)
+    history.record("add", 5, 5)
+    history.record_many("add", np.arange(1, 8), np.cumsum(np.arange(1, 8)) + 5)
+    history.record("mode", None, [1, 2])
+
+    assert len(history) == 9 and not history.empty
+    df = history.to_dataframe()
+    assert list(df.columns) == ["Operation", "Value", "Result"]
+    assert df["Operation"].tolist() == ["add"] * 8 + ["mode"]
+    assert df["Value"].tolist()[:3] == [5, 1, 2]
+    assert df["Result"].iloc[7] == 33
+    assert np.isnan(df["Result"].iloc[8])
+
+    history.clear()
+    assert history.empty and history.to_dataframe().empty
+
+
+def test_command_handler_records_history(app_instance):
+    """Test executed commands, including bulk operands, land in the history."""
+    app_instance.calculator.reset()
+    app_instance.history.clear()
+    app_instance.command_handler.execute_command("add", 2.0)
+    app_instance.command_handler.execute_command("multiply", np.array([2.0, 3.0]))
+    app_instance.command_handler.execute_command("mean")
+
+    df = app_instance.history.to_dataframe()
+    assert df["Operation"].tolist() == ["add", "multiply", "multiply", "mean"]
+    assert df["Result"].tolist() == [2.0, 4.0, 12.0, 2.0]
+    assert app_instance.calculator.value == 12.0
+
+
+def test_commands_are_registered_as_lazy_stubs():
+    """Test plugins are imported on first use and startup does not import pandas."""
+    code = (
+        "import sys\n"
+        "from app import App\n"
+        "app = App()\n"
+        "print('pandas' in sys.modules, 'app.plugins.mean' in sys.modules)\n"
+        "app.command_handler.execute_command('add', 4.0)\n"
+        "app.command_handler.execute_command('mean')\n"
+        "print('app.plugins.mean' in sys.modules)\n"
+    )
+    env = dict(os.environ, LOG_LEVEL="ERROR", LOG_FILE=os.devnull)
+    result = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, env=env, check=True)
+    lines = result.stdout.splitlines()
+    assert lines[0] == "False False", "pandas or a plugin module was imported at startup."
+    assert lines[-1] == "True"
+
+
+def test_stats_cache_hits_and_invalidation(app_instance):
+    """Test median and mode are cached per version of the values, each on first use; mean and std skip the cache."""
+    calculator = app_instance.calculator
+    calculator.values = [4, 1, 4, 2]
+    cache = calculator.stats_cache
+    hits, misses = cache.hits, cache.misses
+
+    for command in ("mean", "median", "mode", "standard_deviation", "median", "mode"):
+        app_instance.command_handler.execute_command(command)
+    assert (cache.hits - hits, cache.misses - misses) == (2, 2), "Only median and mode go through the cache."
+
+    version = calculator.version
+    calculator.add_value(1)
+    assert calculator.version > version
+    assert app_instance.command_handler.execute_command("mode") == [1, 4]
+    assert cache.misses - misses == 3
+    calculator.subtract_value(3)
+    assert calculator.version == cache.info()["version"], "Only changes to the values invalidate the cache."
+
+
+def test_stats_cache_after_restore(app_instance):
+    """Test median (a partition) and mode (a sort) come from the values while the running order stats are detached."""
+    calculator = app_instance.calculator
+    data = np.array([7.0, 3.0, 3.0, 9.0, 7.0, 1.0])
+    calculator.load_state(0, data, (len(data), float(data.mean()), float(np.square(data - data.mean()).sum())))
+
+    assert calculator.stats.detached
+    assert calculator.statistic("median") == 5.0
+    assert calculator.statistic("mode") == [3.0, 7.0]
+    assert calculator.statistic("std") == pytest.approx(np.std(data))
+    calculator.add_value(5.0)
+    assert (calculator.statistic("median"), calculator.statistic("mode")) == (5.0, [3.0, 7.0])
+    calculator.reset()
+    assert not calculator.stats.detached
+
+
+def test_large_bulk_load_detaches_order_stats(app_instance, monkeypatch):
+    """Test a bulk load past DETACH_AT drops the sorted copy and answers from the values until reset."""
+    calculator = app_instance.calculator
+    monkeypatch.setattr(calculator.stats, "DETACH_AT", 8)
+    calculator.values.extend([5.0, 1.0, 5.0])
+    assert not calculator.stats.detached
+    calculator.values.extend([2.0, 9.0, 2.0, 5.0, 4.0])
+
+    assert calculator.stats.detached
+    assert (calculator.statistic("median"), calculator.statistic("mode")) == (4.5, [5.0])
+    calculator.add_value(2.0)
+    assert (calculator.statistic("median"), calculator.statistic("mode")) == (4.0, [2.0, 5.0])
+    assert calculator.statistic("mean") == pytest.approx(35 / 9)
+    calculator.reset()
+    assert not calculator.stats.detached
+
+
+def test_dispatch_table_reuses_compiled_commands():
+    """Test commands compile once into a spec with arity metadata and reuse one instance."""
+    created = []
+
+    class CountingCommand(Command):
+        def __new__(cls, *args, **kwargs):
+            instance = super().__new__(cls)
+            created.append(instance)
+            return instance
+
+        def __init__(self, calculator, value=None):
+            self.calculator = calculator
+            self.value = value
+
+        def execute(self):
+            return self.value
+
+    handler = CommandHandler(Calculator())
+    handler.register_command("count", CountingCommand)
+    assert [handler.execute_command("count", value) for value in (1, 2, None)] == [1, 2, None]
+    assert len(created) == 1
+    spec = handler.spec("count")
+    assert (spec.takes_value, spec.value_required, spec.cumulative) == (True, False, False)
+
+    assert handler.spec("missing") is None
+    handler.register_command("count", AddCommand)
+    assert handler.spec("count").cumulative and handler.execute_command("count", 5.0) == 5.0
+
+
+def test_text_commands_get_argument_lists():
+    """Test a single string given to a text command reaches it as a one-item list."""
+    def echo(_calculator, args=None):
+        return args
+
+    echo.arguments = "text"
+    handler = CommandHandler(Calculator())
+    handler.register_command("echo", echo)
+    assert [handler.execute_command("echo", value) for value in ("class", ["a", "b"], None)] == \
+        [["class"], ["a", "b"], None]
+
+
+def test_dispatch_accepts_functions_and_instances():
+    """Test plain functions and pre-built command instances dispatch without a class."""
+    calculator = Calculator()
+    handler = CommandHandler(calculator)
+    handler.register_command("dummy", dummy_command)
+    handler.register_command("double", lambda calc, value: value * 2)
+    handler.register_command("reset", ResetCommand(calculator))
+
+    assert handler.execute_command("dummy") == "dummy"
+    assert handler.execute_command("double", 4) == 8
+    assert handler.spec("double").value_required
+    calculator.add_value(3)
+    assert handler.execute_command("reset") == 0 and calculator.value == 0
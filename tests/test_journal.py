@@ -0,0 +1,136 @@
+import os
+import numpy as np
+import pytest
+from app import App
+from app.commands import CommandHandler
+from app.history import HistoryLog
+from app.journal import Journal, read_frames
+from app.plugins.calc import AddCommand, MultiplyCommand
+from app.plugins.calc.calculator import Calculator
+from app.snapshot import read_snapshot
+
+
+def session(journal_path, after_sequence=0, **options):
+    """A handler with add/multiply whose state is recovered from, then journaled to, `journal_path`."""
+    calculator, history = Calculator(), HistoryLog()
+    handler = CommandHandler(calculator, history)
+    handler.register_command("add", AddCommand)
+    handler.register_command("multiply", MultiplyCommand)
+    journal = Journal(str(journal_path), **options)
+    replayed = journal.recover(calculator, history, after_sequence)
+    journal.attach(calculator, history, handler)
+    return handler, journal, replayed
+
+
+def test_replay_after_crash_restores_state(tmp_path):
+    """Test a session that never closed its journal comes back from the synced frames."""
+    path = tmp_path / "session.journal"
+    handler, journal, _ = session(path, sync_interval=0)
+    handler.execute_command("add", np.array([3.0, 1.0, 4.0]))
+    handler.execute_command("multiply", 2.0)
+    handler.calculator.values = [5.0, 6.0]  # Outside a command: committed with the next one
+    handler.execute_command("add", 1.0)
+    # No close(): with sync_interval=0 every commit was already fsynced
+
+    recovered, _, replayed = session(path)
+    assert replayed == 3
+    assert recovered.calculator.value == handler.calculator.value == 17.0
+    assert recovered.calculator.values == [5.0, 6.0, 1.0]
+    assert recovered.calculator.statistic("mean") == 4.0
+    assert recovered.history.to_dataframe()["Operation"].tolist() == ["add"] * 3 + ["multiply", "add"]
+    journal.close()
+
+
+def test_group_commit_batches_until_flush(tmp_path):
+    """Test commits are buffered until the group fills or flush() runs, then written together."""
+    path = tmp_path / "session.journal"
+    handler, journal, _ = session(path, sync_interval=60, group_size=3)
+    handler.execute_command("add", 1.0)
+    handler.execute_command("add", 2.0)
+    assert read_frames(path)[0] == []
+    handler.execute_command("add", 3.0)  # Third commit fills the group
+    assert [sequence for sequence, _ in read_frames(path)[0]] == [1, 2, 3]
+    handler.execute_command("add", 4.0)
+    journal.close()
+    assert len(read_frames(path)[0]) == 4
+
+
+def test_unchanged_commits_and_closed_journal_write_nothing(tmp_path):
+    """Test a commit without changes adds no frame and a closed journal is let go of and keeps nothing."""
+    path = tmp_path / "session.journal"
+    handler, journal, _ = session(path, sync_interval=0)
+    handler.execute_command("add", 2.0)
+    journal.commit(handler.calculator.value)  # e.g. a read-only command without a history
+    assert journal.sequence == 1
+    handler.calculator.value = 5.0
+    journal.commit(handler.calculator.value)
+    assert journal.sequence == 2
+
+    journal.close()
+    assert (handler.journal, handler.calculator.values.journal, handler.history.journal) == (None, None, None)
+    handler.execute_command("add", 1.0)
+    journal.values_added([1.0])
+    journal.commit(6.0)
+    assert journal._records == [] and journal.sequence == 2 and len(read_frames(path)[0]) == 2
+
+
+def test_torn_tail_is_truncated(tmp_path):
+    """Test a half-written last frame is dropped on recovery and the journal keeps working."""
+    path = tmp_path / "session.journal"
+    handler, journal, _ = session(path, sync_interval=0)
+    handler.execute_command("add", 1.0)
+    handler.execute_command("add", 2.0)
+    journal.close()
+    intact = os.path.getsize(path)
+    with open(path, "r+b") as file:
+        file.truncate(intact - 5)
+
+    recovered, journal, replayed = session(path, sync_interval=0)
+    assert (replayed, recovered.calculator.value, recovered.calculator.values.tolist()) == (1, 1.0, [1.0])
+    recovered.execute_command("add", 5.0)
+    journal.close()
+    assert [sequence for sequence, _ in read_frames(path)[0]] == [1, 2]
+
+
+def test_checkpoint_compacts_and_replay_skips_snapshotted_frames(tmp_path):
+    """Test periodic snapshots empty the journal and replay resumes after the snapshot's sequence."""
+    path = tmp_path / "session.journal"
+    handler, journal, _ = session(path, sync_interval=0, snapshot_every=3)
+    for num in (1.0, 2.0, 3.0, 4.0):
+        handler.execute_command("add", num)
+    journal.close()
+
+    snapshot = read_snapshot(journal.snapshot_path)
+    assert snapshot["journal_sequence"] == 3
+    assert snapshot["arrays"]["values"]["data"].tolist() == [1.0, 2.0, 3.0]
+    assert [sequence for sequence, _ in read_frames(path)[0]] == [4]
+
+    calculator, history = Calculator(), HistoryLog()
+    calculator.load_state(snapshot["value"], snapshot["arrays"]["values"]["data"], snapshot["moments"])
+    Journal(str(path)).recover(calculator, history, snapshot["journal_sequence"])
+    assert (calculator.value, calculator.values.tolist()) == (10.0, [1.0, 2.0, 3.0, 4.0])
+
+
+def test_app_recovers_snapshot_and_journal(tmp_path, monkeypatch):
+    """Test App replays JOURNAL_PATH on top of its snapshot at startup."""
+    monkeypatch.setenv("JOURNAL_PATH", str(tmp_path / "app.journal"))
+    monkeypatch.setenv("JOURNAL_SNAPSHOT_EVERY", "2")
+    monkeypatch.setenv("JOURNAL_SYNC_MS", "0")
+    app = App()
+    for num in (2.0, 4.0, 6.0):
+        app.command_handler.execute_command("add", num)
+    app.journal.close()
+
+    restored = App()
+    assert restored.calculator.value == 12.0
+    assert restored.calculator.values == [2.0, 4.0, 6.0]
+    assert len(restored.history) == 3
+    assert restored.command_handler.execute_command("median") == 4.0
+    restored.journal.close()
+
+
+def test_rejects_other_files(tmp_path):
+    path = tmp_path / "not_a_journal"
+    path.write_bytes(b"x" * 64)
+    with pytest.raises(ValueError):
+        read_frames(path)
@@ -0,0 +1,66 @@
+import logging
+import logging.handlers
+from app.plugins.logging_config import (
+    BufferedRotatingFileHandler, RecordQueueHandler, configure_logging, stop_logging
+)
+
+
+def test_buffered_handler_batches_and_rotates(tmp_path):
+    """Test records are written on flush and the file rotates at the size limit."""
+    log_file = tmp_path / "app.log"
+    handler = BufferedRotatingFileHandler(str(log_file), max_bytes=50, backup_count=2, capacity=100)
+    handler.setFormatter(logging.Formatter("%(message)s"))
+    logger = logging.getLogger("test_buffered_handler")
+    logger.propagate = False
+    logger.addHandler(handler)
+    try:
+        for number in range(10):
+            logger.warning("message %s", number)
+        assert not log_file.exists(), "Records should stay buffered until flush."
+
+        handler.flush()
+        assert (tmp_path / "app.log.1").read_text().count("message") == 10
+
+        logger.error("failure")
+        assert "failure" in log_file.read_text(), "Errors should be written immediately."
+    finally:
+        logger.removeHandler(handler)
+        handler.close()
+
+
+def test_configure_logging_queue_mode(tmp_path, monkeypatch):
+    """Test the default queue mode defers formatting to the listener and writes the log file."""
+    log_file = tmp_path / "queued.log"
+    monkeypatch.setenv("LOG_FILE", str(log_file))
+    monkeypatch.setenv("LOG_LEVEL", "INFO")
+    monkeypatch.delenv("LOG_ASYNC", raising=False)
+
+    configure_logging()
+    root = logging.getLogger()
+    assert len(root.handlers) == 1 and isinstance(root.handlers[0], RecordQueueHandler)
+
+    logging.info("Grades saved to CSV at '%s'.", "./data/x.csv")
+    stop_logging()
+    assert "Grades saved to CSV at './data/x.csv'." in log_file.read_text()
+
+    monkeypatch.setenv("LOG_ASYNC", "false")
+    monkeypatch.setenv("LOG_FILE", str(tmp_path / "sync.log"))
+    configure_logging()
+    assert not any(isinstance(handler, logging.handlers.QueueHandler) for handler in root.handlers)
+    stop_logging()
+
+
+def test_queued_records_keep_their_arguments_as_logged(tmp_path, monkeypatch):
+    """Test a mutable argument changed right after the call is logged as it was at the call."""
+    log_file = tmp_path / "queued.log"
+    monkeypatch.setenv("LOG_FILE", str(log_file))
+    monkeypatch.setenv("LOG_LEVEL", "INFO")
+    monkeypatch.delenv("LOG_ASYNC", raising=False)
+
+    configure_logging()
+    values = [1, 2]
+    logging.info("Values: %s", values)
+    values.append(3)
+    stop_logging()
+
+    assert "Values: [1, 2]\n" in log_file.read_text()
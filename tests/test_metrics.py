@@ -0,0 +1,88 @@
+import io
+import json
+import pytest
+from app.commands import Command, CommandHandler
+from app.metrics import Instrumentation, LatencyHistogram
+from app.plugins.calc import AddCommand
+from app.plugins.calc.calculator import Calculator
+
+
+class FailingCommand(Command):
+    def __init__(self, calculator):
+        self.calculator = calculator
+
+    def execute(self):
+        raise RuntimeError("boom")
+
+
+def test_latency_histogram_buckets_and_percentiles():
+    """Test every duration lands in a bucket no more than 12.5% wide and percentiles stay within it."""
+    for ns in (0, 15, 16, 31, 32, 1_000, 123_456, 10 ** 12):
+        bucket = LatencyHistogram.bucket(ns)
+        assert LatencyHistogram.upper_bound(bucket) >= ns
+        assert bucket == 0 or LatencyHistogram.upper_bound(bucket - 1) < ns
+        assert LatencyHistogram.upper_bound(bucket) <= max(ns * 1.125, 15)
+
+    histogram = LatencyHistogram()
+    for ns in range(1_000, 101_000, 100):
+        histogram.add(ns)
+    assert 50_900 <= histogram.percentile(50) <= 50_900 * 1.125
+    assert 99_900 <= histogram.percentile(99) <= histogram.max == 100_900
+
+
+def test_handler_instrumentation_counts_latency_and_errors():
+    """Test an instrumented handler records calls and exceptions, and turning it off unwraps the specs."""
+    handler = CommandHandler(Calculator())
+    handler.register_command("add", AddCommand)
+    handler.register_command("fail", FailingCommand)
+    plain_run = handler.spec("add").run
+
+    instrumentation = Instrumentation()
+    handler.instrument(instrumentation)
+    for _ in range(3):
+        handler.execute_command("add", 2.0)
+    with pytest.raises(RuntimeError):
+        handler.execute_command("fail")
+
+    summary = instrumentation.summary()
+    assert summary["add"]["count"] == 3 and summary["add"]["errors"] == {}
+    assert summary["fail"] == dict(summary["fail"], count=1, errors={"RuntimeError": 1})
+    assert 0 < summary["add"]["p50_us"] <= summary["add"]["p99_us"] <= summary["add"]["max_us"]
+    assert handler.calculator.value == 6.0
+
+    handler.instrument(None)
+    assert handler.spec("add").run.__qualname__ == plain_run.__qualname__
+    handler.execute_command("add", 1.0)
+    assert instrumentation.summary()["add"]["count"] == 3
+
+
+def test_allocation_tracing_and_dump(tmp_path):
+    """Test alloc mode reports allocation columns and dump writes the summary as JSON."""
+    handler = CommandHandler(Calculator())
+    handler.register_command("add", AddCommand)
+    instrumentation = Instrumentation(trace_allocations=True)
+    handler.instrument(instrumentation)
+    try:
+        handler.execute_command("add", list(range(10_000)))
+    finally:
+        instrumentation.close()
+
+    path = instrumentation.dump(str(tmp_path / "metrics" / "commands.json"))
+    with open(path, encoding="utf-8") as file:
+        document = json.load(file)
+    assert document["trace_allocations"] is True
+    assert document["commands"]["add"]["peak_kb"] > 0
+
+
+def test_profile_command_and_script_metrics(app_instance, capsys):
+    """Test 'profile on' instruments the session, script arithmetic is counted per line and 'profile off' stops it."""
+    app_instance.command_handler.execute_command("profile", ["on"])
+    try:
+        app_instance.run_script(io.StringIO("add 1\nadd 2\nmultiply 3\nmean\nprofile\n"))
+        summary = app_instance.command_handler.instrumentation.summary()
+        assert (summary["add"]["count"], summary["multiply"]["count"], summary["mean"]["count"]) == (2, 1, 1)
+        assert "📈 Command metrics:" in capsys.readouterr().out
+    finally:
+        app_instance.command_handler.execute_command("profile", ["off"])
+    assert app_instance.command_handler.instrumentation is None
+    assert "Command metrics off" in capsys.readouterr().out
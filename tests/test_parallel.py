@@ -0,0 +1,33 @@
+import numpy as np
+import pytest
+from app.plugins.calc.parallel import ParallelStats
+
+
+@pytest.mark.parametrize("values", [
+    np.random.default_rng(0).normal(70, 10, 100_001),
+    np.random.default_rng(1).integers(0, 100, 200_000).astype(float),
+    np.full(5_000, 5.0),
+    np.array([2.0, 1.0]),
+])
+def test_parallel_statistics_match_numpy(values):
+    """Test merged partials give NumPy's mean, std, exact median and modes, with refinement forced."""
+    result = ParallelStats(workers=3, chunk_size=10_000, bins=16, gather_limit=50).statistics(values)
+    uniques, counts = np.unique(values, return_counts=True)
+    assert result["median"] == np.median(values)
+    assert result["mean"] == pytest.approx(values.mean())
+    assert result["std"] == pytest.approx(values.std())
+    assert result["mode"] == uniques[counts == counts.max()].tolist()
+
+
+def test_stats_cache_uses_parallel_after_restore(app_instance, monkeypatch):
+    """Test a detached recomputation goes through the calculator's ParallelStats."""
+    calculator = app_instance.calculator
+    calculator.reset()
+    calculator.load_state(0.0, np.array([4.0, 1.0, 3.0, 1.0]), (4, 2.25, 6.75))
+    calculator.parallel = ParallelStats(workers=2, min_size=1)
+    monkeypatch.setattr(np, "sort", lambda *args: pytest.fail("sorted on one core"))
+
+    assert calculator.statistic("median") == 2.0
+    assert calculator.statistic("mode") == [1.0]
+    calculator.parallel = None
+    calculator.reset()
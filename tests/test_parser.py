@@ -0,0 +1,79 @@
+import io
+import numpy as np
+import pytest
+from app.parser import ERROR, CommandParser, ParsedCommand, ParseError, tokenize
+
+
+def test_tokenize_chains_and_comments():
+    """Test ';' splits commands, empty segments vanish and '#' lines are comments."""
+    assert tokenize("add 5; multiply 2 ;; mean") == [["add", "5"], ["multiply", "2"], ["mean"]]
+    assert tokenize("  # add 5; mean") == []
+
+
+def test_parse_uses_command_metadata(app_instance):
+    """Test arity comes from the command specs: numbers, text arguments or none."""
+    parser = CommandParser(app_instance.command_handler)
+    commands = parser.parse("add 1 2 3; group_stats category; mean; print")
+    assert commands == [ParsedCommand("add", np.array([1.0, 2.0, 3.0])),
+                        ParsedCommand("group_stats", ["category"]),
+                        ParsedCommand("mean"), ParsedCommand("print")]
+    assert parser.parse("multiply 2")[0].value == 2.0
+    assert parser.parse("percentile") == [ParsedCommand("percentile")]  # Defaults to 50
+
+    with pytest.raises(ParseError, match="Unknown command 'nope'"):
+        parser.parse("add 1; nope")
+    with pytest.raises(ParseError, match="followed by a value"):
+        parser.parse("add")
+    with pytest.raises(ParseError, match="valid number"):
+        parser.parse("add x")
+    with pytest.raises(ParseError, match="'mean' does not take a value"):
+        parser.parse("mean 3")
+    with pytest.raises(ParseError, match="'reset' does not take a value"):
+        parser.parse("reset 5")
+
+
+def test_parse_batch_builds_op_arrays(app_instance):
+    """Test a buffer becomes op/operand arrays with error rows kept in line order."""
+    parser = CommandParser(app_instance.command_handler)
+    batch = parser.parse_batch("add 1 2\nadd x; mean\n# note\nbogus 3\nsubtract 4\nimport a.csv Grade\n")
+
+    assert batch.names == ["add", "mean", "subtract", "import"]
+    assert batch.ops.tolist() == [0, ERROR, 1, ERROR, 2, 3]
+    assert batch.lines.tolist() == [1, 2, 2, 4, 5, 6]
+    assert batch.operands.tolist() == [1.0, 2.0, 4.0]
+    assert batch.operand_slice(4).tolist() == [4.0]
+    assert batch.text[1] == "Please enter a valid number."
+    assert batch.text[3] == "Unknown command 'bogus'."
+    assert batch.text[5] == ["a.csv", "Grade"]
+
+    batch = parser.parse_batch("add 1\nmean 3\nreset 5\nmean\n")
+    assert batch.ops.tolist() == [0, ERROR, ERROR, 1]
+    assert batch.text[1] == "'mean' does not take a value."
+    assert batch.text[2] == "'reset' does not take a value."
+
+
+def test_run_script_with_chains_and_errors(app_instance, capsys):
+    """Test script mode runs chained lines and reports parse errors at their line."""
+    app_instance.calculator.reset()
+    executed = app_instance.run_script(io.StringIO("add 2 3; multiply 4\nadd x\nsubtract 1; print\npercentile 50\n"
+                                                   "percentile\n"))
+    out = capsys.readouterr().out
+    assert executed == 7
+    assert app_instance.calculator.value == 19.0
+    assert "❌ Line 2: Please enter a valid number." in out
+    assert "✅ Result: 19.0" in out
+    assert out.count("📊 50th percentile (approx.)") == 2
+
+
+def test_repl_chained_commands(app_instance, monkeypatch, capsys):
+    """Test the REPL runs every command of a chained line in order."""
+    app_instance.calculator.reset()
+    inputs = iter(["add 5; multiply 2; mean", "exit"])
+    monkeypatch.setattr("builtins.input", lambda _: next(inputs))
+
+    with pytest.raises(SystemExit):
+        app_instance.repl()
+
+    out = capsys.readouterr().out
+    assert "✅ Result: 5.0" in out and "✅ Result: 10.0" in out
+    assert "📊 Mean: 5.0" in out
@@ -0,0 +1,70 @@
+import json
+from app.commands import CommandHandler, LazyCommand, LazyHookCommand
+from app.plugins import command_name_for, discover_commands, scan_module_source
+import app.plugins as plugins
+from app.plugins.calc.calculator import Calculator
+from app.plugins.mode import ModeCommand
+
+
+def test_command_name_for():
+    """Test default command names derived from class names."""
+    assert command_name_for("AddCommand") == "add"
+    assert command_name_for("StandardDeviationCommand") == "standard_deviation"
+
+
+def test_discovery_finds_builtin_plugins(tmp_path):
+    """Test pkgutil discovery finds every built-in command without importing it."""
+    handler = CommandHandler(Calculator())
+    commands = discover_commands(handler, handler.calculator, str(tmp_path / "manifest.json"))
+
+    assert set(commands) >= {
+        "add", "subtract", "multiply", "divide", "mean", "median", "mode",
+        "standard_deviation", "grades", "greet", "csv", "reset"
+    }
+    assert isinstance(commands["grades"], LazyCommand)
+    assert commands["grades"].class_name == "DataCommand"
+    assert isinstance(commands["mode"], LazyHookCommand), "register_commands hook not honored."
+
+
+def test_hook_command_resolves_through_hook():
+    """Test a hooked command is registered by its plugin hook on first use."""
+    handler = CommandHandler(Calculator())
+    handler.register_command("mode", LazyHookCommand("app.plugins.mode", "mode", handler, handler.calculator))
+    handler.calculator.values = [1, 2, 2]
+
+    assert handler.execute_command("mode") == [2]
+    assert handler.commands["mode"] is ModeCommand
+
+
+def test_manifest_skips_rescan(tmp_path, monkeypatch):
+    """Test a fresh manifest is reused without walking or parsing the plugins."""
+    manifest_path = tmp_path / "manifest.json"
+    handler = CommandHandler(Calculator())
+    first = discover_commands(handler, handler.calculator, str(manifest_path))
+    assert json.loads(manifest_path.read_text())["plugins"]
+
+    def fail(*args, **kwargs):
+        raise AssertionError("plugins were rescanned")
+
+    monkeypatch.setattr(plugins, "scan_plugin_dir", fail)
+    monkeypatch.setattr(plugins, "scan_entry_points", fail)
+    second = discover_commands(handler, handler.calculator, str(manifest_path))
+    assert set(second) == set(first)
+
+
+def test_scan_module_source_reads_overrides(tmp_path):
+    """Test the AST scan picks up Command subclasses, name overrides and hooks."""
+    source = tmp_path / "plugin.py"
+    source.write_text(
+        "from app.commands import Command\n"
+        "class FooBarCommand(Command):\n"
+        "    def execute(self): pass\n"
+        "class Other(Command):\n"
+        "    command_name = 'other_name'\n"
+        "    def execute(self): pass\n"
+        "class Helper: pass\n"
+        "def register_commands(command_handler, calculator): pass\n"
+    )
+    commands, has_hook = scan_module_source(str(source))
+    assert commands == {"foo_bar": "FooBarCommand", "other_name": "Other"}
+    assert has_hook
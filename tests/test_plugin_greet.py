@@ -1,11 +1,14 @@
 import os
 from unittest.mock import MagicMock, patch
+import numpy as np
 import pandas as pd
 import pytest
 from app.plugins.reset import ResetCommand
 from app.plugins.standard_deviation import StandardDeviationCommand
 from app.plugins.median import MedianCommand
 from app.plugins.csv import CsvCommand
+from app.plugins.csv_import import ImportCommand
+from app.plugins.data import DataCommand
 
 @pytest.fixture
 def reset_command(app_instance):
@@ -303,7 +306,7 @@ def test_csv_directory_not_writable(csv_command):
     """Test if CsvCommand handles non-writable directory."""
     with patch("os.access", return_value=False), patch("logging.error") as mock_logging_error:
         csv_command.execute()
-        mock_logging_error.assert_called_once_with("The directory './data' is not writable.")
+        mock_logging_error.assert_called_once_with("The directory '%s' is not writable.", './data')
 
 
 def test_csv_file_creation_and_grades_import(csv_command, tmp_path, app_instance):
@@ -376,3 +379,143 @@ def test_csv_add_grades_to_calculator(csv_command, app_instance, capsys):
 
         # Check if grades were added and correct output is printed
         assert "\n📊 Added grades from CSV for statistical calculations." in captured.out
+
+
+# Import command tests
+def test_import_streams_csv_in_chunks(app_instance, tmp_path, capsys):
+    """Test chunked CSV import appends valid grades and counts bad rows."""
+    csv_path = tmp_path / "grades.csv"
+    csv_path.write_text("Name,Grade\na,85\nb,\nc,abc\nd,90.5\ne,70\nf,100\n")
+    app_instance.calculator.values = []
+
+    imported = ImportCommand(app_instance.calculator, [str(csv_path)], chunk_size=2).execute()
+
+    assert imported == 4
+    assert app_instance.calculator.values == [85, 90.5, 70, 100]
+    assert app_instance.calculator.stats.median() == 87.75
+    captured = capsys.readouterr()
+    assert "(2 bad rows skipped)" in captured.out and "rows/s" in captured.out
+
+
+def test_import_integer_dtype_and_errors(app_instance, tmp_path, capsys):
+    """Test dtype coercion rejects non-integral rows and bad input is reported."""
+    csv_path = tmp_path / "scores.csv"
+    csv_path.write_text("Score\n1\n2.5\n3\n")
+    app_instance.calculator.values = []
+
+    result = app_instance.command_handler.execute_command("import", [str(csv_path), "Score", "int64"])
+    assert result == 2
+    assert app_instance.calculator.values == [1, 3]
+
+    assert app_instance.command_handler.execute_command("import", [str(tmp_path / "missing.csv")]) is None
+    assert app_instance.command_handler.execute_command("import", [str(csv_path), "Nope"]) is None
+    captured = capsys.readouterr()
+    assert "does not exist" in captured.out and "Could not import" in captured.out
+
+
+def test_import_failing_part_way_rolls_back(app_instance, tmp_path, capsys):
+    """Test a file that breaks in a later chunk leaves the values as they were before the import."""
+    csv_path = tmp_path / "broken.csv"
+    csv_path.write_text('Name,Grade\na,85\nb,90\nc,70\nd,60\ne,"70\n')  # Unterminated quote in the third chunk
+    app_instance.calculator.values = [50.0]
+
+    assert ImportCommand(app_instance.calculator, [str(csv_path)], chunk_size=2).execute() is None
+    assert app_instance.calculator.values == [50.0]
+    assert app_instance.calculator.statistic("mean") == 50.0
+    assert "Could not import" in capsys.readouterr().out
+
+
+# Grouped statistics tests
+def test_data_command_keeps_grade_labels(app_instance, monkeypatch):
+    """Test DataCommand stores each grade with its class and category."""
+    app_instance.calculator.reset()
+    inputs = iter(["80", "90", "70", "60", "100", "", "50", "40"])
+    monkeypatch.setattr("builtins.input", lambda _: next(inputs))
+    app_instance.command_handler.execute_command("grades")
+
+    stats = app_instance.calculator.grades.group_stats("class")
+    assert stats["groups"] == ["class1", "class2"]
+    assert stats["count"].tolist() == [4, 3]
+    assert stats["mean"].tolist() == [75.0, 190 / 3]
+    assert stats["median"].tolist() == [75.0, 50.0]
+
+    by_category = app_instance.calculator.grades.group_stats("category")
+    assert by_category["groups"] == ["assignment", "project", "midterm", "finals"]
+    assert by_category["mode"][2] == [50.0, 70.0]
+    assert app_instance.calculator.values == [80, 90, 70, 60, 100, 50, 40]
+
+
+def test_group_stats_command_output(app_instance, capsys):
+    """Test the group_stats command prints one row per group and rejects unknown groupings."""
+    app_instance.calculator.reset()
+    app_instance.calculator.add_grades(["c1", "c2", "c1", "c2", "c1"], ["a", "a", "b", "b", "b"], [1, 2, 3, 4, 3])
+
+    app_instance.command_handler.execute_command("group_stats", ["class"])
+    out = capsys.readouterr().out
+    assert "📊 Statistics by class:" in out
+    assert "c1" in out and "c2" in out
+
+    app_instance.command_handler.execute_command("group_stats", ["teacher"])
+    assert "Unknown grouping 'teacher'" in capsys.readouterr().out
+
+
+def test_final_grades_weighted_matrix(app_instance):
+    """Test weighted final grades are normalised over the categories each class has."""
+    app_instance.calculator.reset()
+    app_instance.calculator.add_grades(["c1", "c1", "c1", "c2", "c2"], ["hw", "hw", "exam", "hw", "quiz"],
+                                       [80, 100, 60, 70, 50])
+
+    result = app_instance.calculator.grades.final_grades({"hw": 0.25, "exam": 0.75})
+    assert result["classes"] == ["c1", "c2"]
+    assert result["categories"] == ["hw", "exam", "quiz"]
+    assert result["means"][0, :2].tolist() == [90.0, 60.0]
+    assert np.isnan(result["means"][0, 2])
+    assert result["final"].tolist() == [67.5, 70.0]
+
+
+def test_final_grades_command_exports_csv(app_instance, monkeypatch, capsys):
+    """Test final_grades honours GRADE_WEIGHTS and argument overrides and exports the table."""
+    app_instance.calculator.reset()
+    app_instance.calculator.add_grades(["c1", "c1"], ["midterm", "final"], [60, 90])
+    exported = {}
+    monkeypatch.setattr("app.plugins.csv.pd.DataFrame.to_csv",
+                        lambda df, path, index: exported.update(df=df, path=path))
+
+    monkeypatch.setenv("GRADE_WEIGHTS", "midterm=1,final=1")
+    app_instance.command_handler.execute_command("final_grades")
+    assert exported["df"]["Final Grade"].tolist() == [75.0]
+    assert exported["path"].endswith("final_grades.csv")
+    assert "📊 Weighted final grades:" in capsys.readouterr().out
+
+    app_instance.command_handler.execute_command("final_grades", ["midterm=0", "final=1"])
+    assert exported["df"]["Final Grade"].tolist() == [90.0]
+
+    app_instance.command_handler.execute_command("final_grades", ["midterm"])
+    assert "Invalid weight 'midterm'" in capsys.readouterr().out
+
+
+def test_data_command_bulk_matrix_rejects_rows(app_instance):
+    """Test bulk grade entry validates the whole matrix and reports rejected rows by position."""
+    app_instance.calculator.reset()
+    matrix = [[90, 80, 70, 60], [50, -1, 40, 30], [10, 20, float("nan"), "abc"], [1, 2, 3, 4]]
+
+    added, rejected = DataCommand(app_instance.calculator).add_bulk(matrix)
+    assert added == 8
+    assert rejected == [(2, "negative value in 'project'"),
+                        (3, "non-numeric value in 'finals'; missing or NaN value in 'midterm'")]
+    assert app_instance.calculator.values == [90, 80, 70, 60, 1, 2, 3, 4]
+    assert app_instance.calculator.grades.group_stats("class")["groups"][-2:] == ["class1", "class4"]
+
+
+def test_data_command_bulk_file(app_instance, tmp_path, capsys):
+    """Test 'grades <file>' loads a labeled CSV in one batch."""
+    app_instance.calculator.reset()
+    path = tmp_path / "roster.csv"
+    path.write_text("class,midterm,final\nalgebra,70,90\ngeometry,x,80\n")
+
+    app_instance.command_handler.execute_command("grades", [str(path)])
+    out = capsys.readouterr().out
+    assert "❌ Row 2: non-numeric value in 'midterm'" in out
+    assert "✅ Added 2 grades; 1 rows rejected." in out
+    assert app_instance.calculator.values == [70, 90]
+    assert app_instance.calculator.grades.final_grades({"midterm": 1, "final": 1})["final"].tolist() == [80.0]
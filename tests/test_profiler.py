@@ -0,0 +1,63 @@
+import pstats
+import pytest
+from app.commands import CommandHandler
+from app.plugins.calc import AddCommand
+from app.plugins.calc.calculator import Calculator
+from app.profiler import SessionProfiler, StackSampler
+
+
+def busy_loop(calls=20_000):
+    return sum(i * i for i in range(calls))
+
+
+def test_from_settings():
+    """Test PROFILE selects the mode and PROFILE_COMMANDS narrows it; unset or off disables profiling."""
+    assert SessionProfiler.from_settings({}) is None
+    assert SessionProfiler.from_settings({"PROFILE": "off"}) is None
+    profiler = SessionProfiler.from_settings({"PROFILE": "1", "PROFILE_COMMANDS": "mean, add"})
+    assert (profiler.mode, profiler.commands) == ("cprofile", {"mean", "add"})
+    sampler = SessionProfiler.from_settings({"PROFILE": "sample", "PROFILE_INTERVAL": "2"})
+    assert (sampler.mode, sampler.commands, sampler.sampler.interval) == ("sample", None, 0.002)
+    with pytest.raises(ValueError):
+        SessionProfiler("perf")
+
+
+def test_cprofile_chosen_commands_only(tmp_path):
+    """Test only the chosen commands are profiled and the output loads with pstats."""
+    handler = CommandHandler(Calculator())
+    handler.register_command("add", AddCommand)
+    handler.register_command("busy", lambda calculator: busy_loop())
+    profiler = SessionProfiler("cprofile", str(tmp_path), commands=["busy"])
+    handler.attach_profiler(profiler)
+    profiler.start()
+    handler.execute_command("add", 5.0)
+    handler.execute_command("busy")
+    paths = profiler.write()
+
+    functions = {name for _, _, name in pstats.Stats(paths[0]).stats}
+    assert "busy_loop" in functions and "execute" not in functions
+    assert profiler.write() == paths  # Written once, however often exit paths call it
+
+
+def test_sampler_collapsed_stacks(tmp_path):
+    """Test the sampling mode writes 'frame;frame count' lines that include the hot function."""
+    profiler = SessionProfiler("sample", str(tmp_path), interval=0.001)
+    profiler.start()
+    for _ in range(20):
+        busy_loop()
+    with open(profiler.write()[0], encoding="utf-8") as file:
+        lines = file.read().splitlines()
+
+    assert lines and all(line.rsplit(" ", 1)[1].isdigit() for line in lines)
+    assert any("test_profiler.py:busy_loop" in line for line in lines)
+
+
+def test_sampler_only_keeps_active_samples():
+    """Test samples are only kept while the sampler is active."""
+    sampler = StackSampler(interval=0.001)
+    sampler.sample()
+    assert sampler.samples == 1
+    sampler.start()
+    busy_loop(200_000)
+    sampler.stop()
+    assert sampler.samples == 1
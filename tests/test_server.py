@@ -0,0 +1,84 @@
+import asyncio
+import json
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from app.server import CalculatorServer, Session, parse_address
+
+
+def test_parse_address():
+    """Test TCP and Unix socket addresses are told apart."""
+    assert parse_address("unix:/tmp/calc.sock") == ("unix", "/tmp/calc.sock")
+    assert parse_address("127.0.0.1:8765") == ("tcp", ("127.0.0.1", 8765))
+    assert parse_address("9000") == ("tcp", ("127.0.0.1", 9000))
+
+
+def test_session_replies(app_instance):
+    """Test a session captures command output and reports errors instead of raising or prompting."""
+    session = Session(app_instance)
+    assert session.execute("add 1 2 3") == {"ok": True, "result": 6.0, "output": []}
+    assert session.execute("mean") == {"ok": True, "result": 2.0, "output": ["📊 Mean: 2.0"]}
+    assert session.execute("percentile 50 90")["result"] == [2.0, 3.0]
+    assert session.execute("frobnicate")["error"] == "Unknown command 'frobnicate'."
+    assert session.execute("grades")["ok"] is False  # No terminal to prompt on
+    assert session.calculator is not app_instance.calculator
+
+
+def test_server_pipelined_isolated_sessions(app_instance):
+    """Test pipelined commands get in-order replies and each connection has its own calculator."""
+    async def client(address, commands):
+        host, _, port = address.rpartition(":")
+        reader, writer = await asyncio.open_connection(host, int(port))
+        writer.write("".join(f"{command}\n" for command in commands).encode("utf-8"))
+        await writer.drain()
+        replies = [json.loads(await reader.readline()) for _ in commands]
+        writer.close()
+        return replies
+
+    async def scenario():
+        server = CalculatorServer(app_instance, "127.0.0.1:0")
+        address = await server.start()
+        try:
+            return await asyncio.gather(client(address, ["add 5", "multiply 3", "print"]),
+                                        client(address, ["add 1", "print"]))
+        finally:
+            await server.stop()
+
+    first, second = asyncio.run(scenario())
+    assert [reply["result"] for reply in first] == [5.0, 15.0, 15.0]
+    assert [reply["result"] for reply in second] == [1.0, 1.0]
+
+
+def test_sessions_capture_output_per_thread(app_instance):
+    """Test sessions running at once on different threads each get only their own output."""
+    sessions = [Session(app_instance) for _ in range(4)]
+    for number, session in enumerate(sessions):
+        session.execute(f"add {number}")
+    stdout = sys.stdout
+
+    def run(number):
+        return [sessions[number].execute("mean")["output"] for _ in range(200)]
+
+    with ThreadPoolExecutor(4) as pool:
+        outputs = list(pool.map(run, range(4)))
+    for number, output in enumerate(outputs):
+        assert output == [[f"📊 Mean: {float(number)}"]] * 200
+    assert sys.stdout is stdout
+
+
+def test_server_stop_cancels_sessions(app_instance):
+    """Test stopping the server cancels the open sessions rather than letting them end quietly."""
+    async def scenario():
+        server = CalculatorServer(app_instance, "127.0.0.1:0")
+        host, _, port = (await server.start()).rpartition(":")
+        reader, writer = await asyncio.open_connection(host, int(port))
+        writer.write(b"add 2\n")
+        await writer.drain()
+        reply = json.loads(await reader.readline())
+        handlers = list(server._handlers)
+        await server.stop()
+        writer.close()
+        return reply, handlers
+
+    reply, handlers = asyncio.run(scenario())
+    assert reply["result"] == 2.0
+    assert len(handlers) == 1 and handlers[0].cancelled()
@@ -0,0 +1,114 @@
+import io
+import numpy as np
+import pytest
+from app import App
+from app.plugins.calc.sketch import FixedHistogram, KLLSketch, StatsSketch
+
+
+def test_kll_quantiles_within_error_bound():
+    """Test KLL quantiles stay within a few k-relative rank errors while retaining few items."""
+    values = np.random.default_rng(0).permutation(100_000).astype(float)
+    sketch = KLLSketch(k=200, seed=1)
+    sketch.update_many(values[:50_000])
+    for value in values[50_000:60_000]:
+        sketch.update(value)
+    sketch.update_many(values[60_000:])
+
+    assert len(sketch) == 100_000
+    assert sketch.retained() < 1_000
+    estimates = sketch.quantile([0.1, 0.5, 0.9])
+    assert np.abs(estimates - np.array([10_000, 50_000, 90_000])).max() < 2_000
+    assert sketch.quantile(0) == 0 and sketch.quantile(1) == 99_999
+    assert sketch.rank(25_000) == pytest.approx(0.25, abs=0.02)
+
+
+def test_sketches_merge():
+    """Test merged sketches answer like one sketch over all the values."""
+    left, right = StatsSketch(k=100, seed=2), StatsSketch(k=100, seed=3)
+    left.push_many(np.arange(0, 50, 0.01))
+    right.push_many(np.arange(50, 100, 0.01))
+    left.merge(right)
+    assert len(left) == 10_000
+    assert left.quantile(0.5) == pytest.approx(50, abs=2)
+    assert left.histogram.quantile(0.5) == pytest.approx(50, abs=0.5)
+
+    with pytest.raises(ValueError):
+        KLLSketch(k=100).merge(KLLSketch(k=200))
+    with pytest.raises(ValueError):
+        FixedHistogram(0, 100, 10).merge(FixedHistogram(0, 100, 20))
+
+
+def test_histogram_bins_and_outliers():
+    """Test values land in their bins, the top edge in the last one and outliers in the end bins."""
+    histogram = FixedHistogram(0, 10, 5)
+    histogram.update_many([-1, 0, 1.9, 2, 10, 11])
+    histogram.update(9.5)
+    assert histogram.counts.tolist() == [1, 2, 1, 0, 0, 2, 1]
+    assert histogram.edges.tolist() == [0, 2, 4, 6, 8, 10]
+
+
+def test_non_finite_values_scalar_and_bulk(app_instance, capsys):
+    """Test NaN is left out of the sketch and infinities go to the end bins, one value at a time or in bulk."""
+    special = [5.0, float("nan"), float("inf"), -float("inf"), 50.0]
+    scalar, bulk = StatsSketch(), StatsSketch()
+    for num in special:
+        scalar.push(num)
+    bulk.push_many(special)
+    for sketch in (scalar, bulk):
+        assert len(sketch) == 4 and sketch.quantile(1) == float("inf")
+        assert (sketch.histogram.counts[0], sketch.histogram.counts[-1], len(sketch.histogram)) == (1, 1, 4)
+
+    calculator = app_instance.calculator
+    calculator.reset()
+    calculator.add_value(float("nan"))
+    calculator.add_value(float("inf"))
+    calculator.add_values([float("nan"), float("inf"), 1.0])
+    assert len(calculator.values) == 5
+    assert calculator.percentile(100) == float("inf")
+
+    calculator.reset()
+    app_instance.run_script(io.StringIO("add 5\nadd nan\nadd inf\nadd 1 nan\nmean\n"))
+    assert "📊 Mean: nan" in capsys.readouterr().out
+    assert len(calculator.values) == 5
+
+
+def test_percentile_command(app_instance, capsys):
+    """Test 'percentile' answers from the sketch fed by add_value and bulk loads."""
+    app_instance.calculator.reset()
+    app_instance.calculator.add_value(5)
+    app_instance.calculator.add_values(np.arange(1.0, 101.0))
+
+    assert app_instance.command_handler.execute_command("percentile", 50.0) == pytest.approx(50, abs=1)
+    assert "📊 50th percentile (approx.):" in capsys.readouterr().out
+    assert app_instance.command_handler.execute_command("percentile", 150.0) is None
+    assert "between 0 and 100" in capsys.readouterr().out
+
+
+def test_percentile_after_snapshot_restore(tmp_path):
+    """Test the sketch catches up with restored values on the first percentile query."""
+    path = str(tmp_path / "session.snap")
+    app = App()
+    app.calculator.reset()
+    app.calculator.add_values(np.arange(1.0, 11.0))
+    app.save_snapshot(path)
+
+    restored = App()
+    restored.load_snapshot(path)
+    restored.calculator.add_value(100)
+    assert len(restored.calculator.sketch) == 1
+    assert restored.calculator.percentile(100) == 100
+    assert len(restored.calculator.sketch) == 11
+
+
+def test_histogram_command(app_instance, capsys):
+    """Test 'histogram' prints the non-empty bins of the sketch's histogram, outliers included."""
+    app_instance.calculator.reset()
+    assert app_instance.command_handler.execute_command("histogram") is None
+    app_instance.calculator.add_values([-5.0, 0.5, 0.7, 42.0, 100.0, 250.0])
+
+    counts = app_instance.command_handler.execute_command("histogram")
+    assert (len(counts), sum(counts), counts[0], counts[1], counts[43], counts[100], counts[-1]) == \
+        (102, 6, 1, 2, 1, 1, 1)
+    out = capsys.readouterr().out
+    for line in ("📊 below 0: 1", "📊 0 to 1: 2", "📊 42 to 43: 1", "📊 99 to 100: 1", "📊 above 100: 1"):
+        assert line in out
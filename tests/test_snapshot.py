@@ -0,0 +1,53 @@
+import numpy as np
+import pytest
+from app import App
+from app.snapshot import read_snapshot
+
+
+def test_snapshot_round_trip_is_memory_mapped(tmp_path):
+    """Test values, total and history survive a snapshot and come back memory-mapped."""
+    path = str(tmp_path / "session.snap")
+    app = App()
+    app.calculator.reset()
+    app.history.clear()
+    app.command_handler.execute_command("add", np.array([3.0, 1.0, 4.0, 1.0, 5.0]))
+    app.command_handler.execute_command("multiply", 2.0)
+    app.save_snapshot(path)
+
+    restored = App()
+    restored.load_snapshot(path)
+    assert isinstance(restored.calculator.values.view(), np.memmap)
+    assert restored.calculator.value == 28.0
+    assert restored.calculator.values == [3, 1, 4, 1, 5]
+    assert restored.history.to_dataframe()["Operation"].tolist() == ["add"] * 5 + ["multiply"]
+
+    # Stats run on the mapped buffer, and appends copy it into memory first
+    assert restored.command_handler.execute_command("mean") == 2.8
+    assert restored.command_handler.execute_command("median") == 3.0
+    assert restored.command_handler.execute_command("mode") == [1.0]
+    restored.command_handler.execute_command("add", 9.0)
+    assert restored.calculator.stats.std() == pytest.approx(np.std([3, 1, 4, 1, 5, 9]))
+    assert restored.command_handler.execute_command("median") == 3.5
+    assert len(restored.history) == 11
+
+
+def test_snapshot_overwrite_while_mapped(tmp_path):
+    """Test saving over the snapshot a session has mapped keeps the old mapping valid."""
+    path = str(tmp_path / "session.snap")
+    app = App()
+    app.calculator.values = [1, 2, 3]
+    app.save_snapshot(path)
+    app.load_snapshot(path)
+    app.calculator.add_value(4)
+    app.save_snapshot(path)
+
+    assert read_snapshot(path)["arrays"]["values"]["data"].tolist() == [1, 2, 3, 4]
+    assert app.calculator.values == [1, 2, 3, 4]
+
+
+def test_read_snapshot_rejects_other_files(tmp_path):
+    """Test a file without the snapshot header is refused."""
+    path = tmp_path / "not_a_snapshot.bin"
+    path.write_bytes(b"Operation,Value,Result\n")
+    with pytest.raises(ValueError, match="not a calculator snapshot"):
+        read_snapshot(str(path))
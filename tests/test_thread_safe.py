@@ -0,0 +1,69 @@
+import threading
+import numpy as np
+import pytest
+from app.plugins.calc.thread_safe import ThreadSafeCalculator
+
+
+def test_snapshot_is_consistent_and_immutable():
+    """Test a snapshot keeps its total, values and moments after later writes."""
+    calculator = ThreadSafeCalculator()
+    calculator.add_values([1, 2, 3])
+    before = calculator.snapshot()
+    calculator.add_value(10)
+    calculator.multiply_value(2)
+
+    assert (before.value, before.values.tolist(), before.count) == (6.0, [1, 2, 3], 3)
+    assert before.statistic("median") == 2.0
+    after = calculator.snapshot()
+    assert (after.value, after.values.tolist(), after.version > before.version) == (32.0, [1, 2, 3, 10], True)
+    assert calculator.statistic("mean") == 4.0
+    calculator.reset()
+    assert calculator.snapshot().count == 0 and before.values.tolist() == [1, 2, 3]
+
+
+def test_concurrent_writers_and_readers_keep_invariants():
+    """Stress: many writers and lock-free readers; every snapshot must be internally consistent."""
+    calculator = ThreadSafeCalculator()
+    writers, per_writer = 8, 2_000
+    stop = threading.Event()
+    errors = []
+
+    def write(seed):
+        for i in range(per_writer):
+            if i % 100 == 99:
+                calculator.add_values(np.full(10, seed, dtype=float))
+            else:
+                calculator.add_value(seed)
+
+    def read():
+        last_version = -1
+        while not stop.is_set():
+            snapshot = calculator.snapshot()
+            try:
+                assert snapshot.version >= last_version
+                assert snapshot.count == len(snapshot.values)
+                assert snapshot.value == snapshot.values.sum()
+                if snapshot.count:
+                    assert snapshot.statistic("mean") == pytest.approx(snapshot.values.mean())
+                    assert snapshot.statistic("std") == pytest.approx(snapshot.values.std(), abs=1e-6)
+            except AssertionError as e:
+                errors.append(e)
+                return
+            last_version = snapshot.version
+
+    readers = [threading.Thread(target=read) for _ in range(4)]
+    threads = [threading.Thread(target=write, args=(seed,)) for seed in range(1, writers + 1)]
+    for thread in readers + threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    stop.set()
+    for thread in readers:
+        thread.join()
+
+    assert not errors
+    per_seed = per_writer + (per_writer // 100) * 9
+    final = calculator.snapshot()
+    assert final.count == writers * per_seed
+    assert final.value == sum(seed * per_seed for seed in range(1, writers + 1))
+    assert calculator.stats.count == final.count and calculator.values == final.values
@@ -0,0 +1,161 @@
+import io
+import numpy as np
+from app.commands import CommandHandler
+from app.history import HistoryLog
+from app.journal import Journal
+from app.plugins.calc import AddCommand
+from app.plugins.calc.calculator import Calculator, RunningStats
+from app.plugins.calc.thread_safe import ThreadSafeCalculator
+from app.plugins.undo import RedoCommand, UndoCommand
+
+
+def state(calculator):
+    """Everything undo has to roll back; exact except the moments, which are subtracted back to rounding."""
+    if not len(calculator.values):
+        return calculator.value, []
+    return (calculator.value, calculator.values.tolist(), round(calculator.statistic("mean"), 9),
+            round(calculator.statistic("std"), 9), calculator.statistic("median"), calculator.statistic("mode"),
+            float(calculator.percentile(50)))
+
+
+def test_undo_and_redo_walk_back_and_forth_exactly():
+    """Test undo restores every earlier state and redo replays them, including operations without exact inverses."""
+    calculator = Calculator()
+    calculator.undo_log.FLUSH_AT = 3  # Scalar rows reach the columns both in full groups and on the first undo
+    operations = [
+        lambda: calculator.add_value(0.1), lambda: calculator.add_value(0.2),
+        lambda: calculator.multiply_value(0),  # No inverse at all
+        lambda: calculator.add_value(7.0), lambda: calculator.divide_value(3.0),  # 7 / 3 * 3 != 7
+        lambda: calculator.add_values([1.0, 2.0, 3.0]), lambda: calculator.subtract_values([1.0, 2.0], True),
+        lambda: calculator.add_value(1e17), lambda: calculator.add_value(1.0),  # Outlier the moments cannot subtract
+    ]
+    states = [state(calculator)]
+    for operation in operations:
+        operation()
+        states.append(state(calculator))
+
+    for expected in reversed(states[:-1]):
+        assert calculator.undo() is not None
+        assert state(calculator) == expected
+    assert calculator.undo() is None
+
+    for expected in states[1:]:
+        assert calculator.redo() is not None
+        assert state(calculator) == expected
+    assert calculator.redo() is None
+
+
+def test_running_stats_remove_matches_recomputation():
+    """Test removing values (one or a batch, merged or still pending) keeps moments, median and mode right."""
+    rng = np.random.default_rng(7)
+    stats, values = RunningStats(), []
+    stats.BLOCK = 4  # Many small blocks, so inserts split them and removals span them
+    for _ in range(400):
+        if values and rng.random() < 0.4:
+            taken = values[-int(rng.integers(1, min(len(values), 30) + 1)):]
+            del values[-len(taken):]
+            if len(taken) == 1:
+                stats.remove(taken[0])
+            else:
+                stats.remove_many(taken)
+        else:
+            batch = rng.integers(0, 8, int(rng.integers(1, 20))).astype(float).tolist()
+            if len(batch) == 1:
+                stats.push(batch[0])
+            else:
+                stats.push_many(batch)
+            values += batch
+        if values and rng.random() < 0.5:  # Queries merge the pending values, so skip some to remove those too
+            array = np.array(values)
+            uniques, counts = np.unique(array, return_counts=True)
+            assert stats.count == len(values)
+            assert (stats.median(), stats.mode()) == (np.median(array), uniques[counts == counts.max()].tolist())
+            assert np.isclose(stats.mean(), array.mean()) and np.isclose(stats.std(), array.std())
+
+
+def test_undo_after_a_nan_total():
+    """Test a NaN total does not look like an outside change to the log."""
+    calculator = Calculator()
+    calculator.add_value(2.0)
+    calculator.add_value(float("nan"))
+    calculator.add_value(3.0)
+    assert calculator.undo()[0] == "add" and calculator.undo()[0] == "add"
+    assert (calculator.value, calculator.values.tolist()) == (2.0, [2.0])
+
+
+def test_new_operation_drops_redo_and_keeps_old_views():
+    """Test an operation after undo discards the redo rows and never overwrites values handed out earlier."""
+    calculator = ThreadSafeCalculator()
+    calculator.add_values([1.0, 2.0, 3.0])
+    calculator.add_value(4.0)
+    before = calculator.snapshot()
+    calculator.undo()
+    calculator.add_value(40.0)
+
+    assert before.values.tolist() == [1.0, 2.0, 3.0, 4.0]
+    assert calculator.snapshot().values.tolist() == [1.0, 2.0, 3.0, 40.0]
+    assert calculator.redo() is None
+    assert (calculator.undo_log.undoable, calculator.undo_log.redoable) == (2, 0)
+
+
+def test_changes_outside_the_log_start_it_over():
+    """Test values or totals changed by something the log did not record make older rows unreachable."""
+    calculator = Calculator()
+    calculator.add_value(5.0)
+    calculator.values.extend([9.0])  # e.g. an import
+    assert calculator.undo() is None
+    assert calculator.values.tolist() == [5.0, 9.0]
+
+    calculator.add_value(1.0)
+    calculator.value = 100.0
+    calculator.add_value(2.0)
+    operation, operands = calculator.undo()
+    assert (operation, operands.tolist()) == ("add", [2.0])
+    assert calculator.undo() is None and calculator.value == 100.0
+
+
+def test_deep_history_stays_compact():
+    """Test a long session costs a few dozen bytes per row, whatever the number of values."""
+    calculator = Calculator()
+    for num in range(50_000):
+        calculator.add_value(float(num % 10))
+        calculator.multiply_value(1.5)
+    assert len(calculator.undo_log) == 100_000
+    assert calculator.undo_log.nbytes() < 100_000 * 40
+    for _ in range(99_999):
+        calculator.undo()
+    assert (calculator.value, calculator.values.tolist()) == (0.0, [0.0])
+
+
+def test_undo_redo_commands_in_scripts_and_journal(app_instance, capsys, tmp_path):
+    """Test the commands report each step, reject bad step counts and a journaled undo is replayed on recovery."""
+    app_instance.calculator.reset()
+    app_instance.run_script(io.StringIO("add 5\nmultiply 0\nundo\nadd 1 2 3\nundo 2\nredo\nprint\n"))
+    output = capsys.readouterr().out
+    for step in ("↩️ Undid multiply 0.", "↩️ Undid add 3 values.", "↪️ Redid add 5."):
+        assert step in output
+    assert app_instance.calculator.values.tolist() == [5.0]
+
+    for command in ("undo abc", "redo -", "undo 0", "redo -2", "undo 1.5"):
+        name, argument = command.split()
+        assert app_instance.command_handler.execute_command(name, [argument]) is None
+        assert "❌ Error: The number of steps must be a positive whole number." in capsys.readouterr().out
+    assert app_instance.calculator.values.tolist() == [5.0]
+
+    calculator, history = Calculator(), HistoryLog()
+    handler = CommandHandler(calculator, history)
+    handler.register_command("add", AddCommand)
+    handler.register_command("undo", UndoCommand)
+    handler.register_command("redo", RedoCommand)
+    journal = Journal(str(tmp_path / "session.journal"), sync_interval=0)
+    journal.attach(calculator, history, handler)
+    for num in (1.0, 2.0, 3.0):
+        handler.execute_command("add", num)
+    handler.execute_command("undo", ["2"])
+    handler.execute_command("redo")
+    journal.close()
+
+    recovered = Calculator()
+    Journal(str(tmp_path / "session.journal")).recover(recovered, HistoryLog())
+    assert (recovered.value, recovered.values.tolist()) == (3.0, [1.0, 2.0])
+    assert recovered.statistic("median") == 1.5